@@ -1,27 +1,179 @@
+import logging
 import os
-import psycopg2
-import psycopg2.extras
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import psycopg
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout, TooManyRequests
 from fastapi import HTTPException
+from .metrics import db_query_duration, db_query_errors
 
-def get_db():
+logger = logging.getLogger(__name__)
+
+# ── Pool Configuration ───────────────────────────────────────────────
+
+POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.environ.get("DB_POOL_MAX_SIZE", "10"))
+# Seconds a request may wait for a free connection before giving up
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+# Max requests queued for a connection before failing fast (0 = unbounded)
+POOL_MAX_WAITING = int(os.environ.get("DB_POOL_MAX_WAITING", "0"))
+# Connections older than this are closed and replaced when returned
+POOL_MAX_LIFETIME = float(os.environ.get("DB_POOL_MAX_LIFETIME", "1800"))
+# Connections above min size idle longer than this are closed
+POOL_MAX_IDLE = float(os.environ.get("DB_POOL_MAX_IDLE", "300"))
+# Connections idle longer than this are pinged before being handed out
+POOL_CHECK_IDLE = float(os.environ.get("DB_POOL_CHECK_IDLE", "5"))
+
+
+def get_database_url():
     db_url = os.environ.get("DATABASE_URL")
     if not db_url:
-        print("ERROR: DATABASE_URL not set in environment variables")
-        raise HTTPException(status_code=500, detail="Database configuration missing")
-    
+        return None
     # Handle postgres:// vs postgresql:// if needed
     if db_url.startswith("postgres://"):
         db_url = db_url.replace("postgres://", "postgresql://", 1)
+    return db_url
+
+
+# ── Per-request Query Stats ──────────────────────────────────────────
+# The HTTP middleware starts a fresh QueryStats for each request; every
+# statement executed through a pooled connection counts against it, along
+# with the time spent waiting for its result. Every statement, in a request
+# or not, also lands in the process-wide metrics.
+
+class QueryStats:
+    __slots__ = ("count", "time")
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
 
+
+def start_query_stats() -> QueryStats:
+    stats = QueryStats()
+    _query_stats.set(stats)
+    return stats
+
+
+class CountingCursor(psycopg.AsyncCursor):
+    async def execute(self, query, params=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        except Exception:
+            db_query_errors.inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            db_query_duration.observe(elapsed)
+            stats = _query_stats.get()
+            if stats is not None:
+                stats.count += 1
+                stats.time += elapsed
+
+
+async def check_connection(conn):
+    """Pool checkout health check, kept out of the request's query count.
+
+    Connections returned within the last POOL_CHECK_IDLE seconds skip the
+    ping, so a busy worker doesn't pay an extra round trip per request.
+    """
+    returned_at = getattr(conn, "wishly_returned_at", None)
+    if returned_at is not None and time.monotonic() - returned_at < POOL_CHECK_IDLE:
+        return
+    token = _query_stats.set(None)
     try:
-        conn = psycopg2.connect(
+        await AsyncConnectionPool.check_connection(conn)
+    finally:
+        _query_stats.reset(token)
+
+
+async def mark_returned(conn):
+    conn.wishly_returned_at = time.monotonic()
+
+
+# ── Process-wide Pool ────────────────────────────────────────────────
+# Connections yield dict rows, the same shape RealDictCursor gave us, and
+# are health-checked on checkout so a dropped socket never reaches a handler.
+
+_pool = None
+
+
+async def open_pool():
+    """Create and open the process-wide pool. Called from the app lifespan."""
+    global _pool
+    if _pool is None:
+        db_url = get_database_url()
+        if not db_url:
+            logger.error("DATABASE_URL not set in environment variables")
+            raise HTTPException(status_code=500, detail="Database configuration missing")
+        pool = AsyncConnectionPool(
             db_url,
-            cursor_factory=psycopg2.extras.RealDictCursor,
+            kwargs={"row_factory": dict_row, "cursor_factory": CountingCursor},
+            min_size=min(POOL_MIN_SIZE, POOL_MAX_SIZE),
+            max_size=POOL_MAX_SIZE,
+            timeout=POOL_TIMEOUT,
+            max_waiting=POOL_MAX_WAITING,
+            max_lifetime=POOL_MAX_LIFETIME,
+            max_idle=POOL_MAX_IDLE,
+            check=check_connection,
+            reset=mark_returned,
+            open=False,
         )
-        yield conn
-    except psycopg2.Error as e:
-        print(f"DATABASE CONNECTION ERROR: {e}")
+        await pool.open()
+        _pool = pool
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await pool.close()
+
+
+async def get_pool():
+    return _pool if _pool is not None else await open_pool()
+
+
+def pool_stats():
+    if _pool is None:
+        return {}
+    stats = _pool.get_stats()
+    stats["requests_wait_ms_avg"] = (
+        round(stats.get("requests_wait_ms", 0) / stats["requests_queued"], 3)
+        if stats.get("requests_queued") else 0.0
+    )
+    return stats
+
+
+@asynccontextmanager
+async def db_connection():
+    """Borrow a pool connection, mapping pool and driver errors to HTTP errors.
+
+    For code that can't hold a request-scoped ``get_db`` connection, such as
+    streaming responses.
+    """
+    try:
+        pool = await get_pool()
+        async with pool.connection() as conn:
+            yield conn
+    except (PoolTimeout, TooManyRequests) as e:
+        logger.warning("Database pool exhausted: %s", e)
+        raise HTTPException(status_code=503, detail="Database is busy, please retry")
+    except psycopg.OperationalError as e:
+        logger.error("Database connection error: %s", e)
         raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
-    finally:
-        if 'conn' in locals() and conn:
-            conn.close()
+    except psycopg.Error as e:
+        logger.error("Database error: %s", e)
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+async def get_db():
+    async with db_connection() as conn:
+        yield conn
@@ -1,26 +1,69 @@
+import os
+from datetime import datetime, timezone
 from fastapi import Request, Depends, HTTPException
-from .database import get_db
+from .cache import TTLCache
+from .database import db_connection
 
-async def get_current_user(
-    request: Request,
-    db=Depends(get_db),
-):
+# token -> user row. Each worker keeps its own cache, so a session revoked on
+# another worker stays usable here for at most SESSION_CACHE_TTL seconds.
+SESSION_CACHE_TTL = float(os.environ.get("SESSION_CACHE_TTL", "60"))
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", "10000"))
+
+session_cache = TTLCache(maxsize=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL)
+
+
+def invalidate_session(token: str):
+    session_cache.pop(token)
+
+
+def invalidate_user_sessions(user_id):
+    session_cache.pop_where(lambda token, user: str(user["id"]) == str(user_id))
+
+
+def _get_token(request: Request):
     token = request.cookies.get("session_token")
     if not token:
         # Fallback to Bearer token for existing clients during migration (optional)
         auth_header = request.headers.get("Authorization")
         if auth_header and auth_header.startswith("Bearer "):
             token = auth_header.split(" ")[1]
-    
-    if not token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+    return token
+
+
+async def _lookup_session(token: str):
+    """The session's user, from the cache or, on a miss, from the database.
+
+    Only a miss borrows a pool connection, and it goes back before the route
+    runs. Routes that query the database still declare ``get_db`` themselves.
+    """
+    user = session_cache.get(token)
+    if user is not None:
+        return dict(user)
+    async with db_connection() as db:
+        return await _query_session(token, db)
 
+
+async def _query_session(token: str, db):
     cur = db.cursor()
-    cur.execute(
-        "SELECT s.user_id, u.id, u.email, u.name, u.is_admin FROM sessions s JOIN users u ON s.user_id = u.id WHERE s.token = %s AND s.expires_at > NOW()",
+    await cur.execute(
+        "SELECT s.user_id, s.expires_at, u.id, u.email, u.name, u.is_admin FROM sessions s JOIN users u ON s.user_id = u.id WHERE s.token = %s AND s.expires_at > NOW()",
         (token,),
     )
-    row = cur.fetchone()
+    row = await cur.fetchone()
+    if not row:
+        return None
+    # Never cache a session past its own expiry
+    remaining = (row["expires_at"] - datetime.now(timezone.utc)).total_seconds()
+    session_cache.set(token, row, ttl=remaining)
+    return dict(row)
+
+
+async def get_current_user(request: Request):
+    token = _get_token(request)
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    row = await _lookup_session(token)
     if not row:
         raise HTTPException(status_code=401, detail="Invalid or expired session")
     return row
@@ -30,23 +73,8 @@ async def get_admin_user(user=Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Admin access required")
     return user
 
-async def get_user_if_authenticated(
-    request: Request,
-    db=Depends(get_db),
-):
-    token = request.cookies.get("session_token")
-    if not token:
-         # Fallback
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.split(" ")[1]
-    
+async def get_user_if_authenticated(request: Request):
+    token = _get_token(request)
     if not token:
         return None
-
-    cur = db.cursor()
-    cur.execute(
-        "SELECT u.id, u.email, u.name FROM sessions s JOIN users u ON s.user_id = u.id WHERE s.token = %s AND s.expires_at > NOW()",
-        (token,),
-    )
-    return cur.fetchone()
+    return await _lookup_session(token)
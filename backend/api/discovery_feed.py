@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import os
+import time
+
+from .database import db_connection
+from .trending import DECAY_RATE
+
+logger = logging.getLogger(__name__)
+
+# How often the discovery_snapshot row is rebuilt (by whichever worker gets there first)
+DISCOVERY_REFRESH_INTERVAL = float(os.environ.get("DISCOVERY_REFRESH_INTERVAL", "60"))
+# How long a worker serves its in-memory copy before re-reading the snapshot,
+# and how old that copy may get while a re-read runs in the background
+DISCOVERY_CACHE_TTL = float(os.environ.get("DISCOVERY_CACHE_TTL", "15"))
+DISCOVERY_STALE_TTL = float(os.environ.get("DISCOVERY_STALE_TTL", "300"))
+
+# pg advisory lock key so only one worker rebuilds the snapshot at a time
+REFRESH_LOCK_KEY = 5_301_100_011
+
+# Each section is ordered by an "ord" column that is stripped from the JSON.
+# Trending "score" is the decayed number of adds as of the rebuild.
+BUILD_SNAPSHOT_SQL = """
+    INSERT INTO discovery_snapshot (id, payload, refreshed_at)
+    SELECT 1, jsonb_build_object(
+        'trending', COALESCE((
+            SELECT jsonb_agg(to_jsonb(t) - 'ord' ORDER BY t.ord)
+            FROM (
+                SELECT name, url, image_url, price, currency,
+                       add_count AS occurrences,
+                       ROUND(EXP(GREATEST(log_score - %(decay_rate)s * EXTRACT(EPOCH FROM NOW()), -700))::numeric, 3) AS score,
+                       ROW_NUMBER() OVER (ORDER BY log_score DESC) AS ord
+                FROM trending_products
+                ORDER BY log_score DESC
+                LIMIT 10
+            ) t
+        ), '[]'::jsonb),
+        'promoted', COALESCE((
+            SELECT jsonb_agg(to_jsonb(p) - 'ord' ORDER BY p.ord)
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (ORDER BY created_at DESC) AS ord
+                FROM promoted_items
+                ORDER BY created_at DESC
+                LIMIT 10
+            ) p
+        ), '[]'::jsonb),
+        'curated', COALESCE((
+            SELECT jsonb_agg(to_jsonb(c) - 'ord' ORDER BY c.ord)
+            FROM (
+                SELECT pw.category, w.title, w.slug, w.description,
+                       cover.image_url AS cover_image,
+                       w.item_count,
+                       u.name AS owner_name,
+                       ROW_NUMBER() OVER (ORDER BY pw.display_order ASC, pw.created_at DESC) AS ord
+                FROM promoted_wishlists pw
+                JOIN wishlists w ON pw.wishlist_id = w.id
+                JOIN users u ON w.user_id = u.id
+                LEFT JOIN LATERAL (
+                    SELECT i.image_url FROM wishlist_items i
+                    WHERE i.wishlist_id = w.id AND i.image_url IS NOT NULL LIMIT 1
+                ) cover ON true
+                ORDER BY pw.display_order ASC, pw.created_at DESC
+                LIMIT 10
+            ) c
+        ), '[]'::jsonb)
+    ), NOW()
+    ON CONFLICT (id) DO UPDATE SET payload = EXCLUDED.payload, refreshed_at = EXCLUDED.refreshed_at
+"""
+
+
+class DiscoveryFeed:
+    """Discovery payload served from memory, backed by a snapshot table.
+
+    A background task rebuilds ``discovery_snapshot`` every
+    ``refresh_interval`` seconds under a Postgres advisory lock, so one
+    worker does the aggregation for everyone. Requests read an in-memory
+    copy that is re-read from the table after ``cache_ttl`` seconds; until
+    ``stale_ttl`` the old copy keeps being served while that happens.
+    """
+
+    def __init__(self, refresh_interval=DISCOVERY_REFRESH_INTERVAL, cache_ttl=DISCOVERY_CACHE_TTL,
+                 stale_ttl=DISCOVERY_STALE_TTL):
+        self.refresh_interval = refresh_interval
+        self.cache_ttl = cache_ttl
+        self.stale_ttl = stale_ttl
+
+        self._payload = None
+        self._loaded_at = 0.0
+        self._reload = None
+        self._task = None
+
+        self._stats = {
+            "fresh_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "reloads": 0,
+            "refreshes": 0,
+            "failed_refreshes": 0,
+            "last_refresh_ms": 0.0,
+        }
+
+    async def get(self):
+        age = time.monotonic() - self._loaded_at
+        if self._payload is not None and age < self.cache_ttl:
+            self._stats["fresh_hits"] += 1
+            return self._payload
+        if self._payload is not None and age < self.stale_ttl:
+            self._stats["stale_hits"] += 1
+            self._start_reload()
+            return self._payload
+
+        self._stats["misses"] += 1
+        await asyncio.shield(self._start_reload())
+        return self._payload
+
+    def _start_reload(self):
+        if self._reload is None or self._reload.done():
+            self._reload = asyncio.ensure_future(self._load())
+            # Background reloads report their own failures
+            self._reload.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._reload
+
+    async def _load(self):
+        try:
+            payload = await self._read()
+            if payload is None:
+                # First run against an empty table
+                await self.refresh(force=True)
+                payload = await self._read()
+        except Exception:
+            logger.exception("Discovery feed reload failed")
+            if self._payload is None:
+                raise
+            return
+        self._stats["reloads"] += 1
+        self._payload = payload
+        self._loaded_at = time.monotonic()
+
+    async def _read(self):
+        async with db_connection() as conn:
+            cur = conn.cursor()
+            await cur.execute("SELECT payload FROM discovery_snapshot WHERE id = 1")
+            row = await cur.fetchone()
+        return row["payload"] if row else None
+
+    async def refresh(self, force=False):
+        """Rebuild the snapshot row. Returns False if it was skipped.
+
+        Without ``force`` this gives up when another worker holds the lock or
+        rebuilt the snapshot less than half an interval ago.
+        """
+        start = time.perf_counter()
+        async with db_connection() as conn:
+            cur = conn.cursor()
+            if force:
+                await cur.execute("SELECT pg_advisory_xact_lock(%s)", (REFRESH_LOCK_KEY,))
+            else:
+                await cur.execute("SELECT pg_try_advisory_xact_lock(%s) AS locked", (REFRESH_LOCK_KEY,))
+                if not (await cur.fetchone())["locked"]:
+                    return False
+                await cur.execute(
+                    "SELECT 1 FROM discovery_snapshot WHERE id = 1 AND refreshed_at > NOW() - make_interval(secs => %s)",
+                    (self.refresh_interval / 2,),
+                )
+                if await cur.fetchone():
+                    return False
+            await cur.execute(BUILD_SNAPSHOT_SQL, {"decay_rate": DECAY_RATE})
+        self._stats["refreshes"] += 1
+        self._stats["last_refresh_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return True
+
+    async def invalidate(self):
+        """Rebuild now and reload this worker's copy (after admin edits).
+
+        Other workers pick the change up within ``cache_ttl`` seconds.
+        """
+        try:
+            await self.refresh(force=True)
+            # A reload already in flight may have read the old row
+            if self._reload is not None and not self._reload.done():
+                await asyncio.wait([self._reload])
+            await asyncio.shield(self._start_reload())
+        except Exception as e:
+            # The edit itself is committed; the next scheduled refresh will catch up
+            logger.warning("Discovery feed invalidate failed: %s", e)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Discovery snapshot refresh failed")
+                self._stats["failed_refreshes"] += 1
+
+    def stats(self):
+        return {
+            **self._stats,
+            "age_s": round(time.monotonic() - self._loaded_at, 3) if self._payload is not None else None,
+        }
+
+
+discovery_feed = DiscoveryFeed()
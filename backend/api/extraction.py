@@ -0,0 +1,222 @@
+import html
+import json
+import os
+import re
+from bs4 import BeautifulSoup
+
+from .utils import detect_currency, extract_price
+
+try:
+    import lxml  # noqa: F401  (faster tree builder for BeautifulSoup)
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# "fast" scans for Open Graph / JSON-LD first and only builds a DOM when a
+# field is still missing; "dom" always builds one
+SCRAPER_EXTRACTOR = os.environ.get("SCRAPER_EXTRACTOR", "fast")
+SCRAPER_PARSER = os.environ.get("SCRAPER_PARSER", "lxml" if LXML_AVAILABLE else "html.parser")
+
+META_PROPERTIES = (
+    "og:title", "og:image",
+    "product:price:amount", "og:price:amount",
+    "product:price:currency", "og:price:currency",
+)
+
+NAME_SELECTORS = [
+    "h1.product-title", "h1.product-name", "h1[class*='title']",
+    "h1[class*='name']", "h1[class*='product']", "h1",
+    "[data-testid='product-title']", "[class*='ProductTitle']",
+    "._2YkNt", "[class*='goods-title']",
+]
+PRICE_SELECTORS = [
+    "[class*='price']:not([class*='original']):not([class*='was'])",
+    "[data-testid*='price']", "[class*='Price']",
+    "span.price", ".product-price", ".current-price",
+    "._1k4dP", "[class*='sale-price']",
+]
+IMAGE_SELECTORS = [
+    "img[class*='product']", "img[class*='main']",
+    ".product-image img", "#main-image", "img[data-main]",
+]
+
+# Quoted attribute values may contain '>', so tags are matched attribute by attribute
+_ATTRS = r"""(?:[^>"']|"[^"]*"|'[^']*')*"""
+_TOKEN_RE = re.compile(
+    rf"<!--.*?-->|<(?P<tag>meta|script|style)(?=[\s/>])(?P<attrs>{_ATTRS})>",
+    re.IGNORECASE | re.DOTALL,
+)
+_ATTR_RE = re.compile(
+    r"""(?P<name>[^\s"'>/=]+)(?:\s*=\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<uq>[^\s"'=<>`]+)))?"""
+)
+_CLOSE_RE = {
+    "script": re.compile(r"</script\s*>", re.IGNORECASE),
+    "style": re.compile(r"</style\s*>", re.IGNORECASE),
+}
+
+
+def _parse_attrs(raw):
+    attrs = {}
+    for m in _ATTR_RE.finditer(raw):
+        value = m.group("dq")
+        if value is None:
+            value = m.group("sq")
+        if value is None:
+            value = m.group("uq") or ""
+        attrs[m.group("name").lower()] = html.unescape(value)
+    return attrs
+
+
+def _scan(text):
+    """One regex pass over ``text``: first meta tag per property, plus JSON-LD bodies.
+
+    Comments are skipped, and script/style bodies are not searched for tags,
+    matching what a parser would see.
+    """
+    metas = {}
+    json_ld = []
+    pos = 0
+    while True:
+        m = _TOKEN_RE.search(text, pos)
+        if not m:
+            break
+        pos = m.end()
+        tag = m.group("tag")
+        if tag is None:
+            continue
+        tag = tag.lower()
+        if tag == "meta":
+            attrs = _parse_attrs(m.group("attrs"))
+            prop = attrs.get("property")
+            if prop in META_PROPERTIES and prop not in metas:
+                metas[prop] = attrs.get("content", "")
+            continue
+        close = _CLOSE_RE[tag].search(text, pos)
+        end = close.start() if close else len(text)
+        if tag == "script" and _parse_attrs(m.group("attrs")).get("type") == "application/ld+json":
+            json_ld.append(text[pos:end])
+        pos = close.end() if close else len(text)
+    return metas, json_ld
+
+
+def _from_meta(metas):
+    """Starting fields from Open Graph values (``None`` where a tag is absent)."""
+    fields = {"name": None, "price_text": None, "image_url": None, "currency": None}
+    if "og:title" in metas:
+        fields["name"] = metas["og:title"].strip()
+    if "og:image" in metas:
+        fields["image_url"] = metas["og:image"].strip()
+    price = metas.get("product:price:amount", metas.get("og:price:amount"))
+    if price is not None:
+        fields["price_text"] = price.strip()
+    fields["currency"] = metas.get("product:price:currency", metas.get("og:price:currency"))
+    return fields
+
+
+def _apply_json_ld(fields, blocks):
+    """Fill missing fields from any JSON-LD ``Product`` objects."""
+    for block in blocks:
+        try:
+            data = json.loads(block)
+            items = data if isinstance(data, list) else [data]
+            for item in items:
+                if isinstance(item, dict) and item.get("@type") in ("Product", "product"):
+                    if not fields["name"] and item.get("name"):
+                        fields["name"] = str(item["name"]).strip()
+                    if not fields["image_url"]:
+                        img = item.get("image")
+                        if isinstance(img, list) and img:
+                            fields["image_url"] = img[0]
+                        elif isinstance(img, str):
+                            fields["image_url"] = img
+                    if not fields["price_text"]:
+                        offers = item.get("offers", {})
+                        if isinstance(offers, list) and offers:
+                            offers = offers[0]
+                        if isinstance(offers, dict):
+                            fields["price_text"] = str(offers.get("price", ""))
+        except Exception:
+            pass
+
+
+def _finish(fields, domain):
+    name = fields["name"]
+    price_text = fields["price_text"]
+    currency_str = fields["currency"] or ""
+    currency = currency_str.upper() if currency_str and len(currency_str) == 3 else \
+               detect_currency(price_text or "", domain)
+
+    price = extract_price(price_text) if price_text else None
+
+    if name:
+        name = " ".join(name.split())[:200]
+
+    return {
+        "name": name or "",
+        "price": price,
+        "currency": currency,
+        "image_url": fields["image_url"] or "",
+    }
+
+
+def extract_fast(text: str, domain: str):
+    """Extract from meta tags and JSON-LD without building a DOM.
+
+    Returns ``None`` when name, price or image is still missing, in which
+    case the caller should fall back to ``extract_dom``.
+    """
+    metas, json_ld = _scan(text)
+    fields = _from_meta(metas)
+    _apply_json_ld(fields, json_ld)
+    if not (fields["name"] and fields["price_text"] and fields["image_url"]):
+        return None
+    return _finish(fields, domain)
+
+
+def extract_dom(text: str, domain: str, parser: str = None) -> dict:
+    """Full extraction on a BeautifulSoup tree, including CSS selector fallbacks."""
+    soup = BeautifulSoup(text, parser or SCRAPER_PARSER)
+
+    metas = {}
+    for prop in META_PROPERTIES:
+        tag = soup.find("meta", property=prop)
+        if tag:
+            metas[prop] = tag.get("content", "")
+    fields = _from_meta(metas)
+    _apply_json_ld(fields, [script.string or "" for script in soup.find_all("script", type="application/ld+json")])
+
+    if not fields["name"]:
+        for selector in NAME_SELECTORS:
+            el = soup.select_one(selector)
+            if el and el.get_text(strip=True):
+                fields["name"] = el.get_text(strip=True)
+                break
+
+    if not fields["price_text"]:
+        for selector in PRICE_SELECTORS:
+            el = soup.select_one(selector)
+            if el and el.get_text(strip=True):
+                fields["price_text"] = el.get_text(strip=True)
+                break
+
+    if not fields["image_url"]:
+        for selector in IMAGE_SELECTORS:
+            el = soup.select_one(selector)
+            if el and el.get("src"):
+                fields["image_url"] = el["src"]
+                break
+
+    if not fields["name"] and soup.title:
+        raw = soup.title.string or ""
+        fields["name"] = re.split(r"[|\-–—]", raw)[0].strip()
+
+    return _finish(fields, domain)
+
+
+def extract_product(text: str, domain: str, engine: str = None) -> dict:
+    """Extract name, price, currency and image from a product page."""
+    if (engine or SCRAPER_EXTRACTOR) == "fast":
+        result = extract_fast(text, domain)
+        if result is not None:
+            return result
+    return extract_dom(text, domain)
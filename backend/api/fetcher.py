@@ -0,0 +1,117 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+import httpx
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+SCRAPER_CONNECT_TIMEOUT = float(os.environ.get("SCRAPER_CONNECT_TIMEOUT", "5"))
+SCRAPER_READ_TIMEOUT = float(os.environ.get("SCRAPER_READ_TIMEOUT", "10"))
+# Stop reading a page after this many bytes; product metadata lives in <head>
+SCRAPER_MAX_BYTES = int(os.environ.get("SCRAPER_MAX_BYTES", str(2 * 1024 * 1024)))
+SCRAPER_MAX_CONNECTIONS = int(os.environ.get("SCRAPER_MAX_CONNECTIONS", "100"))
+SCRAPER_MAX_PER_HOST = int(os.environ.get("SCRAPER_MAX_PER_HOST", "4"))
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/124.0.0.0 Safari/537.36"
+    ),
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+}
+
+
+class FetchResult:
+    __slots__ = ("url", "status_code", "text", "truncated")
+
+    def __init__(self, url, status_code, text, truncated):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.truncated = truncated
+
+
+class Fetcher:
+    """Shared async HTTP client for the scraper.
+
+    One keep-alive connection pool per worker (HTTP/2 when ``h2`` is
+    installed), with at most ``max_per_host`` concurrent requests to any
+    single retailer and a cap on how much of a page is read.
+    """
+
+    def __init__(self, connect_timeout=SCRAPER_CONNECT_TIMEOUT, read_timeout=SCRAPER_READ_TIMEOUT,
+                 max_bytes=SCRAPER_MAX_BYTES, max_connections=SCRAPER_MAX_CONNECTIONS,
+                 max_per_host=SCRAPER_MAX_PER_HOST):
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.max_bytes = max_bytes
+        self.max_per_host = max_per_host
+        self._client = None
+        self._host_slots = {}  # host -> [Semaphore, users]
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                headers=DEFAULT_HEADERS,
+                timeout=self.timeout,
+                limits=self.limits,
+                follow_redirects=True,
+            )
+        return self._client
+
+    @asynccontextmanager
+    async def _host_slot(self, host):
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = [asyncio.Semaphore(self.max_per_host), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                yield
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:
+                del self._host_slots[host]
+
+    async def fetch(self, url) -> FetchResult:
+        """GET ``url`` and return its decoded body, read up to ``max_bytes``.
+
+        Raises ``httpx.HTTPError`` subclasses on network errors, timeouts and
+        non-2xx responses.
+        """
+        host = urlparse(url).netloc.lower()
+        async with self._host_slot(host):
+            async with self._get_client().stream("GET", url) as resp:
+                resp.raise_for_status()
+                chunks = []
+                size = 0
+                truncated = False
+                async for chunk in resp.aiter_bytes():
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= self.max_bytes:
+                        truncated = True
+                        break
+                body = b"".join(chunks)[:self.max_bytes]
+                encoding = resp.charset_encoding or "utf-8"
+                try:
+                    text = body.decode(encoding, errors="replace")
+                except LookupError:
+                    text = body.decode("utf-8", errors="replace")
+                return FetchResult(str(resp.url), resp.status_code, text, truncated)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+fetcher = Fetcher()
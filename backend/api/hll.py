@@ -0,0 +1,124 @@
+import hashlib
+import math
+
+# HyperLogLog distinct counter with 2^12 registers. The standard error of an
+# estimate is 1.04 / sqrt(4096), about 1.6%: within ±3.3% about 95% of the
+# time. Small sets fall back to linear counting, which is close to exact.
+# Sketches merge by register-wise max, so the union of any number of days
+# costs the same as one day and never double counts a viewer.
+P = 12
+M = 1 << P
+STANDARD_ERROR = 1.04 / math.sqrt(M)
+
+_ALPHA = 0.7213 / (1 + 1.079 / M)
+_RANK_BITS = 64 - P
+_INV_POW2 = [2.0 ** -r for r in range(_RANK_BITS + 2)]
+
+# Serialized form: one format byte, the precision, then the registers.
+# Sparse sketches store (index: uint16, rank: uint8) per non-zero register
+# and are converted to dense once that would outgrow the M-byte array.
+_SPARSE = 0
+_DENSE = 1
+_SPARSE_MAX = M // 3
+
+# Ranks are at most 53, so each register byte has a free top bit. Dense
+# merges treat the register array as one big int and take the byte-wise max
+# with a borrow-guarded subtraction, instead of a Python loop over M bytes.
+_HIGH_BITS = int.from_bytes(b"\x80" * M, "big")
+_ALL_BITS = (1 << (8 * M)) - 1
+
+
+def _hash(value):
+    # Stable across processes, unlike hash(): sketches are stored and merged
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch.
+
+    Not thread-safe. ``to_bytes``/``from_bytes`` round-trip through a
+    ``BYTEA`` column; sketches with fewer than ~1365 set registers stay in
+    the compact sparse form.
+    """
+
+    __slots__ = ("_sparse", "_dense")
+
+    def __init__(self):
+        self._sparse = {}
+        self._dense = None
+
+    def add(self, value):
+        h = _hash(value)
+        rest = h & ((1 << _RANK_BITS) - 1)
+        self._set(h >> _RANK_BITS, _RANK_BITS - rest.bit_length() + 1)
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+        return self
+
+    def _set(self, index, rank):
+        if self._dense is not None:
+            if rank > self._dense[index]:
+                self._dense[index] = rank
+        elif rank > self._sparse.get(index, 0):
+            self._sparse[index] = rank
+            if len(self._sparse) > _SPARSE_MAX:
+                self._densify()
+
+    def _densify(self):
+        dense = bytearray(M)
+        for index, rank in self._sparse.items():
+            dense[index] = rank
+        self._dense = dense
+        self._sparse = {}
+
+    def merge(self, other):
+        """Fold ``other`` into this sketch and return it."""
+        if other._dense is None:
+            for index, rank in other._sparse.items():
+                self._set(index, rank)
+        else:
+            if self._dense is None:
+                self._densify()
+            a = int.from_bytes(self._dense, "big")
+            b = int.from_bytes(other._dense, "big")
+            # High bit of each byte of the difference is set where a >= b
+            a_wins = (((a | _HIGH_BITS) - b) & _HIGH_BITS) >> 7
+            mask = a_wins * 0xFF
+            self._dense = bytearray(((a & mask) | (b & ~mask & _ALL_BITS)).to_bytes(M, "big"))
+        return self
+
+    def estimate(self):
+        if self._dense is None:
+            zeros = M - len(self._sparse)
+            total = zeros + sum(_INV_POW2[rank] for rank in self._sparse.values())
+        else:
+            zeros = self._dense.count(0)
+            total = sum(self._dense.count(rank) * _INV_POW2[rank] for rank in range(max(self._dense) + 1))
+        raw = _ALPHA * M * M / total
+        if raw <= 2.5 * M and zeros:
+            return round(M * math.log(M / zeros))
+        return round(raw)
+
+    def to_bytes(self):
+        if self._dense is not None:
+            return bytes((_DENSE, P)) + self._dense
+        out = bytearray((_SPARSE, P))
+        for index in sorted(self._sparse):
+            out += index.to_bytes(2, "big")
+            out.append(self._sparse[index])
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        if len(data) < 2 or data[1] != P:
+            raise ValueError("Not a HyperLogLog sketch with precision %d" % P)
+        sketch = cls()
+        if data[0] == _DENSE:
+            sketch._dense = bytearray(data[2:])
+        else:
+            for offset in range(2, len(data), 3):
+                sketch._sparse[int.from_bytes(data[offset:offset + 2], "big")] = data[offset + 2]
+        return sketch
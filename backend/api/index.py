@@ -1,4 +1,6 @@
+import logging
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
@@ -8,8 +10,47 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 
 load_dotenv()
 
+from .log import setup_logging, start_logging, stop_logging, current_request_id
 from .limiter import limiter
-from .routers import auth, wishlists, items, discovery, admin, scraper
+from .metrics import rate_limited, route_label
+from .middleware import RequestContextMiddleware
+from .responses import ORJSONResponse
+from .database import open_pool, close_pool, get_database_url
+from .view_buffer import view_buffer
+from .discovery_feed import discovery_feed
+from .view_rollups import view_rollups
+from .like_counter import like_counter
+from .utils import shutdown_hashing
+from .fetcher import fetcher
+from .routers import auth, wishlists, items, discovery, admin, scraper, search, metrics
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# ── Lifespan ─────────────────────────────────────────────────────────
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_logging()
+    if get_database_url():
+        try:
+            await open_pool()
+        except Exception as e:
+            # Don't block startup; get_db will retry lazily on first request
+            logger.warning("Could not open database pool at startup: %s", e)
+    view_buffer.start()
+    discovery_feed.start()
+    view_rollups.start()
+    like_counter.start()
+    yield
+    await like_counter.stop()
+    await view_rollups.stop()
+    await discovery_feed.stop()
+    await view_buffer.stop()
+    await close_pool()
+    await fetcher.close()
+    shutdown_hashing()
+    stop_logging()
 
 # ── App Setup ────────────────────────────────────────────────────────
 
@@ -17,20 +58,17 @@ app = FastAPI(
     title="Wishly API",
     description="Backend API for the Wishly wishlist platform",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
-# Security Headers Middleware
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    response = await call_next(request)
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Strict-Transport-Security"] = "max-age=63072000; includeSubDomains; preload"
-    return response
+
+def rate_limit_exceeded(request: Request, exc: RateLimitExceeded):
+    rate_limited.inc((route_label(request.scope),))
+    return _rate_limit_exceeded_handler(request, exc)
+
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded)
 
 # ── Middlewares ──────────────────────────────────────────────────────
 
@@ -41,15 +79,20 @@ origins = [
     "https://wishlyst.up.railway.app",
 ]
 
+# Security headers, request ID, query count, Server-Timing, metrics, access log
+app.add_middleware(RequestContextMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients read the keyset pagination cursor, request ID and timings
+    expose_headers=["X-Next-Cursor", "X-Request-ID", "Server-Timing"],
 )
 
-# Global Exception Handler for debugging
+# Global Exception Handler; RequestContextMiddleware has already logged the traceback
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     if isinstance(exc, StarletteHTTPException):
@@ -58,12 +101,11 @@ async def global_exception_handler(request: Request, exc: Exception):
             status_code=exc.status_code
         )
     
-    import traceback
-    print(f"ERROR: Unhandled exception in {request.url.path}")
-    print(traceback.format_exc())
+    request_id = current_request_id()
     return Response(
         content=f"Internal Server Error: {str(exc)}",
-        status_code=500
+        status_code=500,
+        headers={"X-Request-ID": request_id} if request_id else None,
     )
 
 # ── Routes ───────────────────────────────────────────────────────────
@@ -74,6 +116,8 @@ app.include_router(items.router)
 app.include_router(discovery.router)
 app.include_router(admin.router)
 app.include_router(scraper.router)
+app.include_router(search.router)
+app.include_router(metrics.router)
 
 # ── Health Check & Debug ─────────────────────────────────────────────
 
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+import random
+import time
+
+from .database import db_connection
+
+logger = logging.getLogger(__name__)
+
+# Shard rows a wishlist's new likes are spread over; concurrent likes on one
+# wishlist only wait for each other when they pick the same shard
+LIKE_COUNTER_SHARDS = int(os.environ.get("LIKE_COUNTER_SHARDS", "16"))
+# How often shard totals are merged into wishlists.like_count
+LIKE_MERGE_INTERVAL = float(os.environ.get("LIKE_MERGE_INTERVAL", "10"))
+
+# pg advisory lock key so only one worker merges at a time
+MERGE_LOCK_KEY = 5_301_100_019
+
+# Records the like and bumps a shard in one statement. No row when the
+# wishlist doesn't exist; liked = 0 when this IP already liked it. The final
+# SELECT doesn't see the CTEs' writes, hence the + liked.
+LIKE_SQL = """
+    WITH w AS (
+        SELECT id, like_count FROM wishlists WHERE slug = %(slug)s
+    ),
+    liked AS (
+        INSERT INTO wishlist_likes (wishlist_id, viewer_ip)
+        SELECT id, %(viewer_ip)s FROM w
+        ON CONFLICT (wishlist_id, viewer_ip) DO NOTHING
+        RETURNING wishlist_id
+    ),
+    counted AS (
+        INSERT INTO wishlist_like_shards (wishlist_id, shard, likes)
+        SELECT wishlist_id, %(shard)s, 1 FROM liked
+        ON CONFLICT (wishlist_id, shard) DO UPDATE SET likes = wishlist_like_shards.likes + 1
+    )
+    SELECT (SELECT COUNT(*) FROM liked) AS liked,
+           w.like_count
+               + COALESCE((SELECT SUM(likes) FROM wishlist_like_shards s WHERE s.wishlist_id = w.id), 0)
+               + (SELECT COUNT(*) FROM liked) AS like_count
+    FROM w
+"""
+
+# Moves every shard into wishlists.like_count. Deleting the shards and
+# raising like_count commit together, so a reader adding the two never sees
+# a like twice or not at all. A like that hits a shard being deleted waits
+# for this transaction, then starts a fresh shard row.
+MERGE_SQL = """
+    WITH drained AS (
+        DELETE FROM wishlist_like_shards RETURNING wishlist_id, likes
+    ),
+    totals AS (
+        SELECT wishlist_id, SUM(likes) AS likes FROM drained GROUP BY wishlist_id
+    ),
+    merged AS (
+        UPDATE wishlists w SET like_count = w.like_count + t.likes
+        FROM totals t
+        WHERE w.id = t.wishlist_id
+        RETURNING t.likes
+    )
+    SELECT COUNT(*) AS wishlists, COALESCE(SUM(likes), 0) AS likes FROM merged
+"""
+
+
+def like_count_sql(wishlist="w"):
+    """Current like count of the wishlists row aliased ``wishlist``."""
+    return (
+        f"({wishlist}.like_count + COALESCE((SELECT SUM(s.likes) FROM wishlist_like_shards s "
+        f"WHERE s.wishlist_id = {wishlist}.id), 0))"
+    )
+
+
+async def record_like(cur, slug, viewer_ip, shards=LIKE_COUNTER_SHARDS):
+    """Like ``slug`` as ``viewer_ip``.
+
+    Returns ``{"liked": 0 or 1, "like_count": ...}``, or None when there is
+    no such wishlist.
+    """
+    await cur.execute(LIKE_SQL, {"slug": slug, "viewer_ip": viewer_ip, "shard": random.randrange(shards)})
+    return await cur.fetchone()
+
+
+class LikeCounter:
+    """Background merge of the sharded like counters.
+
+    Every ``interval`` seconds one worker, under a Postgres advisory lock,
+    folds ``wishlist_like_shards`` into ``wishlists.like_count``. That is
+    one row update per liked wishlist per interval, however many likes it
+    got. like_count doesn't bump the wishlist's version, so a merge leaves
+    cached pages and ETags alone.
+    """
+
+    def __init__(self, interval=LIKE_MERGE_INTERVAL):
+        self.interval = interval
+
+        self._task = None
+
+        self._stats = {
+            "runs": 0,
+            "merged_likes": 0,
+            "merged_wishlists": 0,
+            "failed_runs": 0,
+            "last_run_ms": 0.0,
+        }
+
+    async def merge(self):
+        start = time.perf_counter()
+        async with db_connection() as conn:
+            cur = conn.cursor()
+            await cur.execute("SELECT pg_try_advisory_xact_lock(%s) AS locked", (MERGE_LOCK_KEY,))
+            if not (await cur.fetchone())["locked"]:
+                return
+            await cur.execute(MERGE_SQL)
+            merged = await cur.fetchone()
+        self._stats["runs"] += 1
+        self._stats["merged_likes"] += merged["likes"]
+        self._stats["merged_wishlists"] += merged["wishlists"]
+        self._stats["last_run_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.merge()
+            except Exception:
+                logger.exception("Like counter merge failed")
+                self._stats["failed_runs"] += 1
+
+    def stats(self):
+        return dict(self._stats)
+
+
+like_counter = LikeCounter()
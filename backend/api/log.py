@@ -0,0 +1,167 @@
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+# ── Configuration ────────────────────────────────────────────────────
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# "json" for production log pipelines, "text" for reading in a terminal
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+# Records waiting for the writer thread; beyond this they are dropped, never waited on
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+# Share of successful requests that get an access log line.
+# Errors (status >= 400) and slow requests are always logged.
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "1.0"))
+LOG_SLOW_REQUEST_MS = float(os.environ.get("LOG_SLOW_REQUEST_MS", "1000"))
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# ── Request IDs ──────────────────────────────────────────────────────
+# Taken from the caller's X-Request-ID when it looks sane (so a proxy's ID
+# follows the request through our logs), otherwise generated.
+
+_REQUEST_ID_RE = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+
+def start_request(incoming_id: str | None) -> str:
+    request_id = incoming_id if incoming_id and _REQUEST_ID_RE.fullmatch(incoming_id) else uuid.uuid4().hex
+    _request_id.set(request_id)
+    return request_id
+
+
+def current_request_id() -> str | None:
+    return _request_id.get()
+
+
+# ── Formatting ───────────────────────────────────────────────────────
+
+# Attributes every LogRecord has; anything else came in through ``extra=``
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: fixed fields first, then any ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+# ── Queue Handler ────────────────────────────────────────────────────
+# Loggers only put records on a queue; a QueueListener thread formats them
+# and writes to stdout. A burst of errors never blocks the event loop on I/O.
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Runs in the caller's thread: resolve what only exists here (message
+        # args, the live traceback, the request ID) and leave the JSON to the
+        # writer thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        if not hasattr(record, "request_id"):
+            request_id = _request_id.get()
+            if request_id is not None:
+                record.request_id = request_id
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_traceback_formatter = logging.Formatter()
+_queue = queue.Queue(LOG_QUEUE_SIZE)
+_handler = _QueueHandler(_queue)
+_listener = None
+
+
+def setup_logging():
+    """Send everything logged under ``api.*`` through the queue. Idempotent."""
+    logger = logging.getLogger("api")
+    if _handler not in logger.handlers:
+        logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    # Uvicorn configures the root logger with its own format
+    logger.propagate = False
+
+
+def start_logging():
+    """Start the writer thread. Records logged before this wait in the queue."""
+    global _listener
+    if _listener is None:
+        out = logging.StreamHandler(sys.stdout)
+        out.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+        _listener = logging.handlers.QueueListener(_queue, out)
+        _listener.start()
+
+
+def stop_logging():
+    """Write out whatever is queued and stop the writer thread."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def log_stats():
+    return {"queued": _queue.qsize(), "dropped": _handler.dropped}
+
+
+# ── Access Log ───────────────────────────────────────────────────────
+
+access_logger = logging.getLogger("api.access")
+
+
+def log_request(method, path, status, duration, query_stats, exc_info=False):
+    duration_ms = duration * 1000
+    if status < 400 and duration_ms < LOG_SLOW_REQUEST_MS and random.random() >= LOG_SAMPLE_RATE:
+        return
+    access_logger.log(
+        logging.ERROR if status >= 500 else logging.INFO,
+        "%s %s %s",
+        method,
+        path,
+        status,
+        exc_info=exc_info,
+        extra={
+            "method": method,
+            "path": path,
+            "status": status,
+            "duration_ms": round(duration_ms, 2),
+            "db_ms": round(query_stats.time * 1000, 2),
+            "db_queries": query_stats.count,
+        },
+    )
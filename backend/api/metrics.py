@@ -0,0 +1,173 @@
+from bisect import bisect_left
+
+# Prometheus metrics, kept in plain dicts and rendered on scrape. Recording a
+# sample is a dict lookup, a bisect and two additions, cheap enough for every
+# request and every SQL statement. Values another module already tracks
+# (cache counters, pool and queue sizes) are read by collectors at scrape
+# time instead. Like the rest of our in-memory stats, values are per worker.
+
+# Seconds; tuned for API latencies from sub-millisecond cache hits to slow scrapes
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra="") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}  # label values tuple -> count
+
+    def inc(self, labels=(), amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values tuple -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value, labels=()):
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        bounds = [repr(float(b)) for b in self.buckets] + ["+Inf"]
+        for labels, series in self._values.items():
+            # Stored per bucket; the exposition format wants running totals
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                le = 'le="' + bound + '"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class BoundedLabel:
+    """Pass through the first ``limit`` distinct values, then report "other".
+
+    For labels taken from user input (scraped domains), so a crawler can't
+    grow the series count without bound.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._seen = set()
+
+    def __call__(self, value):
+        if value in self._seen:
+            return value
+        if len(self._seen) < self.limit:
+            self._seen.add(value)
+            return value
+        return "other"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        """Register ``fn() -> [(name, type, help, [(labels dict, value), ...]), ...]``.
+
+        Called at scrape time, for values another module already tracks.
+        """
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, kind, documentation, samples in collect():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+        lines.append("")
+        return "\n".join(lines)
+
+
+registry = Registry()
+
+# ── Metrics recorded on the hot path ─────────────────────────────────
+
+http_request_duration = registry.histogram(
+    "wishly_http_request_duration_seconds",
+    "HTTP request latency by route template and status; _count is the request count.",
+    ("method", "route", "status"),
+)
+db_query_duration = registry.histogram(
+    "wishly_db_query_duration_seconds",
+    "Time from sending an SQL statement to having its result.",
+    buckets=DB_BUCKETS,
+)
+db_query_errors = registry.counter(
+    "wishly_db_query_errors_total",
+    "SQL statements that raised.",
+)
+scrape_domain = BoundedLabel(100)
+scrape_fetch_duration = registry.histogram(
+    "wishly_scrape_fetch_seconds",
+    "Product page download time by domain and outcome (ok, timeout, error).",
+    ("domain", "outcome"),
+)
+scrape_parse_duration = registry.histogram(
+    "wishly_scrape_parse_seconds",
+    "Product extraction time by domain.",
+    ("domain",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+rate_limited = registry.counter(
+    "wishly_rate_limited_total",
+    "Requests rejected by the rate limiter, by route template.",
+    ("route",),
+)
+
+
+def route_label(scope) -> str:
+    """The matched route's path template, so /api/wishlists/{slug} is one series."""
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
@@ -0,0 +1,83 @@
+import os
+import time
+
+from .database import start_query_stats
+from .log import log_request, start_request
+from .metrics import http_request_duration, route_label
+
+# Added to every response; encoded once at import instead of per request
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=63072000; includeSubDomains; preload"),
+]
+
+# X-DB-Query-Count and the db entry of Server-Timing show how many statements
+# each endpoint runs, which is for developers, not clients. Off unless
+# DEBUG_HEADERS=1; the test server (ENV=test) turns them on for its assertions.
+DEBUG_HEADERS = os.environ.get("DEBUG_HEADERS", "1" if os.environ.get("ENV") == "test" else "0") == "1"
+
+
+class RequestContextMiddleware:
+    """Per-request bookkeeping as a plain ASGI middleware.
+
+    Starts the request ID and query stats, then adds the security headers,
+    X-Request-ID and Server-Timing (plus X-DB-Query-Count with
+    ``DEBUG_HEADERS``) to ``http.response.start``. No extra task and no body copy, unlike
+    ``@app.middleware("http")``, so streaming responses pass straight
+    through. Latency metrics and the access log line are recorded once the
+    last body chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                incoming_id = value.decode("latin-1")
+                break
+        request_id = start_request(incoming_id)
+        query_stats = start_query_stats()
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_headers(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Time to headers: the handler's work, not the body transfer
+                app_ms = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", ()))
+                headers.extend(SECURITY_HEADERS)
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                if DEBUG_HEADERS:
+                    headers.append((b"x-db-query-count", b"%d" % query_stats.count))
+                    headers.append((
+                        b"server-timing",
+                        b"app;dur=%.1f, db;dur=%.1f;desc=\"%d queries\"" % (app_ms, query_stats.time * 1000, query_stats.count),
+                    ))
+                else:
+                    headers.append((b"server-timing", b"app;dur=%.1f" % app_ms))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        except Exception:
+            # The 500 itself is rendered by the app's exception handler, outside us
+            self._record(scope, 500, started, query_stats, exc_info=True)
+            raise
+        self._record(scope, status, started, query_stats)
+
+    @staticmethod
+    def _record(scope, status, started, query_stats, exc_info=False):
+        duration = time.perf_counter() - started
+        http_request_duration.observe(duration, (scope["method"], route_label(scope), status))
+        log_request(scope["method"], scope["path"], status, duration, query_stats, exc_info=exc_info)
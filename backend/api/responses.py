@@ -0,0 +1,36 @@
+from decimal import Decimal
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+
+def _default(obj):
+    # NUMERIC columns (prices) come back as Decimal; clients expect numbers
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    """orjson handles UUID, datetime and date natively; Decimal goes through _default."""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def json_response(content, response: Response = None, status_code: int = 200) -> ORJSONResponse:
+    """Serialize DB rows straight to bytes.
+
+    Returning a dict makes FastAPI walk it with jsonable_encoder before the
+    response class ever sees it; returning a response skips that pass.
+    Headers already set on an injected ``response`` (pagination cursors,
+    cache validators) are carried over.
+    """
+    result = ORJSONResponse(content, status_code=status_code)
+    if response is not None:
+        result.headers.raw.extend(response.headers.raw)
+    return result
@@ -1,10 +1,20 @@
 import uuid
-import psycopg2
-from fastapi import APIRouter, Depends, HTTPException, Request
-from ..database import get_db
+import psycopg
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from ..database import get_db, pool_stats
 from ..schemas import AdminPasswordReset, PromotedItemCreate, PromotedWishlistCreate
-from ..utils import hash_password
-from ..deps import get_admin_user
+from ..utils import hash_password_async, hashing_stats
+from ..deps import get_admin_user, invalidate_user_sessions, session_cache
+from ..view_buffer import view_buffer
+from ..view_rollups import daily_views_sql, estimate_unique_viewers, view_rollups
+from ..like_counter import like_count_sql, like_counter
+from ..hll import STANDARD_ERROR
+from ..scrape_cache import scrape_cache
+from ..discovery_feed import discovery_feed
+from ..pagination import CreatedAtPage
+from ..responses import json_response
+from ..log import log_stats
+from .wishlists import public_wishlist_cache
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
@@ -12,20 +22,20 @@ router = APIRouter(prefix="/api/admin", tags=["Admin"])
 async def get_admin_stats(admin=Depends(get_admin_user), db=Depends(get_db)):
     cur = db.cursor()
     
-    cur.execute("SELECT COUNT(*) FROM users")
-    total_users = cur.fetchone()["count"]
+    await cur.execute("SELECT COUNT(*) FROM users")
+    total_users = (await cur.fetchone())["count"]
     
-    cur.execute("SELECT COUNT(*) FROM wishlists")
-    total_wishlists = cur.fetchone()["count"]
+    await cur.execute("SELECT COUNT(*) FROM wishlists")
+    total_wishlists = (await cur.fetchone())["count"]
     
-    cur.execute("SELECT SUM(view_count) FROM wishlists")
-    total_views = cur.fetchone()["sum"] or 0
+    await cur.execute("SELECT SUM(view_count) FROM wishlists")
+    total_views = (await cur.fetchone())["sum"] or 0
     
-    cur.execute("SELECT COUNT(*) FROM wishlist_likes")
-    total_likes = cur.fetchone()["count"]
+    await cur.execute("SELECT COUNT(*) FROM wishlist_likes")
+    total_likes = (await cur.fetchone())["count"]
     
-    cur.execute("SELECT COUNT(*) FROM users WHERE created_at >= NOW() - INTERVAL '30 days'")
-    new_users_30d = cur.fetchone()["count"]
+    await cur.execute("SELECT COUNT(*) FROM users WHERE created_at >= NOW() - INTERVAL '30 days'")
+    new_users_30d = (await cur.fetchone())["count"]
     
     return {
         "total_users": total_users,
@@ -35,106 +45,124 @@ async def get_admin_stats(admin=Depends(get_admin_user), db=Depends(get_db)):
         "new_users_30d": new_users_30d,
     }
 
+@router.get("/runtime")
+async def get_admin_runtime(admin=Depends(get_admin_user)):
+    return {
+        "db_pool": pool_stats(),
+        "view_buffer": view_buffer.stats(),
+        "view_rollups": view_rollups.stats(),
+        "like_counter": like_counter.stats(),
+        "session_cache": session_cache.stats(),
+        "password_hashing": hashing_stats(),
+        "scrape_cache": scrape_cache.stats(),
+        "discovery_feed": discovery_feed.stats(),
+        "public_wishlist_cache": public_wishlist_cache.stats(),
+        "logging": log_stats(),
+    }
+
 @router.get("/users")
-async def get_admin_users(admin=Depends(get_admin_user), db=Depends(get_db)):
+async def get_admin_users(response: Response, page: CreatedAtPage = Depends(), admin=Depends(get_admin_user), db=Depends(get_db)):
     cur = db.cursor()
-    cur.execute("""
+    await cur.execute(f"""
         SELECT u.id, u.email, u.name, u.is_admin, u.created_at,
                (SELECT COUNT(*) FROM wishlists WHERE user_id = u.id) as wishlist_count
         FROM users u
-        ORDER BY u.created_at DESC
-    """)
-    rows = cur.fetchall()
-    for row in rows:
-        row["id"] = str(row["id"])
-        row["created_at"] = row["created_at"].isoformat()
-    return rows
+        WHERE {page.condition('u')}
+        ORDER BY u.created_at DESC, u.id DESC
+        LIMIT %(limit)s
+    """, page.params)
+    return json_response(page.trim(await cur.fetchall(), response), response)
 
 @router.get("/wishlists")
-async def get_admin_wishlists(admin=Depends(get_admin_user), db=Depends(get_db)):
+async def get_admin_wishlists(response: Response, page: CreatedAtPage = Depends(), admin=Depends(get_admin_user), db=Depends(get_db)):
     cur = db.cursor()
-    cur.execute("""
-        SELECT w.id, w.title, w.slug, w.view_count, w.like_count, w.is_public, w.created_at,
-               u.name as owner_name, u.email as owner_email,
-               (SELECT COUNT(*) FROM wishlist_items WHERE wishlist_id = w.id) as item_count
+    await cur.execute(f"""
+        SELECT w.id, w.title, w.slug, w.view_count, {like_count_sql('w')} AS like_count, w.is_public, w.created_at,
+               u.name as owner_name, u.email as owner_email, w.item_count
         FROM wishlists w
         JOIN users u ON w.user_id = u.id
-        ORDER BY w.created_at DESC
-    """)
-    rows = cur.fetchall()
-    for row in rows:
-        row["id"] = str(row["id"])
-        row["created_at"] = row["created_at"].isoformat()
-    return rows
+        WHERE {page.condition('w')}
+        ORDER BY w.created_at DESC, w.id DESC
+        LIMIT %(limit)s
+    """, page.params)
+    return json_response(page.trim(await cur.fetchall(), response), response)
+
+@router.get("/wishlists/{wishlist_id}/viewers")
+async def get_admin_wishlist_viewers(wishlist_id: str, admin=Depends(get_admin_user), db=Depends(get_db)):
+    # Exact counts scan every raw view of the list; owners only get the estimates
+    cur = db.cursor()
+    await cur.execute("SELECT id FROM wishlists WHERE id = %s", (wishlist_id,))
+    if not await cur.fetchone():
+        raise HTTPException(status_code=404, detail="Wishlist not found")
+
+    await cur.execute("""
+        SELECT COUNT(DISTINCT viewer_ip) AS unique_viewers,
+               COUNT(DISTINCT viewer_ip) FILTER (
+                   WHERE viewed_at >= ((NOW() AT TIME ZONE 'UTC')::date - 30) AT TIME ZONE 'UTC'
+               ) AS unique_viewers_30d
+        FROM wishlist_views
+        WHERE wishlist_id = %s
+    """, (wishlist_id,))
+    exact = await cur.fetchone()
+    _, unique_viewers_30d, unique_viewers = await estimate_unique_viewers(cur, wishlist_id)
+
+    return json_response({
+        "exact": exact,
+        "estimated": {"unique_viewers": unique_viewers, "unique_viewers_30d": unique_viewers_30d},
+        "standard_error": STANDARD_ERROR,
+    })
 
 @router.get("/analytics")
 async def get_admin_analytics(admin=Depends(get_admin_user), db=Depends(get_db)):
     cur = db.cursor()
     
-    cur.execute("""
-        SELECT DATE(viewed_at) as date, COUNT(*) as views
-        FROM wishlist_views
-        WHERE viewed_at >= NOW() - INTERVAL '30 days'
-        GROUP BY DATE(viewed_at)
-        ORDER BY date ASC
-    """)
-    daily_views = [{"date": str(row["date"]), "views": row["views"]} for row in cur.fetchall()]
+    await cur.execute(daily_views_sql("TRUE"))
+    daily_views = await cur.fetchall()
     
-    cur.execute("""
+    await cur.execute("""
         SELECT DATE(created_at) as date, COUNT(*) as count
         FROM wishlists
         WHERE created_at >= NOW() - INTERVAL '30 days'
         GROUP BY DATE(created_at)
         ORDER BY date ASC
     """)
-    daily_wishlists = [{"date": str(row["date"]), "count": row["count"]} for row in cur.fetchall()]
+    daily_wishlists = await cur.fetchall()
     
-    return {
+    return json_response({
         "daily_views": daily_views,
         "daily_wishlists": daily_wishlists
-    }
+    })
 
 @router.get("/users/{user_id}")
 async def get_admin_user_detail(user_id: str, admin=Depends(get_admin_user), db=Depends(get_db)):
     cur = db.cursor()
     
-    cur.execute("SELECT id, email, name, is_admin, created_at FROM users WHERE id = %s", (user_id,))
-    user = cur.fetchone()
+    await cur.execute("SELECT id, email, name, is_admin, created_at FROM users WHERE id = %s", (user_id,))
+    user = await cur.fetchone()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user["id"] = str(user["id"])
-    user["created_at"] = user["created_at"].isoformat()
-    
-    cur.execute("""
-        SELECT id, title, slug, view_count, like_count, is_public, created_at,
-               (SELECT COUNT(*) FROM wishlist_items WHERE wishlist_id = wishlists.id) as item_count
-        FROM wishlists
+    await cur.execute(f"""
+        SELECT id, title, slug, view_count, {like_count_sql('w')} AS like_count, is_public, created_at, item_count
+        FROM wishlists w
         WHERE user_id = %s
         ORDER BY created_at DESC
     """, (user_id,))
-    wishlists = cur.fetchall()
-    for w in wishlists:
-        w["id"] = str(w["id"])
-        w["created_at"] = w["created_at"].isoformat()
-    
-    cur.execute("SELECT COUNT(*) FROM wishlists WHERE user_id = %s", (user_id,))
-    total_wishlists = cur.fetchone()["count"]
-    
-    cur.execute("SELECT SUM(view_count) FROM wishlists WHERE user_id = %s", (user_id,))
-    total_views = cur.fetchone()["sum"] or 0
-    
-    cur.execute("""
-        SELECT DATE(v.viewed_at) as date, COUNT(*) as views
-        FROM wishlist_views v
-        JOIN wishlists w ON v.wishlist_id = w.id
-        WHERE w.user_id = %s AND v.viewed_at >= NOW() - INTERVAL '30 days'
-        GROUP BY DATE(v.viewed_at)
-        ORDER BY date ASC
-    """, (user_id,))
-    daily_views = [{"date": str(row["date"]), "views": row["views"]} for row in cur.fetchall()]
+    wishlists = await cur.fetchall()
     
-    return {
+    await cur.execute("SELECT COUNT(*) FROM wishlists WHERE user_id = %s", (user_id,))
+    total_wishlists = (await cur.fetchone())["count"]
+    
+    await cur.execute("SELECT SUM(view_count) FROM wishlists WHERE user_id = %s", (user_id,))
+    total_views = (await cur.fetchone())["sum"] or 0
+    
+    await cur.execute(
+        daily_views_sql("wishlist_id IN (SELECT id FROM wishlists WHERE user_id = %(user_id)s)"),
+        {"user_id": user_id},
+    )
+    daily_views = await cur.fetchall()
+    
+    return json_response({
         "profile": user,
         "wishlists": wishlists,
         "stats": {
@@ -142,57 +170,57 @@ async def get_admin_user_detail(user_id: str, admin=Depends(get_admin_user), db=
             "total_views": total_views,
             "daily_views": daily_views
         }
-    }
+    })
 
 @router.post("/users/{user_id}/reset-password")
 async def admin_reset_password(user_id: str, body: AdminPasswordReset, admin=Depends(get_admin_user), db=Depends(get_db)):
     cur = db.cursor()
-    cur.execute("SELECT id FROM users WHERE id = %s", (user_id,))
-    if not cur.fetchone():
+    await cur.execute("SELECT id FROM users WHERE id = %s", (user_id,))
+    if not await cur.fetchone():
         raise HTTPException(status_code=404, detail="User not found")
     
-    new_pw_hash = hash_password(body.new_password)
-    cur.execute("UPDATE users SET password_hash = %s WHERE id = %s", (new_pw_hash, user_id))
-    db.commit()
+    new_pw_hash = await hash_password_async(body.new_password)
+    await cur.execute("UPDATE users SET password_hash = %s WHERE id = %s", (new_pw_hash, user_id))
+    await db.commit()
+    invalidate_user_sessions(user_id)
     
     return {"message": "User password reset successfully"}
 
 @router.get("/promoted")
-async def list_admin_promoted(admin=Depends(get_admin_user), db=Depends(get_db)):
+async def list_admin_promoted(response: Response, page: CreatedAtPage = Depends(), admin=Depends(get_admin_user), db=Depends(get_db)):
     cur = db.cursor()
-    cur.execute("SELECT * FROM promoted_items ORDER BY created_at DESC")
-    items = cur.fetchall()
-    for i in items:
-        i["id"] = str(i["id"])
-        i["created_at"] = i["created_at"].isoformat()
-    return items
+    await cur.execute(
+        f"SELECT * FROM promoted_items p WHERE {page.condition('p')} ORDER BY created_at DESC, id DESC LIMIT %(limit)s",
+        page.params,
+    )
+    return json_response(page.trim(await cur.fetchall(), response), response)
 
 @router.post("/promoted")
 async def create_promoted_item(body: PromotedItemCreate, admin=Depends(get_admin_user), db=Depends(get_db)):
     cur = db.cursor()
     item_id = str(uuid.uuid4())
-    cur.execute("""
+    await cur.execute("""
         INSERT INTO promoted_items (id, name, description, price, currency, url, image_url)
         VALUES (%s, %s, %s, %s, %s, %s, %s)
         RETURNING *
     """, (item_id, body.name, body.description, body.price, body.currency, body.url, body.image_url))
-    item = cur.fetchone()
-    db.commit()
-    item["id"] = str(item["id"])
-    item["created_at"] = item["created_at"].isoformat()
-    return item
+    item = await cur.fetchone()
+    await db.commit()
+    await discovery_feed.invalidate()
+    return json_response(item)
 
 @router.delete("/promoted/{item_id}")
 async def delete_promoted_item(item_id: str, admin=Depends(get_admin_user), db=Depends(get_db)):
     cur = db.cursor()
-    cur.execute("DELETE FROM promoted_items WHERE id = %s", (item_id,))
-    db.commit()
+    await cur.execute("DELETE FROM promoted_items WHERE id = %s", (item_id,))
+    await db.commit()
+    await discovery_feed.invalidate()
     return {"message": "Success"}
 
 @router.get("/promoted/wishlists")
 async def list_admin_promoted_wishlists(admin=Depends(get_admin_user), db=Depends(get_db)):
     cur = db.cursor()
-    cur.execute("""
+    await cur.execute("""
         SELECT pw.id, pw.wishlist_id, pw.category, pw.display_order, pw.created_at,
                w.title, w.slug, u.name as owner_name
         FROM promoted_wishlists pw
@@ -200,38 +228,32 @@ async def list_admin_promoted_wishlists(admin=Depends(get_admin_user), db=Depend
         JOIN users u ON w.user_id = u.id
         ORDER BY pw.display_order ASC, pw.created_at DESC
     """)
-    rows = cur.fetchall()
-    for row in rows:
-        row["id"] = str(row["id"])
-        row["wishlist_id"] = str(row["wishlist_id"])
-        row["created_at"] = row["created_at"].isoformat()
-    return rows
+    return json_response(await cur.fetchall())
 
 @router.post("/promoted/wishlists")
 async def create_promoted_wishlist(body: PromotedWishlistCreate, admin=Depends(get_admin_user), db=Depends(get_db)):
     cur = db.cursor()
     try:
-        cur.execute("""
+        await cur.execute("""
             INSERT INTO promoted_wishlists (wishlist_id, category)
             VALUES (%s, %s)
             RETURNING id, wishlist_id, category, display_order, created_at
         """, (body.wishlist_id, body.category))
-        db.commit()
-        row = cur.fetchone()
-        row["id"] = str(row["id"])
-        row["wishlist_id"] = str(row["wishlist_id"])
-        row["created_at"] = row["created_at"].isoformat()
-        return row
-    except psycopg2.IntegrityError:
-        db.rollback()
+        await db.commit()
+        row = await cur.fetchone()
+        await discovery_feed.invalidate()
+        return json_response(row)
+    except psycopg.IntegrityError:
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Wishlist is already promoted")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/promoted/wishlists/{promoted_id}")
 async def delete_promoted_wishlist(promoted_id: str, admin=Depends(get_admin_user), db=Depends(get_db)):
     cur = db.cursor()
-    cur.execute("DELETE FROM promoted_wishlists WHERE id = %s", (promoted_id,))
-    db.commit()
+    await cur.execute("DELETE FROM promoted_wishlists WHERE id = %s", (promoted_id,))
+    await db.commit()
+    await discovery_feed.invalidate()
     return {"message": "Success"}
@@ -5,8 +5,8 @@ from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
 from ..database import get_db
 from ..schemas import UserRegister, UserLogin, PasswordResetRequest, PasswordResetConfirm
-from ..utils import hash_password, verify_password, create_session_token, get_limit
-from ..deps import get_current_user
+from ..utils import hash_password_async, verify_password_async, password_needs_rehash, create_session_token, get_limit
+from ..deps import get_current_user, invalidate_session, invalidate_user_sessions
 from ..limiter import limiter
 
 router = APIRouter(prefix="/api/auth", tags=["Auth"])
@@ -16,26 +16,26 @@ router = APIRouter(prefix="/api/auth", tags=["Auth"])
 async def register(request: Request, body: UserRegister, response: Response, db=Depends(get_db)):
 
     cur = db.cursor()
-    cur.execute("SELECT id FROM users WHERE email = %s", (body.email,))
-    if cur.fetchone():
+    await cur.execute("SELECT id FROM users WHERE email = %s", (body.email,))
+    if await cur.fetchone():
         raise HTTPException(status_code=409, detail="Email already registered")
 
-    pw_hash = hash_password(body.password)
-    answer_hash = hash_password(body.security_answer) if body.security_answer else None
+    pw_hash = await hash_password_async(body.password)
+    answer_hash = await hash_password_async(body.security_answer) if body.security_answer else None
     user_id = str(uuid.uuid4())
-    cur.execute(
+    await cur.execute(
         "INSERT INTO users (id, email, password_hash, name, security_question, security_answer_hash) VALUES (%s, %s, %s, %s, %s, %s) RETURNING id, email, name, created_at",
         (user_id, body.email, pw_hash, body.name, body.security_question, answer_hash),
     )
-    user = cur.fetchone()
+    user = await cur.fetchone()
 
     token = create_session_token()
     expires = datetime.now(timezone.utc) + timedelta(days=30)
-    cur.execute(
+    await cur.execute(
         "INSERT INTO sessions (user_id, token, expires_at) VALUES (%s, %s, %s)",
         (user["id"], token, expires),
     )
-    db.commit()
+    await db.commit()
 
     # Set HTTP-only cookie
     is_prod = os.environ.get("ENV", "development") == "production"
@@ -59,18 +59,25 @@ async def register(request: Request, body: UserRegister, response: Response, db=
 @limiter.limit(get_limit("10/minute"))
 async def login(request: Request, body: UserLogin, response: Response, db=Depends(get_db)):
     cur = db.cursor()
-    cur.execute("SELECT id, email, name, password_hash FROM users WHERE email = %s", (body.email,))
-    user = cur.fetchone()
-    if not user or not verify_password(body.password, user["password_hash"]):
+    await cur.execute("SELECT id, email, name, password_hash FROM users WHERE email = %s", (body.email,))
+    user = await cur.fetchone()
+    if not user or not await verify_password_async(body.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
+    # Transparently upgrade hashes made with an older cost factor
+    if password_needs_rehash(user["password_hash"]):
+        await cur.execute(
+            "UPDATE users SET password_hash = %s WHERE id = %s",
+            (await hash_password_async(body.password), user["id"]),
+        )
+
     token = create_session_token()
     expires = datetime.now(timezone.utc) + timedelta(days=30)
-    cur.execute(
+    await cur.execute(
         "INSERT INTO sessions (user_id, token, expires_at) VALUES (%s, %s, %s)",
         (user["id"], token, expires),
     )
-    db.commit()
+    await db.commit()
 
     # Set HTTP-only cookie
     is_prod = os.environ.get("ENV", "development") == "production"
@@ -99,8 +106,9 @@ async def logout(
     token = request.cookies.get("session_token")
     if token:
         cur = db.cursor()
-        cur.execute("DELETE FROM sessions WHERE token = %s", (token,))
-        db.commit()
+        await cur.execute("DELETE FROM sessions WHERE token = %s", (token,))
+        await db.commit()
+        invalidate_session(token)
     
     response.delete_cookie(key="session_token")
     return {"status": "ok"}
@@ -113,8 +121,8 @@ async def get_me(request: Request, user=Depends(get_current_user)):
 @router.post("/forgot-password/question")
 async def get_reset_question(body: PasswordResetRequest, db=Depends(get_db)):
     cur = db.cursor()
-    cur.execute("SELECT security_question FROM users WHERE email = %s", (body.email.lower(),))
-    row = cur.fetchone()
+    await cur.execute("SELECT security_question FROM users WHERE email = %s", (body.email.lower(),))
+    row = await cur.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="User almost not found")
     if not row["security_question"]:
@@ -124,16 +132,18 @@ async def get_reset_question(body: PasswordResetRequest, db=Depends(get_db)):
 @router.post("/forgot-password/reset")
 async def reset_password(body: PasswordResetConfirm, db=Depends(get_db)):
     cur = db.cursor()
-    cur.execute("SELECT security_answer_hash FROM users WHERE email = %s", (body.email.lower(),))
-    row = cur.fetchone()
+    await cur.execute("SELECT security_answer_hash FROM users WHERE email = %s", (body.email.lower(),))
+    row = await cur.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="User almost not found")
     
-    if not row["security_answer_hash"] or not verify_password(body.answer, row["security_answer_hash"]):
+    if not row["security_answer_hash"] or not await verify_password_async(body.answer, row["security_answer_hash"]):
         raise HTTPException(status_code=401, detail="Incorrect answer to security question")
     
-    new_pw_hash = hash_password(body.new_password)
-    cur.execute("UPDATE users SET password_hash = %s WHERE email = %s", (new_pw_hash, body.email.lower()))
-    db.commit()
+    new_pw_hash = await hash_password_async(body.new_password)
+    await cur.execute("UPDATE users SET password_hash = %s WHERE email = %s RETURNING id", (new_pw_hash, body.email.lower()))
+    user_id = (await cur.fetchone())["id"]
+    await db.commit()
+    invalidate_user_sessions(user_id)
     
     return {"message": "Password reset successfully"}
@@ -2,9 +2,25 @@ from fastapi import APIRouter, Depends, HTTPException
 from ..database import get_db
 from ..schemas import WishlistItemCreate, WishlistItemUpdate, ClaimItem, UnclaimItem
 from ..deps import get_current_user
+from ..trending import record_item_adds
+from ..responses import json_response
 
 router = APIRouter(prefix="/api", tags=["Items"])
 
+async def insert_item(cur, wishlist_id: str, body: WishlistItemCreate, is_public: bool) -> dict:
+    """Insert an item into a wishlist the caller has already checked ownership of.
+
+    Items added to public wishlists count towards trending. The caller commits.
+    """
+    await cur.execute(
+        "INSERT INTO wishlist_items (wishlist_id, name, price, currency, tag, url, image_url, max_reservations) VALUES (%s, %s, %s, %s, %s, %s, %s, %s) RETURNING id, wishlist_id, name, price, currency, tag, url, image_url, max_reservations, is_claimed, created_at",
+        (wishlist_id, body.name, body.price, body.currency, body.tag, body.url, body.image_url, body.max_reservations),
+    )
+    item = await cur.fetchone()
+    if is_public:
+        await record_item_adds(cur, [item])
+    return item
+
 @router.post("/wishlists/{wishlist_id}/items")
 async def add_item(
     wishlist_id: str,
@@ -13,25 +29,16 @@ async def add_item(
     db=Depends(get_db),
 ):
     cur = db.cursor()
-    cur.execute("SELECT id, user_id FROM wishlists WHERE id = %s", (wishlist_id,))
-    wishlist = cur.fetchone()
+    await cur.execute("SELECT id, user_id, is_public FROM wishlists WHERE id = %s", (wishlist_id,))
+    wishlist = await cur.fetchone()
     if not wishlist:
         raise HTTPException(status_code=404, detail="Wishlist not found")
     if str(wishlist["user_id"]) != str(user["id"]):
         raise HTTPException(status_code=403, detail="Not your wishlist")
 
-    cur.execute(
-        "INSERT INTO wishlist_items (wishlist_id, name, price, currency, tag, url, image_url) VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id, wishlist_id, name, price, currency, tag, url, image_url, is_claimed, created_at",
-        (wishlist_id, body.name, body.price, body.currency, body.tag, body.url, body.image_url),
-    )
-    item = cur.fetchone()
-    db.commit()
-
-    result = dict(item)
-    result["id"] = str(result["id"])
-    result["wishlist_id"] = str(result["wishlist_id"])
-    result["price"] = float(result["price"]) if result["price"] else None
-    return result
+    result = await insert_item(cur, wishlist_id, body, wishlist["is_public"])
+    await db.commit()
+    return json_response(result)
 
 @router.put("/wishlists/{wishlist_id}/items/{item_id}")
 async def update_item(
@@ -42,8 +49,8 @@ async def update_item(
     db=Depends(get_db),
 ):
     cur = db.cursor()
-    cur.execute("SELECT w.user_id FROM wishlists w JOIN wishlist_items i ON i.wishlist_id = w.id WHERE w.id = %s AND i.id = %s", (wishlist_id, item_id))
-    row = cur.fetchone()
+    await cur.execute("SELECT w.user_id FROM wishlists w JOIN wishlist_items i ON i.wishlist_id = w.id WHERE w.id = %s AND i.id = %s", (wishlist_id, item_id))
+    row = await cur.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Item not found")
     if str(row["user_id"]) != str(user["id"]):
@@ -51,7 +58,7 @@ async def update_item(
 
     updates = []
     values = []
-    for field in ["name", "price", "currency", "tag", "url", "image_url"]:
+    for field in ["name", "price", "currency", "tag", "url", "image_url", "max_reservations"]:
         val = getattr(body, field, None)
         if val is not None:
             updates.append(f"{field} = %s")
@@ -59,15 +66,13 @@ async def update_item(
     if updates:
         updates.append("updated_at = NOW()")
         values.append(item_id)
-        cur.execute(
-            f"UPDATE wishlist_items SET {', '.join(updates)} WHERE id = %s RETURNING id, name, price, currency, tag, url, image_url, is_claimed, created_at",
+        await cur.execute(
+            f"UPDATE wishlist_items SET {', '.join(updates)} WHERE id = %s RETURNING id, name, price, currency, tag, url, image_url, max_reservations, is_claimed, created_at",
             values,
         )
-        result = dict(cur.fetchone())
-        result["id"] = str(result["id"])
-        result["price"] = float(result["price"]) if result["price"] else None
-        db.commit()
-        return result
+        result = await cur.fetchone()
+        await db.commit()
+        return json_response(result)
     return {"status": "no changes"}
 
 @router.delete("/wishlists/{wishlist_id}/items/{item_id}")
@@ -78,68 +83,85 @@ async def delete_item(
     db=Depends(get_db),
 ):
     cur = db.cursor()
-    cur.execute("SELECT w.user_id FROM wishlists w JOIN wishlist_items i ON i.wishlist_id = w.id WHERE w.id = %s AND i.id = %s", (wishlist_id, item_id))
-    row = cur.fetchone()
+    await cur.execute("SELECT w.user_id FROM wishlists w JOIN wishlist_items i ON i.wishlist_id = w.id WHERE w.id = %s AND i.id = %s", (wishlist_id, item_id))
+    row = await cur.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Item not found")
     if str(row["user_id"]) != str(user["id"]):
         raise HTTPException(status_code=403, detail="Not your wishlist")
-    cur.execute("DELETE FROM wishlist_items WHERE id = %s", (item_id,))
-    db.commit()
+    await cur.execute("DELETE FROM wishlist_items WHERE id = %s", (item_id,))
+    await db.commit()
     return {"status": "deleted"}
 
+# Claims and unclaims are single statements. The UPDATE takes the item's row
+# lock, and a claim that had to wait for it re-checks max_reservations
+# against the count the other claim left behind, so guests racing for the
+# last place can't both get it. The final SELECT reads the statement's
+# snapshot, so it sees the item whether or not a claim went in.
+CLAIM_SQL = """
+    WITH claimed AS (
+        UPDATE wishlist_items i
+        SET is_claimed = true, claimed_by = %(name)s, claimed_at = NOW()
+        FROM wishlists w
+        WHERE i.id = %(item_id)s AND w.id = i.wishlist_id AND w.slug = %(slug)s AND w.is_public = true
+          AND (i.max_reservations IS NULL OR i.reservation_count < i.max_reservations)
+        RETURNING i.id
+    ),
+    reservation AS (
+        INSERT INTO item_reservations (item_id, name)
+        SELECT id, %(name)s FROM claimed
+        RETURNING id, name, reserved_at
+    )
+    SELECT r.id, r.name, r.reserved_at
+    FROM wishlist_items i
+    JOIN wishlists w ON w.id = i.wishlist_id
+    LEFT JOIN reservation r ON true
+    WHERE i.id = %(item_id)s AND w.slug = %(slug)s AND w.is_public = true
+"""
+
+# reservation_count is only adjusted by the delete trigger once the statement
+# ends, so the UPDATE subtracts the deleted rows itself. It does so from the
+# row it locked, which includes any claim that committed in the meantime.
+UNCLAIM_SQL = """
+    WITH item AS (
+        SELECT i.id
+        FROM wishlist_items i
+        JOIN wishlists w ON w.id = i.wishlist_id
+        WHERE i.id = %(item_id)s AND w.slug = %(slug)s
+    ),
+    removed AS (
+        DELETE FROM item_reservations r
+        USING item
+        WHERE r.item_id = item.id AND r.name = %(name)s
+        RETURNING r.id
+    )
+    UPDATE wishlist_items i SET
+        is_claimed = i.reservation_count - d.n > 0,
+        claimed_by = CASE WHEN i.reservation_count - d.n > 0 THEN i.claimed_by END,
+        claimed_at = CASE WHEN i.reservation_count - d.n > 0 THEN i.claimed_at END
+    FROM item, (SELECT COUNT(*) AS n FROM removed) d
+    WHERE i.id = item.id
+    RETURNING i.reservation_count - d.n AS remaining
+"""
+
 @router.post("/wishlists/{slug}/items/{item_id}/claim")
 async def claim_item(slug: str, item_id: str, body: ClaimItem, db=Depends(get_db)):
     cur = db.cursor()
-    cur.execute(
-        "SELECT i.id FROM wishlist_items i JOIN wishlists w ON i.wishlist_id = w.id WHERE w.slug = %s AND i.id = %s AND w.is_public = true",
-        (slug, item_id),
-    )
-    item = cur.fetchone()
-    if not item:
+    await cur.execute(CLAIM_SQL, {"slug": slug, "item_id": item_id, "name": body.name})
+    row = await cur.fetchone()
+    await db.commit()
+    if not row:
         raise HTTPException(status_code=404, detail="Item not found")
-
-    cur.execute(
-        "INSERT INTO item_reservations (item_id, name) VALUES (%s, %s) RETURNING id, name, reserved_at",
-        (item_id, body.name),
-    )
-    reservation = cur.fetchone()
-    
-    cur.execute(
-        "UPDATE wishlist_items SET is_claimed = true, claimed_by = %s, claimed_at = NOW() WHERE id = %s",
-        (body.name, item_id),
-    )
-    
-    db.commit()
-    return {
-        "id": str(reservation["id"]),
-        "name": reservation["name"],
-        "reserved_at": reservation["reserved_at"].isoformat()
-    }
+    if row["id"] is None:
+        raise HTTPException(status_code=409, detail="This item is fully reserved")
+    return json_response(row)
 
 @router.post("/wishlists/{slug}/items/{item_id}/unclaim")
 async def unclaim_item(slug: str, item_id: str, body: UnclaimItem, db=Depends(get_db)):
     cur = db.cursor()
-    cur.execute(
-        "SELECT i.id FROM wishlist_items i JOIN wishlists w ON i.wishlist_id = w.id WHERE w.slug = %s AND i.id = %s",
-        (slug, item_id),
-    )
-    item = cur.fetchone()
-    if not item:
+    await cur.execute(UNCLAIM_SQL, {"slug": slug, "item_id": item_id, "name": body.name})
+    row = await cur.fetchone()
+    await db.commit()
+    if not row:
         raise HTTPException(status_code=404, detail="Item not found")
-
-    cur.execute(
-        "DELETE FROM item_reservations WHERE item_id = %s AND name = %s",
-        (item_id, body.name),
-    )
-    
-    cur.execute("SELECT COUNT(*) as count FROM item_reservations WHERE item_id = %s", (item_id,))
-    rem_count = cur.fetchone()["count"]
-    if rem_count == 0:
-        cur.execute(
-            "UPDATE wishlist_items SET is_claimed = false, claimed_by = NULL, claimed_at = NULL WHERE id = %s",
-            (item_id,),
-        )
-    
-    db.commit()
-    return {"status": "unclaimed", "remaining": rem_count}
+    return {"status": "unclaimed", "remaining": row["remaining"]}
@@ -0,0 +1,69 @@
+import os
+import secrets
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from ..database import pool_stats
+from ..deps import session_cache
+from ..log import log_stats
+from ..metrics import registry
+from ..scrape_cache import scrape_cache
+from ..utils import hashing_stats
+from ..view_buffer import view_buffer
+from .wishlists import public_wishlist_cache
+
+# Scrapers must send "Authorization: Bearer <token>". Unset, the endpoint is
+# off: it shows the same internals as the admin-only /api/admin/runtime.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+router = APIRouter(prefix="/api/metrics", tags=["Metrics"])
+
+
+@registry.collector
+def _runtime_metrics():
+    pool = pool_stats()
+    hashing = hashing_stats()
+    scrape = scrape_cache.stats()
+    caches = {
+        "session": (session_cache.hits, session_cache.misses, len(session_cache)),
+        "public_wishlist": (public_wishlist_cache.hits, public_wishlist_cache.misses, len(public_wishlist_cache)),
+        "scrape": (scrape["memory_hits"] + scrape["db_hits"] + scrape["coalesced"], scrape["misses"], scrape["size"]),
+    }
+    return [
+        ("wishly_db_pool_connections", "gauge", "Open database connections.",
+         [({}, pool.get("pool_size", 0))]),
+        ("wishly_db_pool_available", "gauge", "Idle database connections.",
+         [({}, pool.get("pool_available", 0))]),
+        ("wishly_db_pool_waiting", "gauge", "Requests waiting for a database connection.",
+         [({}, pool.get("requests_waiting", 0))]),
+        ("wishly_password_hash_pending", "gauge", "bcrypt jobs running or queued.",
+         [({}, hashing["pending"])]),
+        ("wishly_password_hash_completed_total", "counter", "bcrypt jobs finished.",
+         [({}, hashing["completed"])]),
+        ("wishly_password_hash_failed_total", "counter", "bcrypt jobs that raised an error.",
+         [({}, hashing["failed"])]),
+        ("wishly_password_hash_rejected_total", "counter", "bcrypt jobs refused because the queue was full.",
+         [({}, hashing["rejected"])]),
+        ("wishly_cache_hits_total", "counter", "Cache lookups served from the cache.",
+         [({"cache": name}, hits) for name, (hits, _, _) in caches.items()]),
+        ("wishly_cache_misses_total", "counter", "Cache lookups that went to the source.",
+         [({"cache": name}, misses) for name, (_, misses, _) in caches.items()]),
+        ("wishly_cache_entries", "gauge", "Entries held in memory.",
+         [({"cache": name}, size) for name, (_, _, size) in caches.items()]),
+        ("wishly_view_buffer_pending", "gauge", "Wishlist views waiting to be written.",
+         [({}, view_buffer.stats()["pending_events"])]),
+        ("wishly_view_buffer_dropped_total", "counter", "Wishlist views dropped instead of written.",
+         [({}, view_buffer.stats()["dropped_events"])]),
+        ("wishly_log_records_dropped_total", "counter", "Log records dropped because the log queue was full.",
+         [({}, log_stats()["dropped"])]),
+    ]
+
+
+@router.get("")
+async def get_metrics(request: Request):
+    """Prometheus text exposition for this worker."""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=403, detail="Metrics are disabled: METRICS_TOKEN is not set")
+    auth_header = request.headers.get("Authorization", "")
+    if not secrets.compare_digest(auth_header, f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,21 +1,54 @@
-import re
+import asyncio
+import logging
+import os
+import time
+from typing import List, Optional
 from urllib.parse import urlparse
-import requests as http_requests
-from bs4 import BeautifulSoup
-from fastapi import APIRouter, Depends, HTTPException, Request
+import httpx
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 
-from ..schemas import ScrapeRequest
-from ..utils import detect_currency, extract_price, get_limit
+from ..schemas import ScrapeBatchRequest, ScrapeRequest, WishlistItemCreate
+from ..utils import get_limit
+from ..database import db_connection
 from ..deps import get_current_user
+from ..extraction import extract_product
+from ..fetcher import fetcher
+from ..scrape_cache import scrape_cache, normalize_url
 from ..limiter import limiter
+from ..responses import dumps
+from ..metrics import scrape_domain, scrape_fetch_duration, scrape_parse_duration
+from .items import insert_item
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_BATCH_MAX_URLS = int(os.environ.get("SCRAPE_BATCH_MAX_URLS", "50"))
 
 router = APIRouter(prefix="/api/scrape", tags=["Scraper"])
 
-@router.post("")
-@limiter.limit(get_limit("30/minute"))
-async def scrape_url(request: Request, body: ScrapeRequest, user=Depends(get_current_user)):
-    """Scrape product details from an e-commerce URL."""
-    url = body.url.strip()
+async def fetch_product(url: str, domain: str) -> dict:
+    """Fetch a product page and extract name, price, currency and image."""
+    label = scrape_domain(domain)
+    started = time.perf_counter()
+    try:
+        resp = await fetcher.fetch(url)
+    except httpx.TimeoutException:
+        scrape_fetch_duration.observe(time.perf_counter() - started, (label, "timeout"))
+        raise HTTPException(status_code=408, detail="The product page took too long to respond")
+    except httpx.InvalidURL:
+        raise HTTPException(status_code=400, detail="Invalid URL")
+    except httpx.HTTPError as e:
+        scrape_fetch_duration.observe(time.perf_counter() - started, (label, "error"))
+        raise HTTPException(status_code=502, detail=f"Could not reach the product page: {str(e)}")
+    fetched = time.perf_counter()
+    scrape_fetch_duration.observe(fetched - started, (label, "ok"))
+
+    product = extract_product(resp.text, domain)
+    scrape_parse_duration.observe(time.perf_counter() - fetched, (label,))
+    return product
+
+def _prepare_url(raw: str):
+    url = raw.strip()
     if not url.startswith(("http://", "https://")):
         url = "https://" + url
 
@@ -24,126 +57,92 @@ async def scrape_url(request: Request, body: ScrapeRequest, user=Depends(get_cur
         domain = parsed.netloc.lower()
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid URL")
+    return url, domain
 
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/124.0.0.0 Safari/537.36"
-        ),
-        "Accept-Language": "en-US,en;q=0.9",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+@router.post("")
+@limiter.limit(get_limit("30/minute"))
+async def scrape_url(request: Request, body: ScrapeRequest, response: Response, user=Depends(get_current_user)):
+    """Scrape product details from an e-commerce URL."""
+    url, domain = _prepare_url(body.url)
+
+    product, cached = await scrape_cache.get_or_fetch(normalize_url(url), lambda: fetch_product(url, domain))
+    response.headers["X-Cache"] = "HIT" if cached else "MISS"
+    return {
+        **product,
+        "url": url,
+        "source_domain": domain,
     }
 
+async def _scrape_one(index: int, raw: str, wishlist: Optional[dict]) -> dict:
+    # Every URL gets its line: an unexpected error here must not end the
+    # stream and lose the other URLs' results
     try:
-        resp = http_requests.get(url, headers=headers, timeout=10, allow_redirects=True)
-        resp.raise_for_status()
-    except http_requests.exceptions.Timeout:
-        raise HTTPException(status_code=408, detail="The product page took too long to respond")
-    except http_requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=502, detail=f"Could not reach the product page: {str(e)}")
+        url, domain = _prepare_url(raw)
+        product, cached = await scrape_cache.get_or_fetch(normalize_url(url), lambda: fetch_product(url, domain))
+    except HTTPException as e:
+        return {"index": index, "url": raw, "status": e.status_code, "detail": e.detail}
+    except Exception:
+        logger.exception("Batch scrape of %s failed", raw)
+        return {"index": index, "url": raw, "status": 500, "detail": "Could not scrape this URL"}
 
-    soup = BeautifulSoup(resp.text, "html.parser")
-
-    name = None
-    price_text = None
-    image_url = None
-
-    # Open Graph tags
-    og_title = soup.find("meta", property="og:title")
-    og_image = soup.find("meta", property="og:image")
-    og_price = soup.find("meta", property="product:price:amount") or \
-               soup.find("meta", property="og:price:amount")
-    og_currency = soup.find("meta", property="product:price:currency") or \
-                  soup.find("meta", property="og:price:currency")
-
-    if og_title:
-        name = og_title.get("content", "").strip()
-    if og_image:
-        image_url = og_image.get("content", "").strip()
-    if og_price:
-        price_text = og_price.get("content", "").strip()
-
-    # JSON-LD
-    for script in soup.find_all("script", type="application/ld+json"):
+    result = {"index": index, "status": 200, "cached": cached, **product, "url": url, "source_domain": domain}
+    if wishlist:
         try:
-            import json
-            data = json.loads(script.string or "")
-            items = data if isinstance(data, list) else [data]
-            for item in items:
-                if isinstance(item, dict) and item.get("@type") in ("Product", "product"):
-                    if not name and item.get("name"):
-                        name = str(item["name"]).strip()
-                    if not image_url:
-                        img = item.get("image")
-                        if isinstance(img, list) and img:
-                            image_url = img[0]
-                        elif isinstance(img, str):
-                            image_url = img
-                    if not price_text:
-                        offers = item.get("offers", {})
-                        if isinstance(offers, list) and offers:
-                            offers = offers[0]
-                        if isinstance(offers, dict):
-                            price_text = str(offers.get("price", ""))
+            item = WishlistItemCreate(
+                name=product["name"] or url[:200],
+                price=product["price"],
+                currency=product["currency"],
+                url=url,
+                image_url=product["image_url"] or None,
+            )
+            async with db_connection() as conn:
+                result["item"] = await insert_item(conn.cursor(), wishlist["id"], item, wishlist["is_public"])
+        except HTTPException as e:
+            result["item_error"] = e.detail
         except Exception:
-            pass
-
-    # Common CSS selectors
-    if not name:
-        for selector in [
-            "h1.product-title", "h1.product-name", "h1[class*='title']",
-            "h1[class*='name']", "h1[class*='product']", "h1",
-            "[data-testid='product-title']", "[class*='ProductTitle']",
-            "._2YkNt", "[class*='goods-title']",
-        ]:
-            el = soup.select_one(selector)
-            if el and el.get_text(strip=True):
-                name = el.get_text(strip=True)
-                break
-
-    if not price_text:
-        for selector in [
-            "[class*='price']:not([class*='original']):not([class*='was'])",
-            "[data-testid*='price']", "[class*='Price']",
-            "span.price", ".product-price", ".current-price",
-            "._1k4dP", "[class*='sale-price']",
-        ]:
-            el = soup.select_one(selector)
-            if el and el.get_text(strip=True):
-                price_text = el.get_text(strip=True)
-                break
-
-    if not image_url:
-        for selector in [
-            "img[class*='product']", "img[class*='main']",
-            ".product-image img", "#main-image", "img[data-main]",
-        ]:
-            el = soup.select_one(selector)
-            if el and el.get("src"):
-                image_url = el["src"]
-                break
-
-    if not name and soup.title:
-        raw = soup.title.string or ""
-        name = re.split(r"[|\-–—]", raw)[0].strip()
-
-    currency_str = ""
-    if og_currency:
-        currency_str = og_currency.get("content", "") if hasattr(og_currency, "get") else str(og_currency)
-    currency = currency_str.upper() if currency_str and len(currency_str) == 3 else \
-               detect_currency(price_text or "", domain)
-
-    price = extract_price(price_text) if price_text else None
-
-    if name:
-        name = " ".join(name.split())[:200]
-
-    return {
-        "name": name or "",
-        "price": price,
-        "currency": currency,
-        "image_url": image_url or "",
-        "url": url,
-        "source_domain": domain,
-    }
+            logger.exception("Adding the scraped %s to wishlist %s failed", url, wishlist["id"])
+            result["item_error"] = "Could not add the item to the wishlist"
+    return result
+
+async def _stream_batch(urls: List[str], wishlist: Optional[dict]):
+    # Per-retailer concurrency is capped by the fetcher's host slots
+    tasks = [asyncio.ensure_future(_scrape_one(i, url, wishlist)) for i, url in enumerate(urls)]
+    succeeded = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            if result["status"] == 200:
+                succeeded += 1
+            yield dumps(result) + b"\n"
+        yield dumps({"done": True, "total": len(urls), "succeeded": succeeded, "failed": len(urls) - succeeded}) + b"\n"
+    finally:
+        # Client went away: stop scraping on its behalf
+        for task in tasks:
+            task.cancel()
+
+@router.post("/batch")
+@limiter.limit(get_limit("5/minute"))
+async def scrape_batch(request: Request, body: ScrapeBatchRequest, user=Depends(get_current_user)):
+    """Scrape many product URLs at once, streaming one NDJSON line per URL as it finishes.
+
+    With ``wishlist_id``, each scraped product is also added to that wishlist.
+    The last line is a summary: ``{"done": true, "total", "succeeded", "failed"}``.
+    """
+    urls = [url for url in body.urls if url.strip()]
+    if not urls:
+        raise HTTPException(status_code=400, detail="No URLs given")
+    if len(urls) > SCRAPE_BATCH_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {SCRAPE_BATCH_MAX_URLS} URLs per batch")
+
+    wishlist = None
+    if body.wishlist_id:
+        async with db_connection() as db:
+            cur = db.cursor()
+            await cur.execute("SELECT id, user_id, is_public FROM wishlists WHERE id = %s", (body.wishlist_id,))
+            wishlist = await cur.fetchone()
+        if not wishlist:
+            raise HTTPException(status_code=404, detail="Wishlist not found")
+        if str(wishlist["user_id"]) != str(user["id"]):
+            raise HTTPException(status_code=403, detail="Not your wishlist")
+
+    return StreamingResponse(_stream_batch(urls, wishlist), media_type="application/x-ndjson")
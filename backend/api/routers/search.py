@@ -0,0 +1,133 @@
+import re
+import uuid
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from ..database import get_db
+from ..limiter import limiter
+from ..pagination import decode_cursor, encode_cursor
+from ..responses import json_response
+from ..utils import get_limit
+
+router = APIRouter(prefix="/api/search", tags=["Search"])
+
+SEARCH_MAX_TERMS = 8
+_TERM_RE = re.compile(r"[^\W_]+")
+
+# Set on first search: whether pg_trgm (scripts/012-search-trigram.sql) is installed
+_trigram_available = None
+
+# Every term must match as a prefix, of either its English stem or the raw
+# word: to_tsquery stems prefixes too, so "ijprys:*" alone becomes "ijpri:*"
+# and misses "ijprysyhxv". Stopwords drop out, as they do in to_tsquery.
+PREFIX_QUERY = """
+    (SELECT string_agg(
+                CASE WHEN to_tsquery('english', t || ':*')::text = '' THEN NULL
+                     ELSE '(' || to_tsquery('english', t || ':*')::text || ' | ' || to_tsquery('simple', t || ':*')::text || ')'
+                END,
+                ' & ')::tsquery
+     FROM unnest(%(terms)s::text[]) t)
+"""
+
+# {query}, {match} and {rank} are filled in per mode; ranks are real so the keyset
+# comparison against the cursor is exact
+WISHLIST_SQL = """
+    SELECT * FROM (
+        SELECT w.id, w.title, w.slug, w.description, u.name AS owner_name, {rank} AS rank
+        FROM wishlists w
+        JOIN users u ON u.id = w.user_id,
+             {query} AS search(query)
+        WHERE w.is_public = true AND ({match})
+    ) r
+    WHERE %(after_rank)s::real IS NULL OR (r.rank, r.id) < (%(after_rank)s::real, %(after_id)s::uuid)
+    ORDER BY r.rank DESC, r.id DESC
+    LIMIT %(limit)s
+"""
+WISHLIST_FTS = ("w.search_vector @@ query", "ts_rank(w.search_vector, query)")
+WISHLIST_FUZZY = (
+    "w.search_vector @@ query OR %(q)s <%% w.title OR %(q)s <%% w.description",
+    "(ts_rank(w.search_vector, query) + word_similarity(%(q)s, w.title))::real",
+)
+
+ITEM_SQL = """
+    SELECT * FROM (
+        SELECT i.id, i.name, i.price, i.currency, i.tag, i.url, i.image_url,
+               w.title AS wishlist_title, w.slug AS wishlist_slug, {rank} AS rank
+        FROM wishlist_items i
+        JOIN wishlists w ON w.id = i.wishlist_id,
+             {query} AS search(query)
+        WHERE w.is_public = true AND ({match})
+    ) r
+    WHERE %(after_rank)s::real IS NULL OR (r.rank, r.id) < (%(after_rank)s::real, %(after_id)s::uuid)
+    ORDER BY r.rank DESC, r.id DESC
+    LIMIT %(limit)s
+"""
+ITEM_FTS = ("i.search_vector @@ query", "ts_rank(i.search_vector, query)")
+ITEM_FUZZY = (
+    "i.search_vector @@ query OR %(q)s <%% i.name OR %(q)s <%% i.tag",
+    "(ts_rank(i.search_vector, query) + word_similarity(%(q)s, i.name))::real",
+)
+
+
+def search_terms(q: str) -> list:
+    """'Noise-cancel' -> ['noise', 'cancel']: the words PREFIX_QUERY matches."""
+    return _TERM_RE.findall(q.lower())[:SEARCH_MAX_TERMS]
+
+
+async def _has_trigram(cur) -> bool:
+    global _trigram_available
+    if _trigram_available is None:
+        await cur.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') AS installed")
+        _trigram_available = (await cur.fetchone())["installed"]
+    return _trigram_available
+
+
+@router.get("")
+@limiter.limit(get_limit("60/minute"))
+async def search(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Literal["wishlists", "items"] = "wishlists",
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = None,
+    db=Depends(get_db),
+):
+    """Ranked search over public wishlists or the items in them.
+
+    Every word is matched as a prefix. When pg_trgm is installed, near
+    misses ("hedphones") match too. Like the other paginated lists, the
+    body is a bare array and the next page's cursor, if any, is in the
+    ``X-Next-Cursor`` header.
+    """
+    terms = search_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query has no searchable words")
+    after_rank, after_id = decode_cursor(cursor, float, uuid.UUID) if cursor else (None, None)
+
+    cur = db.cursor()
+    fuzzy = await _has_trigram(cur)
+    if type == "wishlists":
+        sql, (match, rank) = WISHLIST_SQL, WISHLIST_FUZZY if fuzzy else WISHLIST_FTS
+    else:
+        sql, (match, rank) = ITEM_SQL, ITEM_FUZZY if fuzzy else ITEM_FTS
+    await cur.execute(
+        sql.format(query=PREFIX_QUERY, match=match, rank=rank),
+        {
+            "terms": terms,
+            "q": q.strip().lower(),
+            "after_rank": after_rank,
+            "after_id": after_id,
+            # One extra row tells us whether there is a next page
+            "limit": limit + 1,
+        },
+    )
+    rows = await cur.fetchall()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["rank"], rows[-1]["id"])
+
+    for row in rows:
+        del row["rank"]
+    return json_response(rows, response)
@@ -1,12 +1,34 @@
+import os
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from ..cache import TTLCache
 from ..database import get_db
 from ..schemas import WishlistCreate, WishlistUpdate, WishlistClone
 from ..utils import generate_slug
 from ..deps import get_current_user, get_user_if_authenticated
+from ..pagination import CreatedAtPage
+from ..responses import json_response
+from ..view_buffer import view_buffer
+from ..view_rollups import TAIL_CONDITION, daily_views_sql, estimate_unique_viewers
+from ..like_counter import like_count_sql, record_like
+from ..trending import record_item_adds
 
 router = APIRouter(prefix="/api/wishlists", tags=["Wishlists"])
 
+# slug -> guest view of a public wishlist, tagged with its id, version and
+# reservation versions. Each request recomputes the tag from the counters
+# bumped by the triggers in 015-wishlist-version.sql, so a write on any
+# worker is seen on the next load; the TTL only bounds memory held by lists
+# nobody opens.
+PUBLIC_WISHLIST_CACHE_TTL = float(os.environ.get("PUBLIC_WISHLIST_CACHE_TTL", "300"))
+PUBLIC_WISHLIST_CACHE_SIZE = int(os.environ.get("PUBLIC_WISHLIST_CACHE_SIZE", "1000"))
+
+public_wishlist_cache = TTLCache(maxsize=PUBLIC_WISHLIST_CACHE_SIZE, ttl=PUBLIC_WISHLIST_CACHE_TTL)
+
+# Shared caches may store the guest view but must revalidate every time, so
+# each load still reaches us (and is counted); unchanged lists get a 304.
+PUBLIC_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
 @router.post("")
 async def create_wishlist(
     body: WishlistCreate,
@@ -15,152 +37,192 @@ async def create_wishlist(
 ):
     cur = db.cursor()
     slug = generate_slug(body.title)
-    cur.execute(
+    await cur.execute(
         "INSERT INTO wishlists (user_id, title, description, slug, is_public) VALUES (%s, %s, %s, %s, %s) RETURNING id, user_id, title, description, slug, is_public, view_count, like_count, created_at",
         (user["id"], body.title, body.description, slug, body.is_public),
     )
-    wishlist = cur.fetchone()
-    db.commit()
-
-    result = dict(wishlist)
-    result["id"] = str(result["id"])
-    result["user_id"] = str(result["user_id"])
-    return result
+    wishlist = await cur.fetchone()
+    await db.commit()
+    return json_response(wishlist)
 
 @router.get("")
 async def list_user_wishlists(
+    response: Response,
+    page: CreatedAtPage = Depends(),
     user=Depends(get_current_user),
     db=Depends(get_db),
 ):
     cur = db.cursor()
-    cur.execute(
-        "SELECT id, title, description, slug, is_public, view_count, like_count, created_at FROM wishlists WHERE user_id = %s ORDER BY created_at DESC",
-        (user["id"],),
+    await cur.execute(
+        f"SELECT id, title, description, slug, is_public, view_count, {like_count_sql('w')} AS like_count, item_count, created_at FROM wishlists w WHERE user_id = %(user_id)s AND {page.condition('w')} ORDER BY created_at DESC, id DESC LIMIT %(limit)s",
+        {**page.params, "user_id": user["id"]},
     )
-    rows = cur.fetchall()
-    result = []
-    for row in rows:
-        d = dict(row)
-        d["id"] = str(d["id"])
-        # Get item count
-        cur.execute("SELECT COUNT(*) as count FROM wishlist_items WHERE wishlist_id = %s", (row["id"],))
-        d["item_count"] = cur.fetchone()["count"]
-        result.append(d)
-    return result
+    return json_response(page.trim(await cur.fetchall(), response), response)
 
 @router.get("/{slug}")
 async def get_wishlist_by_slug(
     slug: str, 
     request: Request, 
+    response: Response,
     user=Depends(get_user_if_authenticated),
     db=Depends(get_db)
 ):
     cur = db.cursor()
-    cur.execute(
-        "SELECT w.id, w.user_id, w.title, w.description, w.slug, w.is_public, w.view_count, w.like_count, w.created_at, u.name as owner_name FROM wishlists w JOIN users u ON w.user_id = u.id WHERE w.slug = %s",
-        (slug,),
+    cached = public_wishlist_cache.get(slug)
+    client_tags = _parse_if_none_match(request.headers.get("if-none-match"))
+    known_tags = client_tags + ([cached["tag"]] if cached else [])
+
+    # Wishlist, items and reservations in a single round trip: one row per
+    # reservation (or per item without reservations, or one bare row for an
+    # empty wishlist), folded back together below. When a guest's copy (the
+    # browser's or ours) is still current, only the bare wishlist row comes back.
+    await cur.execute(
+        f"""
+        SELECT w.id, w.user_id, w.title, w.description, w.slug, w.is_public, w.view_count,
+               {like_count_sql('w')} AS like_count, w.created_at,
+               t.etag, u.name as owner_name,
+               i.id as item_id, i.name as item_name, i.price as item_price, i.currency as item_currency,
+               i.tag as item_tag, i.url as item_url, i.image_url as item_image_url, i.created_at as item_created_at,
+               i.max_reservations as item_max_reservations,
+               r.id as reservation_id, r.name as reservation_name, r.reserved_at
+        FROM wishlists w
+        JOIN users u ON w.user_id = u.id
+        CROSS JOIN LATERAL (
+            SELECT w.id || '-' || w.version || '-' || COALESCE(SUM(reservation_version), 0) AS etag
+            FROM wishlist_items WHERE wishlist_id = w.id
+        ) t
+        LEFT JOIN wishlist_items i ON i.wishlist_id = w.id
+            AND (w.user_id = %(viewer_id)s OR t.etag <> ALL(%(known_tags)s::text[]))
+        LEFT JOIN item_reservations r ON r.item_id = i.id
+        WHERE w.slug = %(slug)s
+        ORDER BY i.created_at ASC, i.id, r.reserved_at ASC
+        """,
+        {"slug": slug, "viewer_id": user["id"] if user else None, "known_tags": known_tags},
     )
-    wishlist = cur.fetchone()
-    if not wishlist:
+    rows = await cur.fetchall()
+    if not rows:
+        public_wishlist_cache.pop(slug)
         raise HTTPException(status_code=404, detail="Wishlist not found")
+    wishlist = rows[0]
     
     is_owner = user and str(user["id"]) == str(wishlist["user_id"])
     
     if not wishlist["is_public"] and not is_owner:
         raise HTTPException(status_code=403, detail="This wishlist is private")
 
-    # Record the view only for public viewers
-    if not is_owner:
+    # The owner and guests get different bodies from the same URL
+    response.headers["Vary"] = "Cookie, Authorization"
+    if is_owner:
+        response.headers["Cache-Control"] = "private, no-cache"
+        result = _assemble_wishlist(rows, is_owner=True)
+    else:
+        # Record the view only for public viewers; written in the background by
+        # the view buffer. Revalidations count too: each one is a page load.
         viewer_ip = request.headers.get("x-forwarded-for", request.client.host if request.client else "unknown")
         user_agent = request.headers.get("user-agent", "")
         referrer = request.headers.get("referer", "")
-        cur.execute(
-            "INSERT INTO wishlist_views (wishlist_id, viewer_ip, user_agent, referrer) VALUES (%s, %s, %s, %s)",
-            (wishlist["id"], viewer_ip, user_agent, referrer),
-        )
-        cur.execute(
-            "UPDATE wishlists SET view_count = view_count + 1 WHERE id = %s",
-            (wishlist["id"],),
-        )
+        view_buffer.record(wishlist["id"], viewer_ip, user_agent, referrer)
+
+        tag = wishlist["etag"]
+        # Weak: view_count and like_count in the body move without a version bump
+        response.headers["ETag"] = f'W/"{tag}"'
+        response.headers["Cache-Control"] = PUBLIC_CACHE_CONTROL
+        if tag in client_tags or "*" in client_tags:
+            return Response(status_code=304, headers=dict(response.headers))
+        if cached and cached["tag"] == tag:
+            result = dict(cached["body"])
+        else:
+            result = _assemble_wishlist(rows, is_owner=False)
+            public_wishlist_cache.set(slug, {"tag": tag, "body": result})
+            result = dict(result)
+
+    result["view_count"] = wishlist["view_count"] + view_buffer.pending_views(wishlist["id"])
+    result["like_count"] = wishlist["like_count"]
+    return json_response(result, response)
+
+
+def _parse_if_none_match(header):
+    """'W/"a", "b"' -> ["a", "b"]; weak and strong tags compare alike on GET."""
+    if not header:
+        return []
+    tags = []
+    for tag in header.split(",")[:8]:
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tags.append(tag.strip('"'))
+    return tags
+
+
+def _assemble_wishlist(rows, is_owner):
+    wishlist = rows[0]
+
+    # Group reservation rows under their item, keeping item order
+    items = {}
+    for row in rows:
+        if row["item_id"] is None:
+            continue
+        item = items.get(row["item_id"])
+        if item is None:
+            item = items[row["item_id"]] = {
+                "id": row["item_id"],
+                "name": row["item_name"],
+                "price": row["item_price"],
+                "currency": row["item_currency"],
+                "tag": row["item_tag"],
+                "url": row["item_url"],
+                "image_url": row["item_image_url"],
+                "max_reservations": row["item_max_reservations"],
+                "created_at": row["item_created_at"],
+                "reservations": [],
+            }
+        if row["reservation_id"] is not None:
+            item["reservations"].append(row)
 
-    # Get items
-    cur.execute(
-        "SELECT id, name, price, currency, tag, url, image_url, created_at FROM wishlist_items WHERE wishlist_id = %s ORDER BY created_at ASC",
-        (wishlist["id"],),
-    )
-    items = cur.fetchall()
-    
     # Enrich items with reservations
     enriched_items = []
-    for item in items:
-        cur.execute(
-            "SELECT id, name, reserved_at FROM item_reservations WHERE item_id = %s ORDER BY reserved_at ASC",
-            (item["id"],),
-        )
-        reservations = cur.fetchall()
-        
-        item_data = dict(item)
-        item_data["id"] = str(item["id"])
-        item_data["price"] = float(item["price"]) if item["price"] else None
+    for item_data in items.values():
+        reservations = item_data.pop("reservations")
         item_data["reservations_count"] = len(reservations)
         
         if is_owner:
             item_data["reservations"] = [
-                {"id": str(r["id"]), "name": r["name"], "reserved_at": r["reserved_at"].isoformat()}
+                {"id": r["reservation_id"], "name": r["reservation_name"], "reserved_at": r["reserved_at"]}
                 for r in reservations
             ]
             item_data["is_claimed"] = len(reservations) > 0
-            item_data["claimed_by"] = reservations[0]["name"] if reservations else None
+            item_data["claimed_by"] = reservations[0]["reservation_name"] if reservations else None
         else:
             item_data["is_claimed"] = len(reservations) > 0
             item_data["reserver_initials"] = [
-                "".join([n[0] for n in r["name"].split() if n]).upper()
+                "".join([n[0] for n in r["reservation_name"].split() if n]).upper()
                 for r in reservations
             ]
         
         enriched_items.append(item_data)
 
-    db.commit()
-
-    result = dict(wishlist)
-    result["id"] = str(result["id"])
-    result["user_id"] = str(result["user_id"])
-    result["view_count"] = result["view_count"] + (0 if is_owner else 1)
+    result = {
+        key: wishlist[key]
+        for key in ("id", "user_id", "title", "description", "slug", "is_public", "view_count", "like_count", "created_at", "owner_name")
+    }
     result["items"] = enriched_items
     return result
 
 @router.post("/{slug}/like")
 async def like_wishlist(slug: str, request: Request, db=Depends(get_db)):
     cur = db.cursor()
-    cur.execute("SELECT id FROM wishlists WHERE slug = %s", (slug,))
-    wishlist = cur.fetchone()
-    if not wishlist:
-        raise HTTPException(status_code=404, detail="Wishlist not found")
-    
     viewer_ip = request.headers.get("x-forwarded-for", request.client.host if request.client else "unknown")
-    
-    cur.execute(
-        "SELECT id FROM wishlist_likes WHERE wishlist_id = %s AND viewer_ip = %s",
-        (wishlist["id"], viewer_ip),
-    )
-    if cur.fetchone():
+
+    # One statement: the unique (wishlist_id, viewer_ip) constraint settles
+    # concurrent likes from the same IP, and the count goes to a shard row
+    # rather than the contended wishlists row
+    like = await record_like(cur, slug, viewer_ip)
+    await db.commit()
+    if not like:
+        raise HTTPException(status_code=404, detail="Wishlist not found")
+    if not like["liked"]:
         raise HTTPException(status_code=400, detail="You have already liked this wishlist")
-    
-    try:
-        cur.execute(
-            "INSERT INTO wishlist_likes (wishlist_id, viewer_ip) VALUES (%s, %s)",
-            (wishlist["id"], viewer_ip),
-        )
-        cur.execute(
-            "UPDATE wishlists SET like_count = like_count + 1 WHERE id = %s RETURNING like_count",
-            (wishlist["id"],),
-        )
-        new_count = cur.fetchone()["like_count"]
-        db.commit()
-        return {"like_count": new_count}
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+    return {"like_count": like["like_count"]}
 
 @router.put("/{wishlist_id}")
 async def update_wishlist(
@@ -170,8 +232,8 @@ async def update_wishlist(
     db=Depends(get_db),
 ):
     cur = db.cursor()
-    cur.execute("SELECT id, user_id FROM wishlists WHERE id = %s", (wishlist_id,))
-    wishlist = cur.fetchone()
+    await cur.execute("SELECT id, user_id FROM wishlists WHERE id = %s", (wishlist_id,))
+    wishlist = await cur.fetchone()
     if not wishlist:
         raise HTTPException(status_code=404, detail="Wishlist not found")
     if str(wishlist["user_id"]) != str(user["id"]):
@@ -192,14 +254,13 @@ async def update_wishlist(
     if updates:
         updates.append("updated_at = NOW()")
         values.append(wishlist_id)
-        cur.execute(
+        await cur.execute(
             f"UPDATE wishlists SET {', '.join(updates)} WHERE id = %s RETURNING id, title, description, slug, is_public, view_count, created_at, updated_at",
             values,
         )
-        result = dict(cur.fetchone())
-        result["id"] = str(result["id"])
-        db.commit()
-        return result
+        result = await cur.fetchone()
+        await db.commit()
+        return json_response(result)
 
     return {"status": "no changes"}
 
@@ -210,22 +271,22 @@ async def delete_wishlist(
     db=Depends(get_db),
 ):
     cur = db.cursor()
-    cur.execute("SELECT id, user_id FROM wishlists WHERE id = %s", (wishlist_id,))
-    wishlist = cur.fetchone()
+    await cur.execute("SELECT id, user_id FROM wishlists WHERE id = %s", (wishlist_id,))
+    wishlist = await cur.fetchone()
     if not wishlist:
         raise HTTPException(status_code=404, detail="Wishlist not found")
     if str(wishlist["user_id"]) != str(user["id"]):
         raise HTTPException(status_code=403, detail="Not your wishlist")
-    cur.execute("DELETE FROM wishlists WHERE id = %s", (wishlist_id,))
-    db.commit()
+    await cur.execute("DELETE FROM wishlists WHERE id = %s", (wishlist_id,))
+    await db.commit()
     return {"status": "deleted"}
 
 @router.post("/{slug}/clone")
 async def clone_wishlist(slug: str, body: WishlistClone, user=Depends(get_current_user), db=Depends(get_db)):
     import secrets
     cur = db.cursor()
-    cur.execute("SELECT id, is_public, title FROM wishlists WHERE slug = %s", (slug,))
-    original = cur.fetchone()
+    await cur.execute("SELECT id, is_public, title FROM wishlists WHERE slug = %s", (slug,))
+    original = await cur.fetchone()
     if not original:
         raise HTTPException(status_code=404, detail="Original wishlist not found")
     
@@ -235,30 +296,28 @@ async def clone_wishlist(slug: str, body: WishlistClone, user=Depends(get_curren
     new_wishlist_id = str(uuid.uuid4())
     new_slug = generate_slug(body.title)
     
-    cur.execute("SELECT id FROM wishlists WHERE slug = %s", (new_slug,))
-    if cur.fetchone():
+    await cur.execute("SELECT id FROM wishlists WHERE slug = %s", (new_slug,))
+    if await cur.fetchone():
         new_slug = f"{new_slug}-{secrets.token_hex(3)}"
         
-    cur.execute(
-        "INSERT INTO wishlists (id, user_id, title, slug, is_public) VALUES (%s, %s, %s, %s, %s) RETURNING *",
+    await cur.execute(
+        "INSERT INTO wishlists (id, user_id, title, slug, is_public) VALUES (%s, %s, %s, %s, %s) RETURNING id, user_id, title, description, slug, is_public, view_count, like_count, created_at, updated_at",
         (new_wishlist_id, user["id"], body.title, new_slug, True)
     )
-    new_wishlist = cur.fetchone()
+    new_wishlist = await cur.fetchone()
     
-    cur.execute("""
-        INSERT INTO wishlist_items (id, wishlist_id, name, price, currency, tag, url, image_url)
-        SELECT gen_random_uuid(), %s, name, price, currency, tag, url, image_url
+    await cur.execute("""
+        INSERT INTO wishlist_items (id, wishlist_id, name, price, currency, tag, url, image_url, max_reservations)
+        SELECT gen_random_uuid(), %s, name, price, currency, tag, url, image_url, max_reservations
         FROM wishlist_items
         WHERE wishlist_id = %s
+        RETURNING name, url, image_url, price, currency
     """, (new_wishlist_id, original["id"]))
+    await record_item_adds(cur, await cur.fetchall())
     
-    db.commit()
+    await db.commit()
     
-    new_wishlist_dict = dict(new_wishlist)
-    new_wishlist_dict["id"] = str(new_wishlist_dict["id"])
-    new_wishlist_dict["user_id"] = str(new_wishlist_dict["user_id"])
-    new_wishlist_dict["created_at"] = new_wishlist_dict["created_at"].isoformat()
-    return new_wishlist_dict
+    return json_response(new_wishlist)
 
 @router.get("/{wishlist_id}/analytics")
 async def get_wishlist_analytics(
@@ -267,49 +326,70 @@ async def get_wishlist_analytics(
     db=Depends(get_db),
 ):
     cur = db.cursor()
-    cur.execute("SELECT id, user_id, view_count, title FROM wishlists WHERE id = %s", (wishlist_id,))
-    wishlist = cur.fetchone()
+    await cur.execute("SELECT id, user_id, view_count, title FROM wishlists WHERE id = %s", (wishlist_id,))
+    wishlist = await cur.fetchone()
     if not wishlist:
         raise HTTPException(status_code=404, detail="Wishlist not found")
     if str(wishlist["user_id"]) != str(user["id"]):
         raise HTTPException(status_code=403, detail="Not your wishlist")
 
-    cur.execute(
-        """
-        SELECT DATE(viewed_at) as date, COUNT(*) as views
-        FROM wishlist_views
-        WHERE wishlist_id = %s AND viewed_at >= NOW() - INTERVAL '30 days'
-        GROUP BY DATE(viewed_at)
-        ORDER BY date ASC
+    # Rollups plus the raw rows the aggregator hasn't folded in yet
+    params = {"wishlist_id": wishlist_id}
+    await cur.execute(daily_views_sql("wishlist_id = %(wishlist_id)s"), params)
+    daily_views = await cur.fetchall()
+
+    await cur.execute(
+        f"""
+        SELECT hour, SUM(views)::int AS views
+        FROM (
+            SELECT hour, views
+            FROM wishlist_views_hourly
+            WHERE wishlist_id = %(wishlist_id)s AND hour >= date_trunc('hour', NOW(), 'UTC') - INTERVAL '47 hours'
+            UNION ALL
+            SELECT date_trunc('hour', viewed_at, 'UTC'), COUNT(*)
+            FROM wishlist_views
+            WHERE wishlist_id = %(wishlist_id)s AND {TAIL_CONDITION}
+              AND viewed_at >= date_trunc('hour', NOW(), 'UTC') - INTERVAL '47 hours'
+            GROUP BY 1
+        ) hours
+        GROUP BY hour
+        ORDER BY hour ASC
         """,
-        (wishlist_id,),
+        params,
     )
-    daily_views = [{"date": str(row["date"]), "views": row["views"]} for row in cur.fetchall()]
+    hourly_views = await cur.fetchall()
 
-    cur.execute(
-        "SELECT COUNT(DISTINCT viewer_ip) as unique_viewers FROM wishlist_views WHERE wishlist_id = %s",
-        (wishlist_id,),
-    )
-    unique_viewers = cur.fetchone()["unique_viewers"]
+    # HyperLogLog estimates; admins can get exact counts from /api/admin/wishlists/{id}/viewers
+    per_day, unique_viewers_30d, unique_viewers = await estimate_unique_viewers(cur, wishlist_id)
+    for day in daily_views:
+        day["unique_viewers"] = per_day.get(day["date"], 0)
 
-    cur.execute(
-        """
-        SELECT referrer, COUNT(*) as count
-        FROM wishlist_views
-        WHERE wishlist_id = %s AND referrer IS NOT NULL AND referrer != ''
+    await cur.execute(
+        f"""
+        SELECT referrer, SUM(views)::int AS count
+        FROM (
+            SELECT referrer, views FROM wishlist_referrers_daily WHERE wishlist_id = %(wishlist_id)s
+            UNION ALL
+            SELECT referrer, COUNT(*)
+            FROM wishlist_views
+            WHERE wishlist_id = %(wishlist_id)s AND {TAIL_CONDITION} AND referrer IS NOT NULL AND referrer != ''
+            GROUP BY referrer
+        ) refs
         GROUP BY referrer
         ORDER BY count DESC
         LIMIT 5
         """,
-        (wishlist_id,),
+        params,
     )
-    top_referrers = [dict(row) for row in cur.fetchall()]
+    top_referrers = await cur.fetchall()
 
-    return {
-        "wishlist_id": str(wishlist_id),
+    return json_response({
+        "wishlist_id": wishlist["id"],
         "title": wishlist["title"],
         "total_views": wishlist["view_count"],
         "unique_viewers": unique_viewers,
+        "unique_viewers_30d": unique_viewers_30d,
         "daily_views": daily_views,
+        "hourly_views": hourly_views,
         "top_referrers": top_referrers,
-    }
+    })
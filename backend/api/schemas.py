@@ -1,5 +1,5 @@
-from typing import Optional
-from pydantic import BaseModel, EmailStr
+from typing import List, Optional
+from pydantic import BaseModel, EmailStr, Field
 
 class UserRegister(BaseModel):
     email: str
@@ -40,6 +40,7 @@ class WishlistItemCreate(BaseModel):
     tag: Optional[str] = None
     url: Optional[str] = None
     image_url: Optional[str] = None
+    max_reservations: Optional[int] = Field(None, ge=1)
 
 class WishlistItemUpdate(BaseModel):
     name: Optional[str] = None
@@ -48,6 +49,7 @@ class WishlistItemUpdate(BaseModel):
     tag: Optional[str] = None
     url: Optional[str] = None
     image_url: Optional[str] = None
+    max_reservations: Optional[int] = Field(None, ge=1)
 
 class ClaimItem(BaseModel):
     name: str
@@ -84,3 +86,7 @@ class PromotedWishlistUpdate(BaseModel):
 
 class ScrapeRequest(BaseModel):
     url: str
+
+class ScrapeBatchRequest(BaseModel):
+    urls: List[str]
+    wishlist_id: Optional[str] = None
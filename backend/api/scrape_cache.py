@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from fastapi import HTTPException
+from psycopg.types.json import Jsonb
+
+from .cache import TTLCache
+from .database import get_pool
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_CACHE_TTL = float(os.environ.get("SCRAPE_CACHE_TTL", str(6 * 60 * 60)))
+# Failed scrapes (timeouts, 404s, blocked pages) are remembered for less time
+SCRAPE_CACHE_NEGATIVE_TTL = float(os.environ.get("SCRAPE_CACHE_NEGATIVE_TTL", "300"))
+SCRAPE_CACHE_SIZE = int(os.environ.get("SCRAPE_CACHE_SIZE", "2000"))
+# Share results across workers and restarts through the scrape_cache table
+SCRAPE_CACHE_DB = os.environ.get("SCRAPE_CACHE_DB", "0").lower() in ("1", "true", "yes")
+
+# Query parameters that identify the visitor, not the product
+TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "igshid", "mc_cid", "mc_eid", "ref", "ref_", "spm"}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical cache key for a product URL.
+
+    Lowercases scheme and host, drops default ports, fragments and tracking
+    parameters, and sorts what is left of the query string.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not (scheme == "http" and parts.port == 80) and not (scheme == "https" and parts.port == 443):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+class ScrapeCache:
+    """URL-keyed cache of scraped product details.
+
+    An in-memory LRU sits in front of an optional Postgres tier. Concurrent
+    misses for the same URL share one in-flight fetch. Failures raised as
+    HTTPException are cached for ``negative_ttl`` seconds.
+    """
+
+    def __init__(self, maxsize=SCRAPE_CACHE_SIZE, ttl=SCRAPE_CACHE_TTL, negative_ttl=SCRAPE_CACHE_NEGATIVE_TTL,
+                 use_db=SCRAPE_CACHE_DB):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.use_db = use_db
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight = {}
+        self._stats = {
+            "db_hits": 0,
+            "negative_hits": 0,
+            "coalesced": 0,
+            "fetches": 0,
+            "saved_ms": 0.0,
+        }
+
+    async def get_or_fetch(self, key, fetch):
+        """Return ``(product, cached)`` for ``key``, calling ``fetch()`` on a miss."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            cached = True
+            self._stats["saved_ms"] += entry["fetch_ms"]
+        else:
+            task = self._inflight.get(key)
+            leader = task is None
+            if leader:
+                task = asyncio.ensure_future(self._load(key, fetch))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            else:
+                self._stats["coalesced"] += 1
+            # Shielded so one client disconnecting doesn't cancel the shared fetch
+            entry, cached = await asyncio.shield(task)
+            cached = cached or not leader
+
+        if entry.get("error_status"):
+            if cached:
+                self._stats["negative_hits"] += 1
+            raise HTTPException(status_code=entry["error_status"], detail=entry["error_detail"])
+        return entry["result"], cached
+
+    async def _load(self, key, fetch):
+        entry = await self._db_get(key) if self.use_db else None
+        if entry is not None:
+            self._stats["db_hits"] += 1
+            self._stats["saved_ms"] += entry["fetch_ms"]
+            self._memory.set(key, entry, ttl=entry.pop("ttl"))
+            return entry, True
+
+        self._stats["fetches"] += 1
+        start = time.perf_counter()
+        try:
+            entry = {"result": await fetch()}
+            ttl = self.ttl
+        except HTTPException as e:
+            entry = {"error_status": e.status_code, "error_detail": e.detail}
+            ttl = self.negative_ttl
+        entry["fetch_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+        self._memory.set(key, entry, ttl=ttl)
+        if self.use_db:
+            await self._db_set(key, entry, ttl)
+        return entry, False
+
+    async def _db_get(self, key):
+        try:
+            pool = await get_pool()
+            async with pool.connection() as conn:
+                cur = conn.cursor()
+                await cur.execute(
+                    """
+                    SELECT result, error_status, error_detail, fetch_ms,
+                           EXTRACT(EPOCH FROM expires_at - NOW()) AS ttl
+                    FROM scrape_cache
+                    WHERE url_key = %s AND expires_at > NOW()
+                    """,
+                    (key,),
+                )
+                row = await cur.fetchone()
+        except Exception as e:
+            logger.warning("Scrape cache read failed: %s", e)
+            return None
+        if not row:
+            return None
+        entry = {"fetch_ms": row["fetch_ms"], "ttl": float(row["ttl"])}
+        if row["error_status"]:
+            entry["error_status"] = row["error_status"]
+            entry["error_detail"] = row["error_detail"]
+        else:
+            entry["result"] = row["result"]
+        return entry
+
+    async def _db_set(self, key, entry, ttl):
+        try:
+            pool = await get_pool()
+            async with pool.connection() as conn:
+                cur = conn.cursor()
+                await cur.execute(
+                    """
+                    INSERT INTO scrape_cache (url_key, result, error_status, error_detail, fetch_ms, expires_at)
+                    VALUES (%s, %s, %s, %s, %s, NOW() + make_interval(secs => %s))
+                    ON CONFLICT (url_key) DO UPDATE SET
+                        result = EXCLUDED.result,
+                        error_status = EXCLUDED.error_status,
+                        error_detail = EXCLUDED.error_detail,
+                        fetch_ms = EXCLUDED.fetch_ms,
+                        expires_at = EXCLUDED.expires_at
+                    """,
+                    (
+                        key,
+                        Jsonb(entry["result"]) if "result" in entry else None,
+                        entry.get("error_status"),
+                        entry.get("error_detail"),
+                        entry["fetch_ms"],
+                        ttl,
+                    ),
+                )
+                # Occasionally sweep expired rows so the table doesn't grow forever
+                if random.random() < 0.01:
+                    await cur.execute("DELETE FROM scrape_cache WHERE expires_at < NOW()")
+        except Exception as e:
+            logger.warning("Scrape cache write failed: %s", e)
+
+    def stats(self):
+        memory = self._memory.stats()
+        hits = memory["hits"] + self._stats["db_hits"] + self._stats["coalesced"]
+        lookups = memory["hits"] + memory["misses"]
+        return {
+            **self._stats,
+            "size": memory["size"],
+            "maxsize": memory["maxsize"],
+            "memory_hits": memory["hits"],
+            "misses": self._stats["fetches"],
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "saved_ms": round(self._stats["saved_ms"], 3),
+        }
+
+
+scrape_cache = ScrapeCache()
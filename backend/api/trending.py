@@ -0,0 +1,76 @@
+import hashlib
+import math
+import os
+
+from .scrape_cache import normalize_url
+
+# A product added once now counts as much as one added twice a half-life ago
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get("TRENDING_HALF_LIFE_HOURS", "72"))
+DECAY_RATE = math.log(2) / (TRENDING_HALF_LIFE_HOURS * 3600)
+
+# trending_products.log_score is ln(sum(exp(DECAY_RATE * added_at))) over
+# every add of the product. Rank order under exponential decay doesn't change
+# as time passes, so the stored value never needs rewriting and a plain
+# btree index on it gives the top k. Adds are merged with log-sum-exp, which
+# stays finite where summing the raw exponentials would overflow.
+# Changing TRENDING_HALF_LIFE_HOURS invalidates stored scores; rebuild them
+# with scripts/backfill_trending.py.
+UPSERT_SQL = """
+    INSERT INTO trending_products AS t
+        (product_key, name, url, image_url, price, currency, log_score, add_count, last_added_at)
+    SELECT v.product_key, v.name, v.url, v.image_url, v.price, v.currency,
+           %s * EXTRACT(EPOCH FROM NOW()) + LN(v.n), v.n, NOW()
+    FROM unnest(%s::text[], %s::text[], %s::text[], %s::text[], %s::numeric[], %s::text[], %s::int[])
+         AS v(product_key, name, url, image_url, price, currency, n)
+    ON CONFLICT (product_key) DO UPDATE SET
+        log_score = GREATEST(t.log_score, EXCLUDED.log_score)
+                    + LN(1 + EXP(-ABS(t.log_score - EXCLUDED.log_score))),
+        add_count = t.add_count + EXCLUDED.add_count,
+        last_added_at = EXCLUDED.last_added_at,
+        name = EXCLUDED.name,
+        url = COALESCE(EXCLUDED.url, t.url),
+        image_url = COALESCE(EXCLUDED.image_url, t.image_url),
+        price = COALESCE(EXCLUDED.price, t.price),
+        currency = EXCLUDED.currency
+"""
+
+
+def product_key(name, url=None):
+    """Identity of a product across wishlists: its canonical URL, else its name."""
+    if url and url.strip():
+        return "url:" + normalize_url(url if "://" in url else "https://" + url.strip())
+    folded = " ".join((name or "").lower().split())
+    return "name:" + hashlib.sha1(folded.encode()).hexdigest()
+
+
+async def record_item_adds(cur, items):
+    """Add one trending event per item (dicts with name, url, image_url, price, currency).
+
+    Runs on the caller's cursor, so the scores commit with the items.
+    """
+    grouped = {}
+    for item in items:
+        key = product_key(item["name"], item.get("url"))
+        if key in grouped:
+            grouped[key]["n"] += 1
+        else:
+            grouped[key] = {**item, "n": 1}
+    if not grouped:
+        return
+
+    # Sorted keys keep row lock order stable across concurrent adds
+    keys = sorted(grouped)
+    rows = [grouped[k] for k in keys]
+    await cur.execute(
+        UPSERT_SQL,
+        (
+            DECAY_RATE,
+            keys,
+            [r["name"] for r in rows],
+            [r.get("url") for r in rows],
+            [r.get("image_url") for r in rows],
+            [r.get("price") for r in rows],
+            [r.get("currency") or "NGN" for r in rows],
+            [r["n"] for r in rows],
+        ),
+    )
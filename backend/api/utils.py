@@ -1,8 +1,24 @@
+import asyncio
 import os
 import re
 import secrets
+import threading
 import bcrypt
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
+from fastapi import HTTPException
+
+# bcrypt work factor for new hashes; existing hashes are upgraded on login
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so a small thread pool hashes in parallel
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", "2"))
+# Hashes running or queued before new ones are rejected with a 503
+HASH_MAX_PENDING = int(os.environ.get("HASH_MAX_PENDING", "16"))
+
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_stats = {"pending": 0, "completed": 0, "failed": 0, "rejected": 0}
+# Done-callbacks run on the worker threads
+_hash_stats_lock = threading.Lock()
 
 def get_limit(limit_string: str) -> str:
     if os.environ.get("ENV") == "test":
@@ -10,11 +26,60 @@ def get_limit(limit_string: str) -> str:
     return limit_string
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
 
 def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
 
+def password_needs_rehash(hashed: str) -> bool:
+    """True when a stored hash ($2b$<cost>$...) was made with a different cost."""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+def _hashing_done(future):
+    # Called once the worker is really finished (or the job was cancelled
+    # before it started), so pending counts the threads' actual work even
+    # when the awaiting request has gone away
+    with _hash_stats_lock:
+        _hash_stats["pending"] -= 1
+        if future.cancelled():
+            return
+        if future.exception() is None:
+            _hash_stats["completed"] += 1
+        else:
+            _hash_stats["failed"] += 1
+
+async def _run_hashing(fn, *args):
+    # Shed load instead of letting a login burst queue up unbounded CPU work
+    with _hash_stats_lock:
+        if _hash_stats["pending"] >= HASH_MAX_PENDING:
+            _hash_stats["rejected"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        _hash_stats["pending"] += 1
+    future = _hash_executor.submit(fn, *args)
+    future.add_done_callback(_hashing_done)
+    return await asyncio.wrap_future(future)
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hashing(hash_password, password)
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return await _run_hashing(verify_password, password, hashed)
+
+def hashing_stats() -> dict:
+    with _hash_stats_lock:
+        stats = dict(_hash_stats)
+    return {**stats, "max_pending": HASH_MAX_PENDING, "workers": HASH_WORKERS, "rounds": BCRYPT_ROUNDS}
+
+def shutdown_hashing():
+    _hash_executor.shutdown(wait=False, cancel_futures=True)
+
 def create_session_token() -> str:
     return secrets.token_urlsafe(48)
 
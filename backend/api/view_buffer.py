@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import psycopg
+
+from .database import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Flush when this many view events are pending, or every FLUSH_INTERVAL seconds
+VIEW_BUFFER_MAX_EVENTS = int(os.environ.get("VIEW_BUFFER_MAX_EVENTS", "500"))
+VIEW_BUFFER_FLUSH_INTERVAL = float(os.environ.get("VIEW_BUFFER_FLUSH_INTERVAL", "2"))
+# Events kept for retry after a failed flush before we start dropping them
+VIEW_BUFFER_MAX_BACKLOG = int(os.environ.get("VIEW_BUFFER_MAX_BACKLOG", "10000"))
+# wishlist_views.viewer_ip is VARCHAR(45), long enough for any IPv6 address
+VIEWER_IP_MAX_LENGTH = 45
+
+
+class ViewBuffer:
+    """Write-behind buffer for public wishlist views.
+
+    Views are appended in memory on the request path and written in batches
+    by a background task: one multi-row INSERT into ``wishlist_views`` and
+    one UPDATE that applies the coalesced per-wishlist ``view_count``
+    increments. Each worker process owns its own buffer.
+
+    A batch that fails is retried on the next flush, except one the database
+    rejects as bad data: that one would fail every retry, so it is split until
+    the rejected events are on their own, and those are dropped.
+    """
+
+    def __init__(self, max_events=VIEW_BUFFER_MAX_EVENTS, flush_interval=VIEW_BUFFER_FLUSH_INTERVAL,
+                 max_backlog=VIEW_BUFFER_MAX_BACKLOG):
+        self.max_events = max_events
+        self.flush_interval = flush_interval
+        self.max_backlog = max_backlog
+
+        self._events = []
+        self._counts = {}
+        # Increments taken by an in-progress flush but not yet committed
+        self._flushing = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+        self._stats = {
+            "flushes": 0,
+            "flushed_events": 0,
+            "failed_flushes": 0,
+            "dropped_events": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    def record(self, wishlist_id, viewer_ip, user_agent, referrer):
+        # X-Forwarded-For is client-controlled: keep the first hop, at a length the column takes
+        viewer_ip = viewer_ip.split(",", 1)[0].strip()[:VIEWER_IP_MAX_LENGTH]
+        self._events.append((wishlist_id, viewer_ip, user_agent, referrer, datetime.now(timezone.utc)))
+        self._counts[wishlist_id] = self._counts.get(wishlist_id, 0) + 1
+        if len(self._events) >= self.max_events:
+            self._wakeup.set()
+
+    def pending_views(self, wishlist_id):
+        """Views recorded for a wishlist that are not yet in ``view_count``."""
+        return self._counts.get(wishlist_id, 0) + self._flushing.get(wishlist_id, 0)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and drain whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._events:
+                return
+            events, self._events = self._events, []
+            counts, self._counts = self._counts, {}
+            self._flushing = dict(counts)
+
+            start = time.perf_counter()
+            try:
+                await self._flush_batch(events, counts)
+            finally:
+                self._flushing = {}
+                self._stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+    async def _flush_batch(self, events, counts):
+        try:
+            await self._write(events, counts)
+        except psycopg.DataError:
+            if len(events) == 1:
+                logger.warning("View buffer dropped an event the database rejected: %r", events[0])
+                self._stats["dropped_events"] += 1
+            else:
+                logger.warning("View buffer batch rejected, splitting it (%d events)", len(events))
+                middle = len(events) // 2
+                for half in (events[:middle], events[middle:]):
+                    await self._flush_batch(half, Counter(event[0] for event in half))
+                return
+        except Exception:
+            logger.exception("View buffer flush failed (%d events)", len(events))
+            self._stats["failed_flushes"] += 1
+            self._requeue(events, counts)
+        else:
+            self._stats["flushes"] += 1
+            self._stats["flushed_events"] += len(events)
+        # Committed, requeued or dropped: no longer pending for this flush
+        for wishlist_id, n in counts.items():
+            self._flushing[wishlist_id] -= n
+
+    async def _write(self, events, counts):
+        pool = await get_pool()
+        async with pool.connection() as conn:
+            cur = conn.cursor()
+            # Views for wishlists deleted since they were recorded are dropped by the join
+            await cur.execute(
+                """
+                INSERT INTO wishlist_views (wishlist_id, viewer_ip, user_agent, referrer, viewed_at)
+                SELECT v.wishlist_id, v.viewer_ip, v.user_agent, v.referrer, v.viewed_at
+                FROM unnest(%s::uuid[], %s::text[], %s::text[], %s::text[], %s::timestamptz[])
+                     AS v(wishlist_id, viewer_ip, user_agent, referrer, viewed_at)
+                JOIN wishlists w ON w.id = v.wishlist_id
+                """,
+                [list(column) for column in zip(*events)],
+            )
+            # Sorted ids keep row lock order stable across concurrent flushes
+            wishlist_ids = sorted(counts, key=str)
+            await cur.execute(
+                """
+                UPDATE wishlists w SET view_count = w.view_count + v.n
+                FROM unnest(%s::uuid[], %s::int[]) AS v(id, n)
+                WHERE w.id = v.id
+                """,
+                (wishlist_ids, [counts[i] for i in wishlist_ids]),
+            )
+
+    def _requeue(self, events, counts):
+        room = self.max_backlog - len(self._events)
+        if room < len(events):
+            self._stats["dropped_events"] += len(events)
+            return
+        self._events[:0] = events
+        for wishlist_id, n in counts.items():
+            self._counts[wishlist_id] = self._counts.get(wishlist_id, 0) + n
+
+    def stats(self):
+        return {**self._stats, "pending_events": len(self._events)}
+
+
+view_buffer = ViewBuffer()
@@ -0,0 +1,343 @@
+import asyncio
+import logging
+import os
+import time
+
+from psycopg.rows import tuple_row
+
+from .database import db_connection
+from .hll import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+# How often raw wishlist_views rows are folded into the rollup tables
+VIEW_ROLLUP_INTERVAL = float(os.environ.get("VIEW_ROLLUP_INTERVAL", "60"))
+# Seconds a seq high-water mark must age before it is trusted: inserts that
+# drew a lower seq may still commit until then
+VIEW_ROLLUP_SETTLE = float(os.environ.get("VIEW_ROLLUP_SETTLE", "30"))
+# Largest seq range folded in one transaction when catching up
+VIEW_ROLLUP_BATCH = int(os.environ.get("VIEW_ROLLUP_BATCH", "50000"))
+
+# pg advisory lock key so only one worker aggregates at a time
+ROLLUP_LOCK_KEY = 5_301_100_016
+
+# {batch} selects the raw rows to fold in: (wishlist_id, viewer_ip, referrer, viewed_at).
+# Everything is additive, so each raw row must go through here exactly once.
+# Returns the number of views folded in. Unique viewers are sketched
+# separately, from VIEWERS_SQL over the same batch.
+ROLLUP_SQL = """
+    WITH batch AS MATERIALIZED (
+        SELECT wishlist_id, NULLIF(referrer, '') AS referrer,
+               date_trunc('hour', viewed_at, 'UTC') AS hour,
+               (viewed_at AT TIME ZONE 'UTC')::date AS day
+        FROM ({batch}) b
+    ),
+    hourly AS (
+        INSERT INTO wishlist_views_hourly (wishlist_id, hour, views)
+        SELECT wishlist_id, hour, COUNT(*) FROM batch GROUP BY wishlist_id, hour
+        ON CONFLICT (wishlist_id, hour) DO UPDATE SET views = wishlist_views_hourly.views + EXCLUDED.views
+    ),
+    referrers AS (
+        INSERT INTO wishlist_referrers_daily (wishlist_id, day, referrer, views)
+        SELECT wishlist_id, day, referrer, COUNT(*) FROM batch
+        WHERE referrer IS NOT NULL
+        GROUP BY wishlist_id, day, referrer
+        ON CONFLICT (wishlist_id, day, referrer) DO UPDATE SET views = wishlist_referrers_daily.views + EXCLUDED.views
+    ),
+    daily AS (
+        INSERT INTO wishlist_views_daily (wishlist_id, day, views)
+        SELECT wishlist_id, day, COUNT(*) FROM batch GROUP BY wishlist_id, day
+        ON CONFLICT (wishlist_id, day) DO UPDATE SET views = wishlist_views_daily.views + EXCLUDED.views
+    )
+    SELECT COUNT(*) AS views FROM batch
+"""
+
+VIEWERS_SQL = """
+    SELECT DISTINCT wishlist_id, (viewed_at AT TIME ZONE 'UTC')::date AS day, viewer_ip
+    FROM ({batch}) b
+    WHERE viewer_ip IS NOT NULL
+"""
+
+# Stored sketches for the keys a batch touches; day is NULL for the all-time one
+LOAD_SKETCHES_SQL = """
+    SELECT wishlist_id, day, viewers_hll
+    FROM wishlist_views_daily
+    WHERE (wishlist_id, day) IN (SELECT * FROM unnest(%s::uuid[], %s::date[])) AND viewers_hll IS NOT NULL
+    UNION ALL
+    SELECT wishlist_id, NULL, viewers_hll
+    FROM wishlist_view_totals
+    WHERE wishlist_id = ANY(%s::uuid[])
+"""
+
+# The daily rows already exist: ROLLUP_SQL runs first over the same batch
+SAVE_DAY_SKETCHES_SQL = """
+    UPDATE wishlist_views_daily d SET viewers_hll = v.sketch, unique_viewers = v.estimate
+    FROM unnest(%s::uuid[], %s::date[], %s::bytea[], %s::int[]) AS v(wishlist_id, day, sketch, estimate)
+    WHERE d.wishlist_id = v.wishlist_id AND d.day = v.day
+"""
+
+SAVE_TOTAL_SKETCHES_SQL = """
+    INSERT INTO wishlist_view_totals (wishlist_id, viewers_hll, unique_viewers)
+    SELECT * FROM unnest(%s::uuid[], %s::bytea[], %s::int[])
+    ON CONFLICT (wishlist_id) DO UPDATE SET
+        viewers_hll = EXCLUDED.viewers_hll,
+        unique_viewers = EXCLUDED.unique_viewers
+"""
+
+
+def sketch_viewers(rows):
+    """Sketch (wishlist_id, day, viewer_ip) rows per wishlist-day and per wishlist."""
+    days = {}
+    totals = {}
+    for wishlist_id, day, viewer_ip in rows:
+        days.setdefault((wishlist_id, day), HyperLogLog()).add(viewer_ip)
+        totals.setdefault(wishlist_id, HyperLogLog()).add(viewer_ip)
+    return days, totals
+
+
+def load_params(days, totals):
+    keys = list(days)
+    return [k[0] for k in keys], [k[1] for k in keys], list(totals)
+
+
+def merge_stored(days, totals, stored_rows):
+    """Fold the LOAD_SKETCHES_SQL rows into freshly built sketches."""
+    for wishlist_id, day, data in stored_rows:
+        target = totals[wishlist_id] if day is None else days[(wishlist_id, day)]
+        target.merge(HyperLogLog.from_bytes(data))
+
+
+def save_params(days, totals):
+    """Parameters for SAVE_DAY_SKETCHES_SQL and SAVE_TOTAL_SKETCHES_SQL."""
+    day_keys = sorted(days, key=lambda k: (str(k[0]), k[1]))
+    total_keys = sorted(totals, key=str)
+    return (
+        (
+            [k[0] for k in day_keys],
+            [k[1] for k in day_keys],
+            [days[k].to_bytes() for k in day_keys],
+            [days[k].estimate() for k in day_keys],
+        ),
+        (
+            total_keys,
+            [totals[k].to_bytes() for k in total_keys],
+            [totals[k].estimate() for k in total_keys],
+        ),
+    )
+
+
+SEQ_RANGE_BATCH = """
+    SELECT wishlist_id, viewer_ip, referrer, viewed_at
+    FROM wishlist_views
+    WHERE seq > %(after_seq)s AND seq <= %(through_seq)s
+"""
+
+# Raw rows the aggregator has not reached yet, for the endpoints to add on
+# top of the rollups. Pair it with a wishlist_id filter.
+TAIL_CONDITION = "seq > (SELECT last_seq FROM view_rollup_state WHERE id = 1)"
+
+
+def daily_views_sql(wishlist_filter):
+    """Views per UTC day over the last 30 days, rollups plus the raw tail.
+
+    ``wishlist_filter`` is a condition on ``wishlist_id`` selecting the
+    wishlists to add up.
+    """
+    return f"""
+        SELECT day AS date, SUM(views)::int AS views
+        FROM (
+            SELECT day, views
+            FROM wishlist_views_daily
+            WHERE {wishlist_filter} AND day >= (NOW() AT TIME ZONE 'UTC')::date - 30
+            UNION ALL
+            SELECT (viewed_at AT TIME ZONE 'UTC')::date, COUNT(*)
+            FROM wishlist_views
+            WHERE {wishlist_filter} AND {TAIL_CONDITION}
+              AND viewed_at >= ((NOW() AT TIME ZONE 'UTC')::date - 30) AT TIME ZONE 'UTC'
+            GROUP BY 1
+        ) days
+        GROUP BY day
+        ORDER BY day ASC
+    """
+
+
+# Everything estimate_unique_viewers() needs in one round trip: the all-time sketch,
+# the last 30 days of daily sketches, and distinct viewers in the raw tail
+UNIQUE_VIEWERS_SQL = f"""
+    SELECT 'total' AS source, NULL::date AS day, viewers_hll, unique_viewers, NULL AS viewer_ip
+    FROM wishlist_view_totals
+    WHERE wishlist_id = %(wishlist_id)s
+    UNION ALL
+    SELECT 'day', day, viewers_hll, unique_viewers, NULL
+    FROM wishlist_views_daily
+    WHERE wishlist_id = %(wishlist_id)s AND day >= (NOW() AT TIME ZONE 'UTC')::date - 30
+    UNION ALL
+    SELECT DISTINCT
+        CASE WHEN viewed_at >= ((NOW() AT TIME ZONE 'UTC')::date - 30) AT TIME ZONE 'UTC' THEN 'tail' ELSE 'old_tail' END,
+        (viewed_at AT TIME ZONE 'UTC')::date, NULL::bytea, NULL::int, viewer_ip
+    FROM wishlist_views
+    WHERE wishlist_id = %(wishlist_id)s AND {TAIL_CONDITION} AND viewer_ip IS NOT NULL
+"""
+
+
+async def estimate_unique_viewers(cur, wishlist_id):
+    """Estimated distinct viewers of one wishlist, within ``hll.STANDARD_ERROR``.
+
+    Returns ``(per_day, last_30_days, all_time)`` where ``per_day`` maps
+    each UTC day of the window to its count. Stored estimates are used as
+    they are; sketches are only decoded to merge days or add the tail.
+    """
+    await cur.execute(UNIQUE_VIEWERS_SQL, {"wishlist_id": wishlist_id})
+    total = None
+    days = {}
+    tail = {}
+    old_tail = []
+    for row in await cur.fetchall():
+        if row["source"] == "total":
+            total = row
+        elif row["source"] == "day":
+            days[row["day"]] = row
+        elif row["source"] == "tail":
+            tail.setdefault(row["day"], []).append(row["viewer_ip"])
+        else:
+            old_tail.append(row["viewer_ip"])
+
+    per_day = {}
+    window = HyperLogLog()
+    for day in sorted(days.keys() | tail.keys()):
+        stored = days.get(day)
+        sketch = HyperLogLog.from_bytes(stored["viewers_hll"]) if stored and stored["viewers_hll"] else HyperLogLog()
+        if day in tail:
+            per_day[day] = sketch.update(tail[day]).estimate()
+        else:
+            per_day[day] = stored["unique_viewers"]
+        window.merge(sketch)
+
+    if not tail and not old_tail:
+        all_time = total["unique_viewers"] if total else 0
+    else:
+        sketch = HyperLogLog.from_bytes(total["viewers_hll"]) if total else HyperLogLog()
+        for viewer_ips in tail.values():
+            sketch.update(viewer_ips)
+        all_time = sketch.update(old_tail).estimate()
+    return per_day, window.estimate(), all_time
+
+
+class ViewRollups:
+    """Background aggregator for the wishlist analytics rollups.
+
+    Every ``interval`` seconds one worker, under a Postgres advisory lock,
+    folds the ``wishlist_views`` rows past the ``view_rollup_state``
+    watermark into the hourly, daily and referrer tables and the viewer
+    sketches. Only seq values seen at least ``settle`` seconds ago are
+    folded, so a flush that commits out of seq order is never skipped.
+    """
+
+    def __init__(self, interval=VIEW_ROLLUP_INTERVAL, settle=VIEW_ROLLUP_SETTLE, batch_size=VIEW_ROLLUP_BATCH):
+        self.interval = interval
+        self.settle = settle
+        self.batch_size = batch_size
+
+        self._task = None
+
+        self._stats = {
+            "runs": 0,
+            "rolled_up_views": 0,
+            "failed_runs": 0,
+            "last_seq": None,
+            "last_run_ms": 0.0,
+        }
+
+    async def aggregate(self):
+        """Fold one batch into the rollups.
+
+        Returns True when settled rows are still left over, i.e. the batch
+        limit was hit and the caller should go again.
+        """
+        start = time.perf_counter()
+        async with db_connection() as conn:
+            cur = conn.cursor()
+            await cur.execute("SELECT pg_try_advisory_xact_lock(%s) AS locked", (ROLLUP_LOCK_KEY,))
+            if not (await cur.fetchone())["locked"]:
+                return False
+            await cur.execute(
+                """
+                SELECT last_seq, seen_seq, seen_at <= NOW() - make_interval(secs => %s) AS settled
+                FROM view_rollup_state WHERE id = 1
+                FOR UPDATE
+                """,
+                (self.settle,),
+            )
+            state = await cur.fetchone()
+            if not state["settled"]:
+                return False
+
+            through_seq = min(state["seen_seq"], state["last_seq"] + self.batch_size)
+            if through_seq > state["last_seq"]:
+                params = {"after_seq": state["last_seq"], "through_seq": through_seq}
+                await cur.execute(ROLLUP_SQL.format(batch=SEQ_RANGE_BATCH), params)
+                self._stats["rolled_up_views"] += (await cur.fetchone())["views"]
+                await self._add_viewers(conn, params)
+            behind = through_seq < state["seen_seq"]
+            if behind:
+                await cur.execute("UPDATE view_rollup_state SET last_seq = %s WHERE id = 1", (through_seq,))
+            else:
+                # Caught up: take a new high-water mark for the next pass
+                await cur.execute(
+                    """
+                    UPDATE view_rollup_state
+                    SET last_seq = %s,
+                        seen_seq = GREATEST(%s, (SELECT MAX(seq) FROM wishlist_views)),
+                        seen_at = NOW()
+                    WHERE id = 1
+                    """,
+                    (through_seq, through_seq),
+                )
+        self._stats["runs"] += 1
+        self._stats["last_seq"] = through_seq
+        self._stats["last_run_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return behind
+
+    @staticmethod
+    async def _add_viewers(conn, params):
+        # Read-modify-write of the stored sketches is safe: the advisory
+        # lock makes this the only writer
+        cur = conn.cursor(row_factory=tuple_row)
+        await cur.execute(VIEWERS_SQL.format(batch=SEQ_RANGE_BATCH), params)
+        days, totals = sketch_viewers(await cur.fetchall())
+        if not totals:
+            return
+        await cur.execute(LOAD_SKETCHES_SQL, load_params(days, totals))
+        merge_stored(days, totals, await cur.fetchall())
+        day_params, total_params = save_params(days, totals)
+        await cur.execute(SAVE_DAY_SKETCHES_SQL, day_params)
+        await cur.execute(SAVE_TOTAL_SKETCHES_SQL, total_params)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                while await self.aggregate():
+                    pass
+            except Exception:
+                logger.exception("View rollup aggregation failed")
+                self._stats["failed_runs"] += 1
+
+    def stats(self):
+        return dict(self._stats)
+
+
+view_rollups = ViewRollups()
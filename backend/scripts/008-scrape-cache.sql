@@ -0,0 +1,12 @@
+-- Shared tier of the scraper result cache (used when SCRAPE_CACHE_DB=1)
+CREATE TABLE IF NOT EXISTS scrape_cache (
+    url_key TEXT PRIMARY KEY,
+    result JSONB,
+    error_status INTEGER,
+    error_detail TEXT,
+    fetch_ms REAL NOT NULL DEFAULT 0,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Index for sweeping expired entries
+CREATE INDEX IF NOT EXISTS idx_scrape_cache_expires_at ON scrape_cache(expires_at);
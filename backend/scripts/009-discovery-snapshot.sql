@@ -0,0 +1,7 @@
+-- Precomputed discovery feed (trending / promoted / curated), rebuilt in the
+-- background by api/discovery_feed.py instead of on every homepage load
+CREATE TABLE IF NOT EXISTS discovery_snapshot (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    payload JSONB NOT NULL,
+    refreshed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,16 @@
+-- Time-decayed trending scores per product, maintained incrementally by
+-- api/trending.py when items are added to public wishlists
+CREATE TABLE IF NOT EXISTS trending_products (
+    product_key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    url TEXT,
+    image_url TEXT,
+    price NUMERIC,
+    currency TEXT DEFAULT 'NGN',
+    log_score DOUBLE PRECISION NOT NULL,
+    add_count INTEGER NOT NULL DEFAULT 0,
+    last_added_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Top-k read for the discovery feed
+CREATE INDEX IF NOT EXISTS idx_trending_products_log_score ON trending_products(log_score DESC);
@@ -0,0 +1,17 @@
+-- Full-text search over public wishlists and their items (GET /api/search).
+-- Generated columns rewrite both tables once; on a large database run this
+-- in a maintenance window.
+ALTER TABLE wishlists ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED;
+
+ALTER TABLE wishlist_items ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(tag, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_wishlists_search ON wishlists USING GIN (search_vector) WHERE is_public = true;
+CREATE INDEX IF NOT EXISTS idx_wishlist_items_search ON wishlist_items USING GIN (search_vector);
@@ -0,0 +1,9 @@
+-- Trigram indexes for typo-tolerant search. Kept separate from 011 so full-text
+-- search still works on servers without the pg_trgm contrib module; the API
+-- only uses fuzzy matching when the extension is installed.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_wishlists_title_trgm ON wishlists USING GIN (title gin_trgm_ops) WHERE is_public = true;
+CREATE INDEX IF NOT EXISTS idx_wishlists_description_trgm ON wishlists USING GIN (description gin_trgm_ops) WHERE is_public = true;
+CREATE INDEX IF NOT EXISTS idx_wishlist_items_name_trgm ON wishlist_items USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_wishlist_items_tag_trgm ON wishlist_items USING GIN (tag gin_trgm_ops);
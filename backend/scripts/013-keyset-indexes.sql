@@ -0,0 +1,6 @@
+-- Composite indexes backing keyset pagination on (created_at, id), newest first
+CREATE INDEX IF NOT EXISTS idx_wishlists_user_created ON wishlists(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_wishlists_created ON wishlists(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_users_created ON users(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_promoted_items_created_id ON promoted_items(created_at DESC, id DESC);
+DROP INDEX IF EXISTS idx_promoted_items_created_at;
@@ -0,0 +1,67 @@
+-- Denormalized counters kept in step by statement-level triggers, so bulk
+-- inserts (clone) and cascading deletes update each parent row once.
+-- Existing rows start at 0: run scripts/backfill_counters.py after this.
+ALTER TABLE wishlists ADD COLUMN IF NOT EXISTS item_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE wishlist_items ADD COLUMN IF NOT EXISTS reservation_count INTEGER NOT NULL DEFAULT 0;
+
+-- wishlists.item_count
+CREATE OR REPLACE FUNCTION wishlist_items_count_insert() RETURNS trigger AS $$
+BEGIN
+    UPDATE wishlists w SET item_count = w.item_count + n.added
+    FROM (SELECT wishlist_id, COUNT(*) AS added FROM new_items GROUP BY wishlist_id) n
+    WHERE w.id = n.wishlist_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION wishlist_items_count_delete() RETURNS trigger AS $$
+BEGIN
+    UPDATE wishlists w SET item_count = w.item_count - o.removed
+    FROM (SELECT wishlist_id, COUNT(*) AS removed FROM old_items GROUP BY wishlist_id) o
+    WHERE w.id = o.wishlist_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_wishlist_items_count_insert ON wishlist_items;
+CREATE TRIGGER trg_wishlist_items_count_insert
+    AFTER INSERT ON wishlist_items
+    REFERENCING NEW TABLE AS new_items
+    FOR EACH STATEMENT EXECUTE FUNCTION wishlist_items_count_insert();
+
+DROP TRIGGER IF EXISTS trg_wishlist_items_count_delete ON wishlist_items;
+CREATE TRIGGER trg_wishlist_items_count_delete
+    AFTER DELETE ON wishlist_items
+    REFERENCING OLD TABLE AS old_items
+    FOR EACH STATEMENT EXECUTE FUNCTION wishlist_items_count_delete();
+
+-- wishlist_items.reservation_count
+CREATE OR REPLACE FUNCTION item_reservations_count_insert() RETURNS trigger AS $$
+BEGIN
+    UPDATE wishlist_items i SET reservation_count = i.reservation_count + n.added
+    FROM (SELECT item_id, COUNT(*) AS added FROM new_reservations GROUP BY item_id) n
+    WHERE i.id = n.item_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION item_reservations_count_delete() RETURNS trigger AS $$
+BEGIN
+    UPDATE wishlist_items i SET reservation_count = i.reservation_count - o.removed
+    FROM (SELECT item_id, COUNT(*) AS removed FROM old_reservations GROUP BY item_id) o
+    WHERE i.id = o.item_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_item_reservations_count_insert ON item_reservations;
+CREATE TRIGGER trg_item_reservations_count_insert
+    AFTER INSERT ON item_reservations
+    REFERENCING NEW TABLE AS new_reservations
+    FOR EACH STATEMENT EXECUTE FUNCTION item_reservations_count_insert();
+
+DROP TRIGGER IF EXISTS trg_item_reservations_count_delete ON item_reservations;
+CREATE TRIGGER trg_item_reservations_count_delete
+    AFTER DELETE ON item_reservations
+    REFERENCING OLD TABLE AS old_reservations
+    FOR EACH STATEMENT EXECUTE FUNCTION item_reservations_count_delete();
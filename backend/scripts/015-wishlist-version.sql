@@ -0,0 +1,67 @@
+-- wishlists.version changes whenever anything a guest sees on the public
+-- page changes, apart from reservations, which have their own per-item
+-- counter below. GET /api/wishlists/{slug} turns both into an ETag and uses
+-- it to validate its per-worker response cache. View and like counts are
+-- deliberately left out: they change all the time and would defeat the
+-- cache, and the endpoint reads them fresh on every request anyway.
+ALTER TABLE wishlists ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1;
+
+-- Metadata, plus item adds/deletes through item_count (014's triggers)
+CREATE OR REPLACE FUNCTION wishlists_bump_version() RETURNS trigger AS $$
+BEGIN
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_wishlists_bump_version ON wishlists;
+CREATE TRIGGER trg_wishlists_bump_version
+    BEFORE UPDATE ON wishlists
+    FOR EACH ROW
+    WHEN (OLD.version = NEW.version AND
+          (OLD.title, OLD.description, OLD.slug, OLD.is_public, OLD.user_id, OLD.item_count)
+          IS DISTINCT FROM
+          (NEW.title, NEW.description, NEW.slug, NEW.is_public, NEW.user_id, NEW.item_count))
+    EXECUTE FUNCTION wishlists_bump_version();
+
+-- Claims and unclaims. 014's triggers update reservation_count on every
+-- reservation insert and delete; counting them here, on the item row the
+-- claim already locks, keeps claims off the wishlists row. The endpoint adds
+-- up its items' reservation_version into the ETag.
+ALTER TABLE wishlist_items ADD COLUMN IF NOT EXISTS reservation_version BIGINT NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION wishlist_items_bump_reservation_version() RETURNS trigger AS $$
+BEGIN
+    NEW.reservation_version := OLD.reservation_version + 1;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_wishlist_items_bump_reservation_version ON wishlist_items;
+CREATE TRIGGER trg_wishlist_items_bump_reservation_version
+    BEFORE UPDATE ON wishlist_items
+    FOR EACH ROW
+    WHEN (OLD.reservation_version = NEW.reservation_version AND
+          OLD.reservation_count IS DISTINCT FROM NEW.reservation_count)
+    EXECUTE FUNCTION wishlist_items_bump_reservation_version();
+
+-- Item edits. Only columns on the public page count: the claim bookkeeping,
+-- updated_at and the search vector are ignored, so claims and unclaims never
+-- fire this. Compared as jsonb minus those keys so item columns added later
+-- are covered without touching this trigger.
+CREATE OR REPLACE FUNCTION wishlist_items_bump_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE wishlists w SET version = w.version + 1
+    WHERE w.id IN (OLD.wishlist_id, NEW.wishlist_id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_wishlist_items_bump_version ON wishlist_items;
+CREATE TRIGGER trg_wishlist_items_bump_version
+    AFTER UPDATE ON wishlist_items
+    FOR EACH ROW
+    WHEN (to_jsonb(OLD) - '{is_claimed,claimed_by,claimed_at,reservation_count,reservation_version,updated_at,search_vector}'::text[]
+          IS DISTINCT FROM
+          to_jsonb(NEW) - '{is_claimed,claimed_by,claimed_at,reservation_count,reservation_version,updated_at,search_vector}'::text[])
+    EXECUTE FUNCTION wishlist_items_bump_version();
@@ -0,0 +1,64 @@
+-- Wishlist analytics read per-hour and per-day rollups instead of scanning
+-- wishlist_views. api/view_rollups.py folds new raw rows in by seq; the
+-- endpoints add whatever has not been folded in yet (seq > last_seq).
+-- Rows from before this migration have no seq: run
+-- scripts/backfill_view_rollups.py once to add them to the rollups.
+ALTER TABLE wishlist_views ADD COLUMN IF NOT EXISTS seq BIGINT;
+CREATE SEQUENCE IF NOT EXISTS wishlist_views_seq OWNED BY wishlist_views.seq;
+ALTER TABLE wishlist_views ALTER COLUMN seq SET DEFAULT nextval('wishlist_views_seq');
+
+-- Only new rows are indexed; the aggregator and the tail reads never look at NULL seq
+CREATE INDEX IF NOT EXISTS idx_wishlist_views_seq ON wishlist_views(seq) WHERE seq IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_wishlist_views_wishlist_seq ON wishlist_views(wishlist_id, seq) WHERE seq IS NOT NULL;
+
+-- Hours and days are UTC
+CREATE TABLE IF NOT EXISTS wishlist_views_hourly (
+    wishlist_id UUID NOT NULL REFERENCES wishlists(id) ON DELETE CASCADE,
+    hour TIMESTAMPTZ NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (wishlist_id, hour)
+);
+
+CREATE TABLE IF NOT EXISTS wishlist_views_daily (
+    wishlist_id UUID NOT NULL REFERENCES wishlists(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    unique_viewers INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (wishlist_id, day)
+);
+CREATE INDEX IF NOT EXISTS idx_wishlist_views_daily_day ON wishlist_views_daily(day);
+
+CREATE TABLE IF NOT EXISTS wishlist_referrers_daily (
+    wishlist_id UUID NOT NULL REFERENCES wishlists(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    referrer TEXT NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (wishlist_id, day, referrer)
+);
+
+-- Distinct viewers per wishlist per day, and ever: one row per viewer rather
+-- than one per view. Inserts that hit a new row are what bump unique_viewers.
+CREATE TABLE IF NOT EXISTS wishlist_daily_viewers (
+    wishlist_id UUID NOT NULL REFERENCES wishlists(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    viewer_ip VARCHAR(45) NOT NULL,
+    PRIMARY KEY (wishlist_id, day, viewer_ip)
+);
+
+CREATE TABLE IF NOT EXISTS wishlist_viewers (
+    wishlist_id UUID NOT NULL REFERENCES wishlists(id) ON DELETE CASCADE,
+    viewer_ip VARCHAR(45) NOT NULL,
+    PRIMARY KEY (wishlist_id, viewer_ip)
+);
+
+-- Aggregator watermark. Views up to last_seq are in the rollups. seen_seq is
+-- the highest seq committed at seen_at; once that is settled (no insert that
+-- drew a lower seq can still be in flight) the next pass folds up to it.
+CREATE TABLE IF NOT EXISTS view_rollup_state (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    last_seq BIGINT NOT NULL DEFAULT 0,
+    seen_seq BIGINT NOT NULL DEFAULT 0,
+    seen_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    backfilled_at TIMESTAMP WITH TIME ZONE
+);
+INSERT INTO view_rollup_state (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
@@ -0,0 +1,18 @@
+-- Unique viewers are counted with HyperLogLog sketches (api/hll.py) instead
+-- of exact per-viewer rows: a few bytes to 4KB per wishlist per day however
+-- viral the list gets, and mergeable across days. unique_viewers holds each
+-- sketch's estimate so plain reads don't have to decode it.
+-- Run scripts/rebuild_viewer_sketches.py once after this to sketch the
+-- views already in the rollups.
+ALTER TABLE wishlist_views_daily ADD COLUMN IF NOT EXISTS viewers_hll BYTEA;
+
+CREATE TABLE IF NOT EXISTS wishlist_view_totals (
+    wishlist_id UUID PRIMARY KEY REFERENCES wishlists(id) ON DELETE CASCADE,
+    unique_viewers INTEGER NOT NULL DEFAULT 0,
+    viewers_hll BYTEA NOT NULL
+);
+
+-- The exact viewer sets from 016-view-rollups.sql. 016 creates them again
+-- (empty) whenever all migrations are re-run; they are dropped right here.
+DROP TABLE IF EXISTS wishlist_daily_viewers;
+DROP TABLE IF EXISTS wishlist_viewers;
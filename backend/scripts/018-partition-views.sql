@@ -0,0 +1,116 @@
+-- wishlist_views becomes a table partitioned by month of viewed_at (UTC):
+-- queries with a time window only touch the months they need, and
+-- scripts/manage_partitions.py archives and drops whole months past the
+-- retention period instead of DELETEing rows. The UUID primary key goes
+-- (nothing looked rows up by it); seq identifies rows for the rollups.
+-- Existing rows are copied over in one transaction. Views for a month with
+-- no partition land in wishlist_views_default instead of failing to insert;
+-- creating that month's partition moves them out again.
+
+-- Creates the monthly partitions from from_month up to months_ahead past the current month
+CREATE OR REPLACE FUNCTION create_wishlist_views_partitions(from_month DATE, months_ahead INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    month DATE := date_trunc('month', from_month);
+    last_month DATE := date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => months_ahead);
+    month_start TIMESTAMPTZ;
+    month_end TIMESTAMPTZ;
+    partition_name TEXT;
+    moved INTEGER;
+    created INTEGER := 0;
+BEGIN
+    WHILE month <= last_month LOOP
+        partition_name := 'wishlist_views_' || to_char(month, 'YYYY_MM');
+        month_start := month::timestamp AT TIME ZONE 'UTC';
+        month_end := (month + INTERVAL '1 month')::timestamp AT TIME ZONE 'UTC';
+        IF to_regclass(partition_name) IS NULL THEN
+            -- The new partition can't be attached while the default one still
+            -- holds rows from its month, so those are set aside first
+            moved := 0;
+            IF to_regclass('wishlist_views_default') IS NOT NULL THEN
+                CREATE TEMP TABLE wishlist_views_moved ON COMMIT DROP AS
+                WITH d AS (
+                    DELETE FROM wishlist_views_default
+                    WHERE viewed_at >= month_start AND viewed_at < month_end
+                    RETURNING *
+                )
+                SELECT * FROM d;
+                GET DIAGNOSTICS moved = ROW_COUNT;
+            END IF;
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF wishlist_views FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, month_end
+            );
+            IF to_regclass('pg_temp.wishlist_views_moved') IS NOT NULL THEN
+                INSERT INTO wishlist_views SELECT * FROM wishlist_views_moved;
+                DROP TABLE wishlist_views_moved;
+            END IF;
+            IF moved > 0 THEN
+                RAISE NOTICE 'Moved % views from wishlist_views_default to %', moved, partition_name;
+            END IF;
+            created := created + 1;
+        END IF;
+        month := month + INTERVAL '1 month';
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    first_month DATE;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'wishlist_views'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE wishlist_views RENAME TO wishlist_views_unpartitioned;
+    -- Keep the sequence when the old table is dropped
+    ALTER SEQUENCE wishlist_views_seq OWNED BY NONE;
+
+    CREATE TABLE wishlist_views (
+        wishlist_id UUID NOT NULL CONSTRAINT wishlist_views_wishlist_id_fkey REFERENCES wishlists(id) ON DELETE CASCADE,
+        viewer_ip VARCHAR(45),
+        user_agent TEXT,
+        referrer TEXT,
+        viewed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        seq BIGINT DEFAULT nextval('wishlist_views_seq')
+    ) PARTITION BY RANGE (viewed_at);
+    ALTER SEQUENCE wishlist_views_seq OWNED BY wishlist_views.seq;
+    CREATE TABLE wishlist_views_default PARTITION OF wishlist_views DEFAULT;
+
+    SELECT date_trunc('month', MIN(viewed_at) AT TIME ZONE 'UTC')::date INTO first_month
+    FROM wishlist_views_unpartitioned;
+    first_month := COALESCE(first_month, (NOW() AT TIME ZONE 'UTC')::date);
+    PERFORM create_wishlist_views_partitions(first_month, 3);
+
+    -- Undated rows (the column used to be nullable) go to the oldest month
+    INSERT INTO wishlist_views (wishlist_id, viewer_ip, user_agent, referrer, viewed_at, seq)
+    SELECT wishlist_id, viewer_ip, user_agent, referrer,
+           COALESCE(viewed_at, first_month::timestamp AT TIME ZONE 'UTC'), seq
+    FROM wishlist_views_unpartitioned;
+
+    DROP TABLE wishlist_views_unpartitioned;
+END $$;
+
+CREATE TABLE IF NOT EXISTS wishlist_views_default PARTITION OF wishlist_views DEFAULT;
+
+-- Same names and columns as the indexes in 001 and 016, so re-running those
+-- migrations finds them instead of building new ones over every partition.
+-- wishlist_id serves cascading deletes and (wishlist_id, seq) the analytics
+-- tail reads; BRIN suits viewed_at, which rows arrive in order of.
+-- An earlier build of this migration merged the first two into
+-- idx_wishlist_views_wishlist_id(wishlist_id, seq); that one is replaced once.
+DO $$
+BEGIN
+    IF (SELECT indnatts FROM pg_index WHERE indexrelid = to_regclass('idx_wishlist_views_wishlist_id')) = 2 THEN
+        DROP INDEX idx_wishlist_views_wishlist_id;
+    END IF;
+END $$;
+CREATE INDEX IF NOT EXISTS idx_wishlist_views_wishlist_id ON wishlist_views(wishlist_id);
+CREATE INDEX IF NOT EXISTS idx_wishlist_views_wishlist_seq ON wishlist_views(wishlist_id, seq) WHERE seq IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_wishlist_views_viewed_at ON wishlist_views USING brin(viewed_at);
+CREATE INDEX IF NOT EXISTS idx_wishlist_views_seq ON wishlist_views(seq) WHERE seq IS NOT NULL;
+
+-- scripts/manage_partitions.py keeps this many months ahead from then on
+SELECT create_wishlist_views_partitions((NOW() AT TIME ZONE 'UTC')::date, 3);
@@ -0,0 +1,11 @@
+-- Likes no longer UPDATE wishlists.like_count directly: every like on a popular
+-- wishlist queued on that one row lock. A like adds 1 to one of a handful of
+-- shard rows instead, and api/like_counter.py periodically moves the shard
+-- totals into wishlists.like_count. The current count is like_count plus the
+-- wishlist's shards (see like_count_sql).
+CREATE TABLE IF NOT EXISTS wishlist_like_shards (
+    wishlist_id UUID NOT NULL REFERENCES wishlists(id) ON DELETE CASCADE,
+    shard SMALLINT NOT NULL,
+    likes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (wishlist_id, shard)
+);
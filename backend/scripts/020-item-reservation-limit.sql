@@ -0,0 +1,4 @@
+-- Optional cap on how many people can reserve an item (NULL: no limit).
+-- Claims check it in the same statement that takes the item's row lock, so
+-- concurrent guests can't push an item past its limit.
+ALTER TABLE wishlist_items ADD COLUMN IF NOT EXISTS max_reservations INTEGER CHECK (max_reservations > 0);
@@ -0,0 +1,44 @@
+"""Fill wishlists.item_count and wishlist_items.reservation_count from scratch.
+
+Run once after applying 014-counters.sql. Works through each table in
+batches, one short transaction per batch, so it can run against a live
+database; follow up with scripts/check_counters.py.
+"""
+import os
+import psycopg2
+from dotenv import load_dotenv
+from check_counters import COUNTERS, recount
+
+BATCH_SIZE = 1000
+
+load_dotenv()
+url = os.getenv("DATABASE_URL")
+
+if not url:
+    print("Error: DATABASE_URL is not set.")
+    exit(1)
+
+try:
+    conn = psycopg2.connect(url)
+    cur = conn.cursor()
+    for table, column, child, fk in COUNTERS:
+        last_id = None
+        scanned = updated = 0
+        while True:
+            if last_id is None:
+                cur.execute(f"SELECT id::text FROM {table} ORDER BY id LIMIT %s", (BATCH_SIZE,))
+            else:
+                cur.execute(f"SELECT id::text FROM {table} WHERE id > %s ORDER BY id LIMIT %s", (last_id, BATCH_SIZE))
+            ids = [row[0] for row in cur.fetchall()]
+            if not ids:
+                break
+            updated += recount(cur, table, column, child, fk, ids)
+            conn.commit()
+            scanned += len(ids)
+            last_id = ids[-1]
+        print(f"{table}.{column}: scanned {scanned}, updated {updated}")
+    cur.close()
+    conn.close()
+except Exception as e:
+    print(f"Backfill failed: {e}")
+    exit(1)
@@ -0,0 +1,78 @@
+"""Rebuild trending_products from every item in a public wishlist.
+
+Run once after applying 010-trending-products.sql, and again whenever
+TRENDING_HALF_LIFE_HOURS changes:
+
+    python scripts/backfill_trending.py
+"""
+import math
+import os
+import sys
+import psycopg2
+from psycopg2.extras import execute_values
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api.trending import DECAY_RATE, product_key  # noqa: E402
+
+load_dotenv()
+url = os.getenv("DATABASE_URL")
+
+if not url:
+    print("Error: DATABASE_URL is not set.")
+    exit(1)
+
+try:
+    conn = psycopg2.connect(url)
+    # Named cursor streams rows instead of loading the whole catalogue
+    cur = conn.cursor(name="trending_backfill")
+    cur.itersize = 10000
+    cur.execute("""
+        SELECT i.name, i.url, i.image_url, i.price, i.currency, EXTRACT(EPOCH FROM i.created_at)
+        FROM wishlist_items i
+        JOIN wishlists w ON i.wishlist_id = w.id
+        WHERE w.is_public = true
+        ORDER BY i.created_at
+    """)
+
+    products = {}
+    for name, item_url, image_url, price, currency, added_at in cur:
+        key = product_key(name, item_url)
+        event = DECAY_RATE * float(added_at)
+        product = products.get(key)
+        if product is None:
+            products[key] = [name, item_url, image_url, price, currency, event, 1, added_at]
+            continue
+        # log-sum-exp, same as the incremental upsert in api/trending.py
+        score = product[5]
+        product[5] = max(score, event) + math.log1p(math.exp(-abs(score - event)))
+        product[6] += 1
+        # Rows arrive oldest first, so the latest add's details win
+        product[0] = name
+        product[1] = item_url or product[1]
+        product[2] = image_url or product[2]
+        product[3] = price if price is not None else product[3]
+        product[4] = currency
+        product[7] = added_at
+    cur.close()
+
+    cur = conn.cursor()
+    cur.execute("TRUNCATE trending_products")
+    execute_values(
+        cur,
+        """
+        INSERT INTO trending_products
+            (product_key, name, url, image_url, price, currency, log_score, add_count, last_added_at)
+        VALUES %s
+        """,
+        [(key, *p[:7], p[7]) for key, p in products.items()],
+        template="(%s, %s, %s, %s, %s, %s, %s, %s, to_timestamp(%s))",
+        page_size=1000,
+    )
+    conn.commit()
+    print(f"Rebuilt trending scores for {len(products)} products.")
+    cur.close()
+    conn.close()
+except Exception as e:
+    print(f"Backfill failed: {e}")
+    exit(1)
@@ -0,0 +1,63 @@
+"""Add the wishlist_views rows that predate 016-view-rollups.sql to the rollups.
+
+Those rows have no seq, so the aggregator never sees them. Run once after
+applying the migrations:
+
+    python scripts/backfill_view_rollups.py
+
+The rollups are additive, so view_rollup_state.backfilled_at records the
+run and a second one refuses to count the same rows twice.
+"""
+import os
+import sys
+import psycopg2
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api.view_rollups import (  # noqa: E402
+    LOAD_SKETCHES_SQL, ROLLUP_LOCK_KEY, ROLLUP_SQL, SAVE_DAY_SKETCHES_SQL, SAVE_TOTAL_SKETCHES_SQL,
+    VIEWERS_SQL, load_params, merge_stored, save_params, sketch_viewers,
+)
+
+UNSEQUENCED = "SELECT wishlist_id, viewer_ip, referrer, viewed_at FROM wishlist_views WHERE seq IS NULL"
+
+load_dotenv()
+url = os.getenv("DATABASE_URL")
+
+if not url:
+    print("Error: DATABASE_URL is not set.")
+    exit(1)
+
+try:
+    conn = psycopg2.connect(url)
+    cur = conn.cursor()
+    # Keeps the aggregator from writing sketches underneath us
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (ROLLUP_LOCK_KEY,))
+    cur.execute("SELECT backfilled_at FROM view_rollup_state WHERE id = 1 FOR UPDATE")
+    backfilled_at = cur.fetchone()[0]
+    if backfilled_at is not None:
+        print(f"Rollups were already backfilled at {backfilled_at}.")
+        exit(0)
+    cur.execute(ROLLUP_SQL.format(batch=UNSEQUENCED))
+    views = cur.fetchone()[0]
+
+    viewers = conn.cursor(name="view_rollup_backfill")
+    viewers.itersize = 10000
+    viewers.execute(VIEWERS_SQL.format(batch=UNSEQUENCED))
+    days, totals = sketch_viewers(viewers)
+    viewers.close()
+    if totals:
+        cur.execute(LOAD_SKETCHES_SQL, load_params(days, totals))
+        merge_stored(days, totals, cur.fetchall())
+        day_params, total_params = save_params(days, totals)
+        cur.execute(SAVE_DAY_SKETCHES_SQL, day_params)
+        cur.execute(SAVE_TOTAL_SKETCHES_SQL, total_params)
+
+    cur.execute("UPDATE view_rollup_state SET backfilled_at = NOW() WHERE id = 1")
+    conn.commit()
+    print(f"Added {views} views from {len(totals)} wishlists to the rollups.")
+    cur.close()
+    conn.close()
+except Exception as e:
+    print(f"Backfill failed: {e}")
+    exit(1)
@@ -0,0 +1,62 @@
+"""Measure per-request latency of hot endpoints, in process.
+
+Requests go through httpx's ASGI transport, so the numbers are framework,
+middleware and handler cost without socket noise. Compare runs from before
+and after a change on the same machine:
+
+    python scripts/bench_endpoints.py --slug <public-wishlist-slug> -n 2000
+
+Without --slug only /api/health is measured.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Access log lines would flood the terminal; the sampling check itself still runs
+os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+
+import httpx  # noqa: E402
+from api.index import app  # noqa: E402
+
+
+async def bench(client, path, requests, warmup):
+    for _ in range(warmup):
+        await client.get(path)
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get(path)
+        timings.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            print(f"Error: GET {path} returned {response.status_code}")
+            exit(1)
+    timings.sort()
+    us = 1_000_000
+    print(
+        f"{path:<45} mean {statistics.fmean(timings) * us:8.1f}us"
+        f"  p50 {timings[len(timings) // 2] * us:8.1f}us"
+        f"  p99 {timings[int(len(timings) * 0.99)] * us:8.1f}us"
+    )
+
+
+async def main(args):
+    paths = ["/api/health"]
+    if args.slug:
+        paths.append(f"/api/wishlists/{args.slug}")
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for path in paths:
+                await bench(client, path, args.requests, args.warmup)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--slug", help="slug of a public wishlist to load")
+    parser.add_argument("-n", "--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,107 @@
+"""Compare response serialization before and after the orjson response path.
+
+Uses synthetic rows shaped like what psycopg returns, so no database is
+needed:
+
+    python scripts/bench_serialization.py
+
+"before" is the old path: per-row str()/isoformat()/float() loops, then
+FastAPI's jsonable_encoder, then the stdlib-json JSONResponse. "after" is
+api.responses.dumps on the raw rows.
+"""
+import os
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from api.responses import dumps  # noqa: E402
+
+NOW = datetime.now(timezone.utc)
+
+
+def admin_user_rows(n):
+    return [
+        {
+            "id": uuid.uuid4(),
+            "email": f"user{i}@example.com",
+            "name": f"User {i}",
+            "is_admin": False,
+            "created_at": NOW - timedelta(minutes=i),
+            "wishlist_count": i % 7,
+        }
+        for i in range(n)
+    ]
+
+
+def wishlist_body(n_items):
+    return {
+        "id": uuid.uuid4(),
+        "user_id": uuid.uuid4(),
+        "title": "Birthday list",
+        "description": "Things I would love",
+        "slug": "birthday-list-1a2b3c4d",
+        "is_public": True,
+        "view_count": 1234,
+        "like_count": 56,
+        "created_at": NOW,
+        "owner_name": "Owner",
+        "items": [
+            {
+                "id": uuid.uuid4(),
+                "name": f"Item {i}",
+                "price": Decimal("19.99"),
+                "currency": "USD",
+                "tag": "audio",
+                "url": f"https://example.com/p/{i}",
+                "image_url": f"https://example.com/img/{i}.jpg",
+                "created_at": NOW,
+                "reservations_count": 1,
+                "is_claimed": True,
+                "reserver_initials": ["GP"],
+            }
+            for i in range(n_items)
+        ],
+    }
+
+
+def before_admin(rows):
+    converted = []
+    for row in rows:
+        row = dict(row)
+        row["id"] = str(row["id"])
+        row["created_at"] = row["created_at"].isoformat()
+        converted.append(row)
+    return JSONResponse(jsonable_encoder(converted)).body
+
+
+def before_wishlist(body):
+    body = dict(body)
+    body["id"] = str(body["id"])
+    body["user_id"] = str(body["user_id"])
+    items = []
+    for item in body["items"]:
+        item = dict(item)
+        item["id"] = str(item["id"])
+        item["price"] = float(item["price"]) if item["price"] else None
+        items.append(item)
+    body["items"] = items
+    return JSONResponse(jsonable_encoder(body)).body
+
+
+def report(label, before, after, number):
+    b = min(timeit.repeat(before, number=number, repeat=5)) / number * 1000
+    a = min(timeit.repeat(after, number=number, repeat=5)) / number * 1000
+    print(f"{label:<28} before {b:8.3f}ms  after {a:8.3f}ms  ({b / a:.1f}x)")
+
+
+if __name__ == "__main__":
+    rows = admin_user_rows(5000)
+    body = wishlist_body(300)
+    report("admin users, 5000 rows", lambda: before_admin(rows), lambda: dumps(rows), number=10)
+    report("wishlist, 300 items", lambda: before_wishlist(body), lambda: dumps(body), number=50)
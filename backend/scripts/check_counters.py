@@ -0,0 +1,68 @@
+"""Report (and optionally repair) drift in the trigger-maintained counters.
+
+    python scripts/check_counters.py          # exit status 1 if anything is off
+    python scripts/check_counters.py --fix    # recount the rows that drifted
+"""
+import os
+import sys
+import psycopg2
+from dotenv import load_dotenv
+
+# (table, counter column, child table, child foreign key)
+COUNTERS = [
+    ("wishlists", "item_count", "wishlist_items", "wishlist_id"),
+    ("wishlist_items", "reservation_count", "item_reservations", "item_id"),
+]
+
+
+def recount(cur, table, column, child, fk, ids):
+    """Set the counter to the true child count for ``ids``; returns rows changed."""
+    cur.execute(
+        f"""
+        UPDATE {table} p SET {column} = c.actual
+        FROM (
+            SELECT ids.id, (SELECT COUNT(*) FROM {child} WHERE {fk} = ids.id) AS actual
+            FROM unnest(%s::uuid[]) AS ids(id)
+        ) c
+        WHERE p.id = c.id AND p.{column} <> c.actual
+        """,
+        (ids,),
+    )
+    return cur.rowcount
+
+
+def find_drift(cur, table, column, child, fk):
+    cur.execute(f"""
+        SELECT p.id::text, p.{column} AS stored, COUNT(c.{fk}) AS actual
+        FROM {table} p
+        LEFT JOIN {child} c ON c.{fk} = p.id
+        GROUP BY p.id
+        HAVING p.{column} <> COUNT(c.{fk})
+    """)
+    return cur.fetchall()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        print("Error: DATABASE_URL is not set.")
+        exit(1)
+
+    fix = "--fix" in sys.argv[1:]
+    conn = psycopg2.connect(url)
+    cur = conn.cursor()
+    drifted = 0
+    for table, column, child, fk in COUNTERS:
+        rows = find_drift(cur, table, column, child, fk)
+        drifted += len(rows)
+        print(f"{table}.{column}: {len(rows)} row(s) out of step")
+        for row_id, stored, actual in rows[:20]:
+            print(f"  {row_id}: stored {stored}, actual {actual}")
+        if fix and rows:
+            fixed = recount(cur, table, column, child, fk, [r[0] for r in rows])
+            conn.commit()
+            print(f"  fixed {fixed}")
+    cur.close()
+    conn.close()
+    exit(1 if drifted and not fix else 0)
@@ -0,0 +1,162 @@
+"""Create upcoming wishlist_views partitions and retire expired ones.
+
+Run daily from cron:
+
+    python scripts/manage_partitions.py [--dry-run]
+
+Months are created VIEW_PARTITIONS_AHEAD months ahead of the current one.
+A view whose month has no partition lands in wishlist_views_default; creating
+the month moves it out, and views still left there afterwards (for months
+that are not created) are listed on every run. Months older than
+VIEW_RETENTION_MONTHS are detached, written to VIEW_ARCHIVE_DIR as
+gzipped CSV (reload with COPY ... FROM ... CSV HEADER) and dropped. A month
+is only retired once the rollup aggregator has counted all of it, so
+analytics keep their history; only the raw rows go.
+"""
+import argparse
+import gzip
+import os
+import re
+from datetime import date, datetime, timezone
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+url = os.getenv("DATABASE_URL")
+
+PARTITION_NAME = re.compile(r"^wishlist_views_(\d{4})_(\d{2})$")
+DEFAULT_PARTITION = "wishlist_views_default"
+
+# Raw views the rollups don't include yet (see api/view_rollups.py)
+UNFOLDED_SQL = """
+    SELECT COUNT(*)
+    FROM {table}, view_rollup_state s
+    WHERE s.id = 1 AND (seq > s.last_seq OR (seq IS NULL AND s.backfilled_at IS NULL))
+"""
+
+
+def months_before(month, n):
+    index = month.year * 12 + month.month - 1 - n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_month(name):
+    match = PARTITION_NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def list_partitions(cur):
+    """(attached, detached) monthly partition names, oldest first."""
+    cur.execute("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'wishlist_views'::regclass")
+    attached = {row[0] for row in cur.fetchall()}
+    # Left behind by a run that stopped between detaching and dropping
+    cur.execute("SELECT relname FROM pg_class WHERE relkind = 'r' AND relname LIKE 'wishlist\\_views\\_%'")
+    detached = {row[0] for row in cur.fetchall()} - attached
+    return (
+        sorted(name for name in attached if partition_month(name)),
+        sorted(name for name in detached if partition_month(name)),
+    )
+
+
+def default_partition_months(cur):
+    """(month, views) held by the default partition, oldest first."""
+    cur.execute(f"""
+        SELECT date_trunc('month', viewed_at AT TIME ZONE 'UTC')::date, COUNT(*)
+        FROM {DEFAULT_PARTITION}
+        GROUP BY 1
+        ORDER BY 1
+    """)
+    return cur.fetchall()
+
+
+def archive(conn, name, archive_dir):
+    """Write a detached partition to <archive_dir>/<name>.csv.gz and drop it."""
+    cur = conn.cursor()
+    cur.execute(f"SELECT COUNT(*) FROM {name}")
+    expected = cur.fetchone()[0]
+
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wb") as f:
+        cur.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", f)
+        copied = cur.rowcount
+    if copied != expected:
+        os.remove(tmp_path)
+        raise RuntimeError(f"{name}: copied {copied} rows, expected {expected}")
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    cur.execute(f"DROP TABLE {name}")
+    conn.commit()
+    print(f"Archived {expected} views from {name} to {path}")
+
+
+def main(args):
+    conn = psycopg2.connect(url)
+    cur = conn.cursor()
+
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    if args.dry_run:
+        print(f"Would make sure partitions exist through {args.ahead} months after {this_month:%Y-%m}")
+    else:
+        cur.execute("SELECT create_wishlist_views_partitions(%s, %s)", (this_month, args.ahead))
+        created = cur.fetchone()[0]
+        conn.commit()
+        print(f"Created {created} partitions")
+        # Views moved out of the default partition, one notice per month
+        for notice in conn.notices:
+            print(notice.removeprefix("NOTICE:").strip())
+
+    for month, views in default_partition_months(cur):
+        print(f"{views} views from {month:%Y-%m} are in {DEFAULT_PARTITION}: that month has no partition")
+
+    if args.retain_months <= 0:
+        return
+    cutoff = months_before(this_month, args.retain_months)
+    attached, detached = list_partitions(cur)
+    expired = [name for name in attached if partition_month(name) < cutoff]
+
+    for name in expired:
+        cur.execute(UNFOLDED_SQL.format(table=name))
+        unfolded = cur.fetchone()[0]
+        if unfolded:
+            print(f"Skipping {name}: {unfolded} views are not in the rollups yet")
+            continue
+        if args.dry_run:
+            print(f"Would archive and drop {name}")
+            continue
+        cur.execute(f"ALTER TABLE wishlist_views DETACH PARTITION {name}")
+        conn.commit()
+        detached.append(name)
+
+    if args.dry_run:
+        for name in detached:
+            print(f"Would archive and drop detached {name}")
+        return
+    if detached:
+        os.makedirs(args.archive_dir, exist_ok=True)
+    for name in detached:
+        archive(conn, name, args.archive_dir)
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ahead", type=int, default=int(os.getenv("VIEW_PARTITIONS_AHEAD", "3")),
+                        help="months to create past the current one")
+    parser.add_argument("--retain-months", type=int, default=int(os.getenv("VIEW_RETENTION_MONTHS", "13")),
+                        help="full months of raw views to keep; 0 keeps everything")
+    parser.add_argument("--archive-dir", default=os.getenv("VIEW_ARCHIVE_DIR", "archive/wishlist_views"))
+    parser.add_argument("--dry-run", action="store_true", help="report what would change")
+    args = parser.parse_args()
+
+    if not url:
+        print("Error: DATABASE_URL is not set.")
+        exit(1)
+
+    try:
+        main(args)
+    except Exception as e:
+        print(f"Partition maintenance failed: {e}")
+        exit(1)
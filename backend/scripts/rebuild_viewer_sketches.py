@@ -0,0 +1,56 @@
+"""Rebuild the unique-viewer sketches from the raw views already in the rollups.
+
+Run once after applying 017-viewer-sketches.sql, and again whenever the
+precision in api/hll.py changes (stored sketches of another precision can't
+be merged):
+
+    python scripts/rebuild_viewer_sketches.py
+"""
+import os
+import sys
+import psycopg2
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api.view_rollups import (  # noqa: E402
+    ROLLUP_LOCK_KEY, SAVE_DAY_SKETCHES_SQL, SAVE_TOTAL_SKETCHES_SQL, VIEWERS_SQL, save_params, sketch_viewers,
+)
+
+# Views the aggregator (or the backfill) has counted; the tail is left to it
+FOLDED = """
+    SELECT wishlist_id, viewer_ip, viewed_at
+    FROM wishlist_views, view_rollup_state s
+    WHERE s.id = 1 AND (seq <= s.last_seq OR (seq IS NULL AND s.backfilled_at IS NOT NULL))
+"""
+
+load_dotenv()
+url = os.getenv("DATABASE_URL")
+
+if not url:
+    print("Error: DATABASE_URL is not set.")
+    exit(1)
+
+try:
+    conn = psycopg2.connect(url)
+    cur = conn.cursor()
+    # Holding the aggregator's lock pins last_seq for the whole rebuild
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (ROLLUP_LOCK_KEY,))
+
+    viewers = conn.cursor(name="viewer_sketch_rebuild")
+    viewers.itersize = 10000
+    viewers.execute(VIEWERS_SQL.format(batch=FOLDED))
+    days, totals = sketch_viewers(viewers)
+    viewers.close()
+
+    cur.execute("UPDATE wishlist_views_daily SET viewers_hll = NULL, unique_viewers = 0")
+    cur.execute("DELETE FROM wishlist_view_totals")
+    day_params, total_params = save_params(days, totals)
+    cur.execute(SAVE_DAY_SKETCHES_SQL, day_params)
+    cur.execute(SAVE_TOTAL_SKETCHES_SQL, total_params)
+    conn.commit()
+    print(f"Rebuilt viewer sketches for {len(days)} wishlist-days and {len(totals)} wishlists.")
+    cur.close()
+    conn.close()
+except Exception as e:
+    print(f"Rebuild failed: {e}")
+    exit(1)
@@ -38,6 +38,16 @@ class TestAdminAuthorizations:
         response = auth_client.get("/api/admin/analytics")
         assert response.status_code == 403
         
+    def test_admin_exact_viewer_counts_for_non_admin_user(self, auth_client, created_wishlist):
+        """Owners see estimated unique viewers; exact counts are admin-only."""
+        response = auth_client.get(f"/api/admin/wishlists/{created_wishlist['id']}/viewers")
+        assert response.status_code == 403
+
+    def test_admin_runtime_for_non_admin_user(self, auth_client):
+        """Regular user cannot read connection pool and cache internals."""
+        response = auth_client.get("/api/admin/runtime")
+        assert response.status_code == 403
+
     def test_admin_promote_item_for_non_admin_user(self, auth_client):
         """Regular user cannot promote items to the discovery page."""
         payload = {
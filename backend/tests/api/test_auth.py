@@ -136,6 +136,14 @@ class TestCurrentUser:
         assert data["name"] == registered_user["credentials"]["name"]
         assert "is_admin" in data
 
+    def test_get_me_served_from_session_cache(self, auth_client):
+        """Repeat identity lookups are cached, so /me costs no queries."""
+        assert auth_client.get("/api/auth/me").status_code == 200
+
+        response = auth_client.get("/api/auth/me")
+        assert response.status_code == 200
+        assert response.headers["X-DB-Query-Count"] == "0"
+
     def test_get_me_unauthenticated_returns_401(self, client):
         """No cookie → must be rejected."""
         response = client.get("/api/auth/me")
@@ -160,3 +168,13 @@ class TestLogout:
         # Assert: same client is now unauthenticated
         response_after = auth_client.get("/api/auth/me")
         assert response_after.status_code == 401
+
+    def test_logout_revokes_cached_session(self, auth_client, client):
+        """A token that was cached before logout must stop working right away."""
+        token = auth_client.cookies["session_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+        assert auth_client.post("/api/auth/logout").status_code == 200
+
+        assert client.get("/api/auth/me", headers=headers).status_code == 401
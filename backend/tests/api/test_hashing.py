@@ -0,0 +1,75 @@
+"""
+tests/api/test_hashing.py — Password hashing worker pool bookkeeping.
+
+Pure unit tests for the bcrypt pool in api/utils.py; they never touch the
+API server.
+
+New concepts introduced here:
+  - Driving async code from a plain test with asyncio.run
+  - Using threading.Event to hold a worker thread mid-job
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from api.utils import _run_hashing, hashing_stats
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+class TestHashingStats:
+
+    def test_successful_hash_counts_as_completed(self):
+        before = hashing_stats()
+
+        assert asyncio.run(_run_hashing(lambda: "hashed")) == "hashed"
+
+        after = hashing_stats()
+        assert after["completed"] == before["completed"] + 1
+        assert after["pending"] == before["pending"]
+
+    def test_failed_hash_is_not_completed(self):
+        before = hashing_stats()
+
+        def broken():
+            raise ValueError("Invalid salt")
+
+        with pytest.raises(ValueError):
+            asyncio.run(_run_hashing(broken))
+
+        after = hashing_stats()
+        assert after["completed"] == before["completed"]
+        assert after["failed"] == before["failed"] + 1
+
+    def test_cancelled_request_stays_pending_until_the_worker_finishes(self):
+        """A request that goes away doesn't free its worker, so it still counts."""
+        before = hashing_stats()
+        started, release = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return "hashed"
+
+        async def cancel_midway():
+            task = asyncio.create_task(_run_hashing(slow))
+            await asyncio.to_thread(started.wait, 5)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return hashing_stats()
+
+        during = asyncio.run(cancel_midway())
+        assert during["pending"] == before["pending"] + 1
+
+        release.set()
+        wait_for(lambda: hashing_stats()["pending"] == before["pending"])
+        assert hashing_stats()["completed"] == before["completed"] + 1
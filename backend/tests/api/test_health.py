@@ -32,6 +32,19 @@ class TestHealthCheck:
         # httpx tracks elapsed time on every response
         assert response.elapsed.total_seconds() < 5.0
 
+    def test_request_id_is_echoed(self, client):
+        """A caller's X-Request-ID comes back, so their logs and ours line up."""
+        response = client.get("/api/health", headers={"X-Request-ID": "trace-abc.123"})
+        assert response.headers["X-Request-ID"] == "trace-abc.123"
+
+    @pytest.mark.parametrize("incoming", [None, "has spaces", "x" * 200])
+    def test_request_id_generated_when_missing_or_malformed(self, client, incoming):
+        headers = {"X-Request-ID": incoming} if incoming else {}
+        response = client.get("/api/health", headers=headers)
+        request_id = response.headers["X-Request-ID"]
+        assert request_id != incoming
+        assert len(request_id) == 32
+
 
 class TestDiscovery:
     """Tests for GET /api/discovery — public, no auth needed"""
@@ -58,3 +71,15 @@ class TestDiscovery:
         """Discovery must work for unauthenticated (logged out) users."""
         response = client.get("/api/discovery")
         assert response.status_code == 200
+
+    def test_discovery_served_from_memory(self, client):
+        """
+        The feed is precomputed in the background, so a warm request
+        doesn't touch the database at all.
+        """
+        first = client.get("/api/discovery")
+        second = client.get("/api/discovery")
+
+        assert second.status_code == 200
+        assert second.json() == first.json()
+        assert second.headers["X-DB-Query-Count"] == "0"
@@ -0,0 +1,64 @@
+"""
+tests/api/test_hll.py — HyperLogLog sketch tests.
+
+Pure unit tests for api/hll.py; they never touch the API server.
+
+New concepts introduced here:
+  - Testing an approximate algorithm against its documented error bound
+  - Round-tripping a value through its storage format
+"""
+
+import pytest
+
+from api.hll import STANDARD_ERROR, HyperLogLog
+
+
+def sketch(values):
+    return HyperLogLog().update(values)
+
+
+def ips(start, stop):
+    return [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(start, stop)]
+
+
+class TestHyperLogLog:
+
+    def test_empty_sketch_estimates_zero(self):
+        assert HyperLogLog().estimate() == 0
+
+    def test_duplicates_are_counted_once(self):
+        assert sketch(["1.2.3.4"] * 50 + ["5.6.7.8"] * 50).estimate() == 2
+
+    @pytest.mark.parametrize("n", [10, 1_000, 20_000, 100_000])
+    def test_estimate_is_within_error_bound(self, n):
+        """
+        LESSON: asserting on approximate answers
+        The estimate is random-looking but deterministic for a given input,
+        so the test is stable. Three standard errors covers 99.7% of inputs.
+        """
+        estimate = sketch(ips(0, n)).estimate()
+        assert abs(estimate - n) <= 3 * STANDARD_ERROR * n + 1
+
+    @pytest.mark.parametrize("n", [5, 500, 20_000])
+    def test_round_trips_through_bytes(self, n):
+        original = sketch(ips(0, n))
+        restored = HyperLogLog.from_bytes(original.to_bytes())
+        assert restored.estimate() == original.estimate()
+        assert restored.to_bytes() == original.to_bytes()
+
+    def test_small_sketches_stay_compact(self):
+        """A list with a handful of viewers stores a few bytes, not 4KB of registers."""
+        assert len(sketch(ips(0, 10)).to_bytes()) < 64
+
+    @pytest.mark.parametrize("sizes", [(100, 100), (5_000, 100), (5_000, 8_000)])
+    def test_merge_counts_the_union(self, sizes):
+        """Overlapping days merge to the union, so a returning viewer isn't counted twice."""
+        first, second = sizes
+        a = sketch(ips(0, first))
+        b = sketch(ips(first // 2, first // 2 + second))
+        union = sketch(ips(0, max(first, first // 2 + second)))
+        assert a.merge(b).to_bytes() == union.to_bytes()
+
+    def test_rejects_other_precisions(self):
+        with pytest.raises(ValueError):
+            HyperLogLog.from_bytes(b"\x00\x0e")
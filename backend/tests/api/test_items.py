@@ -5,8 +5,12 @@ New concepts introduced here:
   - Testing a multi-step user flow (claim → verify → unclaim → verify)
   - Asserting on response body structure for different user roles
     (owner sees full claim details; public sees only initials)
+  - Stress-testing one item with many concurrent clients
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
 import pytest
 
 
@@ -246,3 +250,112 @@ class TestClaimItem:
         item = next(i for i in wishlist["items"] if i["id"] == item_id)
 
         assert item["reservations_count"] == 2
+
+    def test_unclaim_reports_remaining_reservations(self, client, created_item):
+        """The remaining count comes from the trigger-maintained counter."""
+        slug = created_item["wishlist"]["slug"]
+        item_id = created_item["id"]
+
+        for name in ("Eve", "Frank"):
+            client.post(f"/api/wishlists/{slug}/items/{item_id}/claim", json={"name": name})
+
+        first = client.post(f"/api/wishlists/{slug}/items/{item_id}/unclaim", json={"name": "Eve"})
+        assert first.json()["remaining"] == 1
+        second = client.post(f"/api/wishlists/{slug}/items/{item_id}/unclaim", json={"name": "Frank"})
+        assert second.json()["remaining"] == 0
+
+
+class TestReservationLimit:
+    """Items with max_reservations stop taking claims once they are full."""
+
+    @pytest.fixture
+    def limited_item(self, auth_client, created_wishlist):
+        """An item that at most 3 people can reserve."""
+        response = auth_client.post(
+            f"/api/wishlists/{created_wishlist['id']}/items",
+            json={"name": "Group Gift", "max_reservations": 3},
+        )
+        assert response.status_code == 200
+        return {**response.json(), "wishlist": created_wishlist}
+
+    def test_max_reservations_must_be_positive(self, auth_client, created_wishlist):
+        response = auth_client.post(
+            f"/api/wishlists/{created_wishlist['id']}/items",
+            json={"name": "Nobody's Gift", "max_reservations": 0},
+        )
+        assert response.status_code == 422
+
+    def test_claim_on_full_item_returns_409(self, client, limited_item):
+        slug = limited_item["wishlist"]["slug"]
+        item_id = limited_item["id"]
+        assert limited_item["max_reservations"] == 3
+
+        for name in ("Ann", "Ben", "Cal"):
+            assert client.post(f"/api/wishlists/{slug}/items/{item_id}/claim", json={"name": name}).status_code == 200
+        response = client.post(f"/api/wishlists/{slug}/items/{item_id}/claim", json={"name": "Dee"})
+
+        assert response.status_code == 409
+
+    def test_unclaim_frees_a_place(self, client, limited_item):
+        slug = limited_item["wishlist"]["slug"]
+        item_id = limited_item["id"]
+
+        for name in ("Ann", "Ben", "Cal"):
+            client.post(f"/api/wishlists/{slug}/items/{item_id}/claim", json={"name": name})
+        client.post(f"/api/wishlists/{slug}/items/{item_id}/unclaim", json={"name": "Ben"})
+        response = client.post(f"/api/wishlists/{slug}/items/{item_id}/claim", json={"name": "Dee"})
+
+        assert response.status_code == 200
+
+    def test_claim_on_private_wishlist_returns_404(self, auth_client, limited_item):
+        wishlist = limited_item["wishlist"]
+        auth_client.put(f"/api/wishlists/{wishlist['id']}", json={"is_public": False})
+
+        response = auth_client.post(
+            f"/api/wishlists/{wishlist['slug']}/items/{limited_item['id']}/claim", json={"name": "Eve"}
+        )
+
+        assert response.status_code == 404
+
+    def test_concurrent_claims_never_exceed_the_limit(self, base_url, limited_item):
+        """
+        STRESS TEST: 40 guests claim the same 3-place item at once.
+        Exactly 3 must get in; everyone else is told it's full.
+        """
+        slug = limited_item["wishlist"]["slug"]
+        item_id = limited_item["id"]
+
+        def claim(n):
+            with httpx.Client(base_url=base_url, timeout=10.0) as c:
+                return c.post(f"/api/wishlists/{slug}/items/{item_id}/claim", json={"name": f"Guest {n}"})
+
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            responses = list(pool.map(claim, range(40)))
+
+        assert sorted(r.status_code for r in responses) == [200] * 3 + [409] * 37
+        with httpx.Client(base_url=base_url, timeout=10.0) as c:
+            wishlist = c.get(f"/api/wishlists/{slug}").json()
+        item = next(i for i in wishlist["items"] if i["id"] == item_id)
+        assert item["reservations_count"] == 3
+
+    def test_concurrent_claims_and_unclaims_keep_counts_consistent(self, base_url, created_item):
+        """Everyone claims, then everyone unclaims, all at once: nothing is lost or left over."""
+        slug = created_item["wishlist"]["slug"]
+        item_id = created_item["id"]
+        names = [f"Guest {n}" for n in range(30)]
+
+        def post(action, name):
+            with httpx.Client(base_url=base_url, timeout=10.0) as c:
+                return c.post(f"/api/wishlists/{slug}/items/{item_id}/{action}", json={"name": name})
+
+        with ThreadPoolExecutor(max_workers=15) as pool:
+            claims = list(pool.map(lambda name: post("claim", name), names))
+            unclaims = list(pool.map(lambda name: post("unclaim", name), names))
+
+        assert all(r.status_code == 200 for r in claims + unclaims)
+        assert min(r.json()["remaining"] for r in unclaims) == 0
+        with httpx.Client(base_url=base_url, timeout=10.0) as c:
+            wishlist = c.get(f"/api/wishlists/{slug}").json()
+        item = next(i for i in wishlist["items"] if i["id"] == item_id)
+        assert item["reservations_count"] == 0
+        assert item["is_claimed"] is False
@@ -0,0 +1,156 @@
+"""
+tests/api/test_manage_partitions.py — Monthly wishlist_views partition maintenance.
+
+Pure unit tests for scripts/manage_partitions.py; a fake connection stands in
+for PostgreSQL, so they never touch the database or the API server.
+
+New concepts introduced here:
+  - Answering a script's SQL with a fake DB-API cursor
+  - Capturing printed output with pytest's capsys fixture
+"""
+
+from argparse import Namespace
+from datetime import date, datetime, timezone
+
+import pytest
+
+from scripts import manage_partitions
+from scripts.manage_partitions import (
+    list_partitions,
+    main,
+    months_before,
+    partition_month,
+)
+
+
+class FakeCursor:
+    """Answers the catalog and count queries manage_partitions sends."""
+
+    def __init__(self, attached, tables, unfolded=None, default_months=()):
+        self.attached = attached
+        self.tables = tables
+        self.unfolded = unfolded or {}
+        self.default_months = list(default_months)
+        self.executed = []
+        self.result = []
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+        if "pg_inherits" in sql:
+            self.result = [(name,) for name in self.attached]
+        elif "FROM pg_class" in sql:
+            self.result = [(name,) for name in self.tables]
+        elif "GROUP BY" in sql:
+            self.result = self.default_months
+        else:
+            table = sql.split("FROM ")[1].split(",")[0].strip()
+            self.result = [(self.unfolded.get(table, 0),)]
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0]
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+
+def this_month():
+    return datetime.now(timezone.utc).date().replace(day=1)
+
+
+def partition_name(month):
+    return f"wishlist_views_{month:%Y_%m}"
+
+
+class TestMonths:
+
+    @pytest.mark.parametrize("month,n,expected", [
+        (date(2026, 10, 1), 0, date(2026, 10, 1)),
+        (date(2026, 10, 1), 9, date(2026, 1, 1)),
+        (date(2026, 10, 1), 10, date(2025, 12, 1)),
+        (date(2026, 1, 1), 13, date(2024, 12, 1)),
+        (date(2026, 10, 1), 36, date(2023, 10, 1)),
+    ])
+    def test_months_before(self, month, n, expected):
+        assert months_before(month, n) == expected
+
+    def test_partition_month_reads_the_name(self):
+        assert partition_month("wishlist_views_2026_03") == date(2026, 3, 1)
+
+    @pytest.mark.parametrize("name", [
+        "wishlist_views_default",
+        "wishlist_views_unpartitioned",
+        "wishlist_views_2026_3",
+        "wishlist_views_2026_03_old",
+        "wishlist_viewers",
+    ])
+    def test_other_tables_are_not_partitions(self, name):
+        assert partition_month(name) is None
+
+
+class TestListPartitions:
+
+    def test_splits_attached_and_detached_months(self):
+        cur = FakeCursor(
+            attached=["wishlist_views_2026_02", "wishlist_views_2026_01", "wishlist_views_default"],
+            tables=[
+                "wishlist_views_2026_02",
+                "wishlist_views_2026_01",
+                "wishlist_views_2025_11",
+                "wishlist_views_default",
+                "wishlist_views_unpartitioned",
+            ],
+        )
+
+        attached, detached = list_partitions(cur)
+
+        assert attached == ["wishlist_views_2026_01", "wishlist_views_2026_02"]
+        assert detached == ["wishlist_views_2025_11"]
+
+
+class TestDryRun:
+
+    def run(self, monkeypatch, cur, retain_months=2):
+        monkeypatch.setattr(manage_partitions.psycopg2, "connect", lambda url: FakeConnection(cur))
+        main(Namespace(ahead=3, retain_months=retain_months, archive_dir="unused", dry_run=True))
+
+    def test_reports_without_changing_anything(self, monkeypatch, capsys):
+        current = this_month()
+        expired = partition_name(months_before(current, 3))
+        unfolded = partition_name(months_before(current, 4))
+        left_over = partition_name(months_before(current, 6))
+        kept = partition_name(months_before(current, 2))
+        cur = FakeCursor(
+            attached=[unfolded, expired, kept, partition_name(current), "wishlist_views_default"],
+            tables=[left_over, unfolded, expired, kept, partition_name(current), "wishlist_views_default"],
+            unfolded={unfolded: 12},
+            default_months=[(date(2020, 1, 1), 5)],
+        )
+
+        self.run(monkeypatch, cur)
+
+        out = capsys.readouterr().out
+        assert f"Would make sure partitions exist through 3 months after {current:%Y-%m}" in out
+        assert "5 views from 2020-01 are in wishlist_views_default" in out
+        assert f"Skipping {unfolded}: 12 views are not in the rollups yet" in out
+        assert f"Would archive and drop {expired}" in out
+        assert f"Would archive and drop detached {left_over}" in out
+        assert kept not in out
+        statements = " ".join(cur.executed).upper()
+        for verb in ("CREATE_WISHLIST_VIEWS_PARTITIONS", "DETACH", "DROP", "COPY"):
+            assert verb not in statements
+
+    def test_zero_retention_keeps_every_month(self, monkeypatch, capsys):
+        old = partition_name(months_before(this_month(), 120))
+        cur = FakeCursor(attached=[old], tables=[old])
+
+        self.run(monkeypatch, cur, retain_months=0)
+
+        assert old not in capsys.readouterr().out
@@ -0,0 +1,66 @@
+"""
+tests/api/test_metrics.py — Prometheus metrics endpoint tests.
+
+New concepts introduced here:
+  - Asserting on a plain-text response (the Prometheus exposition format)
+    instead of JSON
+  - Bearer-token auth, with the token shared through the environment
+"""
+
+import os
+
+import httpx
+import pytest
+
+
+@pytest.fixture
+def scraper(base_url):
+    """A client that authenticates like Prometheus does.
+
+    The server and the tests both load METRICS_TOKEN from .env (CI sets it
+    in the workflow). Locally the metrics tests are skipped without it; in
+    CI a missing token is an error, so they can't go quietly unrun.
+    """
+    token = os.environ.get("METRICS_TOKEN")
+    if not token:
+        if os.environ.get("CI"):
+            pytest.fail("METRICS_TOKEN must be set for the server and the tests in CI")
+        pytest.skip("METRICS_TOKEN is not set for the tests")
+    with httpx.Client(base_url=base_url, timeout=10.0, headers={"Authorization": f"Bearer {token}"}) as client:
+        yield client
+
+
+class TestMetricsAuth:
+    """/api/metrics exposes internals, so it is never open to anonymous clients."""
+
+    def test_metrics_without_token_is_refused(self, client):
+        response = client.get("/api/metrics")
+        assert response.status_code in (401, 403)
+        assert "wishly_" not in response.text
+
+    def test_metrics_with_wrong_token_is_refused(self, client):
+        response = client.get("/api/metrics", headers={"Authorization": "Bearer not-the-token"})
+        assert response.status_code in (401, 403)
+
+
+class TestMetrics:
+    """Tests for GET /api/metrics"""
+
+    def test_metrics_uses_prometheus_text_format(self, scraper):
+        response = scraper.get("/api/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE wishly_http_request_duration_seconds histogram" in response.text
+
+    def test_requests_are_counted_by_route_template(self, client, scraper, created_wishlist):
+        """Two different slugs still land in one /api/wishlists/{slug} series."""
+        client.get(f"/api/wishlists/{created_wishlist['slug']}")
+        client.get("/api/wishlists/no-such-wishlist-xyz")
+
+        text = scraper.get("/api/metrics").text
+
+        assert 'route="/api/wishlists/{slug}",status="200"' in text
+        assert 'route="/api/wishlists/{slug}",status="404"' in text
+        assert "no-such-wishlist-xyz" not in text
+        assert "wishly_db_query_duration_seconds_count" in text
@@ -0,0 +1,243 @@
+"""
+tests/api/test_scraper.py — Product scraper endpoint tests.
+
+New concepts introduced here:
+  - Running a local stub HTTP server inside a fixture, so the API
+    scrapes pages we control instead of real retailers
+  - Module-scoped fixtures (one server shared by every test in the file)
+"""
+
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import httpx
+import pytest
+
+
+PRODUCT_PAGE = b"""<!doctype html>
+<html><head>
+<title>Stub Store | Noise Cancelling Headphones</title>
+<meta property="og:title" content="Noise Cancelling Headphones" />
+<meta property="og:image" content="https://cdn.example.com/headphones.jpg" />
+<meta property="product:price:amount" content="45000" />
+<meta property="product:price:currency" content="NGN" />
+</head><body><h1>Noise Cancelling Headphones</h1></body></html>
+"""
+
+# Metadata up front followed by ~8MB of markup the scraper should never read
+HUGE_PAGE_HEAD = b"""<!doctype html>
+<html><head>
+<meta property="og:title" content="Giant Catalogue Page" />
+<meta property="product:price:amount" content="19.99" />
+<meta property="product:price:currency" content="USD" />
+</head><body>
+"""
+HUGE_PAGE_FILLER = b"<div class='filler'>" + b"x" * 1024 + b"</div>\n"
+
+
+class StubStoreHandler(BaseHTTPRequestHandler):
+    # Requests seen per full path (including query), for cache assertions
+    hits = Counter()
+
+    def do_GET(self):
+        StubStoreHandler.hits[self.path] += 1
+        path = urlparse(self.path).path
+        if path == "/product":
+            self._send(200, PRODUCT_PAGE)
+        elif path == "/slow-product":
+            time.sleep(0.5)
+            self._send(200, PRODUCT_PAGE)
+        elif path == "/huge":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.end_headers()
+            try:
+                self.wfile.write(HUGE_PAGE_HEAD)
+                for _ in range(8 * 1024):
+                    self.wfile.write(HUGE_PAGE_FILLER)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the scraper hung up early, which is the point
+        else:
+            self._send(404, b"not found")
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stub_store():
+    """SCOPE: module — a local 'retailer' the API server can scrape."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubStoreHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestScrape:
+    """Tests for POST /api/scrape"""
+
+    def test_scrape_requires_auth(self, client, stub_store):
+        response = client.post("/api/scrape", json={"url": f"{stub_store}/product"})
+        assert response.status_code == 401
+
+    def test_scrape_extracts_open_graph_product(self, auth_client, stub_store):
+        response = auth_client.post("/api/scrape", json={"url": f"{stub_store}/product"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["name"] == "Noise Cancelling Headphones"
+        assert data["price"] == 45000
+        assert data["currency"] == "NGN"
+        assert data["image_url"] == "https://cdn.example.com/headphones.jpg"
+        assert data["source_domain"] == stub_store.split("//")[1]
+
+    def test_scrape_huge_page_reads_only_the_head(self, auth_client, stub_store):
+        """The size cap stops reading early, and the metadata is still found."""
+        response = auth_client.post("/api/scrape", json={"url": f"{stub_store}/huge"})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["name"] == "Giant Catalogue Page"
+        assert data["price"] == 19.99
+        assert data["currency"] == "USD"
+
+    def test_scrape_upstream_404_returns_502(self, auth_client, stub_store):
+        response = auth_client.post("/api/scrape", json={"url": f"{stub_store}/gone"})
+        assert response.status_code == 502
+
+
+class TestScrapeCache:
+    """Repeated and concurrent scrapes of one URL should share a fetch."""
+
+    def test_repeat_scrape_is_served_from_cache(self, auth_client, stub_store):
+        path = f"/product?sku={uuid.uuid4().hex}"
+
+        first = auth_client.post("/api/scrape", json={"url": f"{stub_store}{path}"})
+        # Tracking parameters don't change the cache key
+        second = auth_client.post("/api/scrape", json={"url": f"{stub_store}{path}&utm_source=newsletter#reviews"})
+
+        assert first.status_code == second.status_code == 200
+        assert first.headers["X-Cache"] == "MISS"
+        assert second.headers["X-Cache"] == "HIT"
+        assert second.json()["name"] == first.json()["name"]
+        assert StubStoreHandler.hits[path] == 1
+
+    def test_concurrent_scrapes_share_one_fetch(self, base_url, auth_client, stub_store):
+        path = f"/slow-product?sku={uuid.uuid4().hex}"
+        cookies = dict(auth_client.cookies)
+
+        def scrape(_):
+            with httpx.Client(base_url=base_url, cookies=cookies, timeout=10.0) as c:
+                return c.post("/api/scrape", json={"url": f"{stub_store}{path}"})
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            responses = list(pool.map(scrape, range(5)))
+
+        assert all(r.status_code == 200 for r in responses)
+        assert StubStoreHandler.hits[path] == 1
+
+    def test_failed_scrape_is_negatively_cached(self, auth_client, stub_store):
+        path = f"/gone?sku={uuid.uuid4().hex}"
+
+        assert auth_client.post("/api/scrape", json={"url": f"{stub_store}{path}"}).status_code == 502
+        assert auth_client.post("/api/scrape", json={"url": f"{stub_store}{path}"}).status_code == 502
+        assert StubStoreHandler.hits[path] == 1
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+
+class TestScrapeBatch:
+    """Tests for POST /api/scrape/batch (NDJSON stream, one line per URL)"""
+
+    def test_batch_streams_a_line_per_url_and_a_summary(self, auth_client, stub_store):
+        sku = uuid.uuid4().hex
+        urls = [f"{stub_store}/product?sku={sku}", f"{stub_store}/slow-product?sku={sku}", f"{stub_store}/gone?sku={sku}"]
+
+        response = auth_client.post("/api/scrape/batch", json={"urls": urls})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = read_ndjson(response)
+        results, summary = lines[:-1], lines[-1]
+        assert summary == {"done": True, "total": 3, "succeeded": 2, "failed": 1}
+
+        by_index = {r["index"]: r for r in results}
+        assert sorted(by_index) == [0, 1, 2]
+        assert by_index[0]["name"] == "Noise Cancelling Headphones"
+        assert by_index[2]["status"] == 502
+        # Results arrive as they finish: the slow page is listed second but streamed last
+        assert results[-1]["index"] == 1
+
+    def test_batch_imports_into_wishlist(self, auth_client, stub_store, created_wishlist):
+        sku = uuid.uuid4().hex
+        urls = [f"{stub_store}/product?sku={sku}", f"{stub_store}/gone?sku={sku}"]
+
+        response = auth_client.post("/api/scrape/batch", json={"urls": urls, "wishlist_id": created_wishlist["id"]})
+
+        assert response.status_code == 200
+        imported = [r for r in read_ndjson(response)[:-1] if "item" in r]
+        assert len(imported) == 1
+        assert imported[0]["item"]["name"] == "Noise Cancelling Headphones"
+
+        page = auth_client.get(f"/api/wishlists/{created_wishlist['slug']}").json()
+        assert [item["name"] for item in page["items"]] == ["Noise Cancelling Headphones"]
+
+    def test_batch_rejects_someone_elses_wishlist(self, base_url, created_wishlist, stub_store):
+        with httpx.Client(base_url=base_url, timeout=10.0) as other_client:
+            other_client.post("/api/auth/register", json={
+                "email": f"other_{uuid.uuid4().hex[:8]}@wishlyst-test.com",
+                "password": "Pass123!",
+                "name": "Other User",
+            })
+            response = other_client.post(
+                "/api/scrape/batch",
+                json={"urls": [f"{stub_store}/product"], "wishlist_id": created_wishlist["id"]},
+            )
+            assert response.status_code == 403
+
+    def test_batch_rejects_too_many_urls(self, auth_client, stub_store):
+        response = auth_client.post("/api/scrape/batch", json={"urls": [f"{stub_store}/product?n={i}" for i in range(51)]})
+        assert response.status_code == 400
+
+
+class TestScrapeBatchErrors:
+    """Unit test: the stream survives a URL whose scrape raises something unexpected."""
+
+    def test_unexpected_error_becomes_a_500_line(self, monkeypatch):
+        from api.routers import scraper
+
+        class BrokenForOneUrl:
+            async def get_or_fetch(self, key, fetch):
+                if "broken" in key:
+                    raise RuntimeError("extraction bug")
+                return {"name": "Thing", "price": 1.0, "currency": "USD", "image_url": ""}, False
+
+        monkeypatch.setattr(scraper, "scrape_cache", BrokenForOneUrl())
+
+        async def collect():
+            return [json.loads(line) async for line in scraper._stream_batch(["https://shop.example/ok", "https://shop.example/broken"], None)]
+
+        lines = asyncio.run(collect())
+
+        by_index = {line["index"]: line for line in lines[:-1]}
+        assert by_index[0]["status"] == 200
+        assert by_index[1] == {"index": 1, "url": "https://shop.example/broken", "status": 500, "detail": "Could not scrape this URL"}
+        assert lines[-1] == {"done": True, "total": 2, "succeeded": 1, "failed": 1}
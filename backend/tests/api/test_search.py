@@ -0,0 +1,89 @@
+"""
+tests/api/test_search.py — Search endpoint tests.
+
+New concepts introduced here:
+  - Making test data unique with random words, so searches only ever
+    match what this test created (the test database is shared)
+  - Walking a cursor-paginated endpoint page by page
+"""
+
+import random
+import string
+
+import pytest
+
+
+def random_word(length=10):
+    """Letters only, so the full-text parser keeps it as a single word."""
+    return "".join(random.choices(string.ascii_lowercase, k=length))
+
+
+@pytest.fixture
+def searchable(auth_client):
+    """A public and a private wishlist sharing a unique word, plus items."""
+    word = random_word()
+    public = auth_client.post("/api/wishlists", json={
+        "title": f"{word.capitalize()} birthday list",
+        "description": "Things I would love",
+        "is_public": True,
+    }).json()
+    private = auth_client.post("/api/wishlists", json={
+        "title": f"{word.capitalize()} secret list",
+        "is_public": False,
+    }).json()
+    for n in range(3):
+        auth_client.post(f"/api/wishlists/{public['id']}/items", json={"name": f"{word} speaker {n}", "tag": "audio"})
+    auth_client.post(f"/api/wishlists/{private['id']}/items", json={"name": f"{word} speaker hidden"})
+    return {"word": word, "public": public, "private": private}
+
+
+class TestSearch:
+    """Tests for GET /api/search"""
+
+    def test_search_finds_public_wishlist_by_prefix(self, client, searchable):
+        word = searchable["word"]
+        response = client.get("/api/search", params={"q": word[:6]})
+
+        assert response.status_code == 200
+        slugs = [r["slug"] for r in response.json()]
+        assert searchable["public"]["slug"] in slugs
+        assert searchable["private"]["slug"] not in slugs
+
+    def test_search_items_excludes_private_wishlists(self, client, searchable):
+        response = client.get("/api/search", params={"q": f"{searchable['word']} speak", "type": "items"})
+
+        assert response.status_code == 200
+        names = sorted(r["name"] for r in response.json())
+        assert names == [f"{searchable['word']} speaker {n}" for n in range(3)]
+
+    def test_search_ranks_title_matches_first(self, client, auth_client, searchable):
+        word = searchable["word"]
+        auth_client.post("/api/wishlists", json={"title": "Kitchen list", "description": f"mentions {word} once"})
+
+        results = client.get("/api/search", params={"q": word}).json()
+
+        assert [r["title"] for r in results] == [f"{word.capitalize()} birthday list", "Kitchen list"]
+
+    def test_search_pages_with_cursor(self, client, searchable):
+        """Same convention as the other paginated lists: the cursor is in X-Next-Cursor."""
+        params = {"q": searchable["word"], "type": "items", "limit": 2}
+
+        first = client.get("/api/search", params=params)
+        assert len(first.json()) == 2
+        cursor = first.headers["X-Next-Cursor"]
+
+        second = client.get("/api/search", params={**params, "cursor": cursor})
+        assert len(second.json()) == 1
+        assert "X-Next-Cursor" not in second.headers
+
+        seen = [r["id"] for r in first.json() + second.json()]
+        assert len(set(seen)) == 3
+
+    @pytest.mark.parametrize("cursor", ["not-a-cursor", "WyJ4IiwieSJd"])  # the second is ["x","y"]
+    def test_search_rejects_bad_cursor(self, client, cursor):
+        response = client.get("/api/search", params={"q": "anything", "cursor": cursor})
+        assert response.status_code == 400
+
+    def test_search_requires_a_word(self, client):
+        assert client.get("/api/search", params={"q": "!!!"}).status_code == 400
+        assert client.get("/api/search").status_code == 422
@@ -0,0 +1,114 @@
+"""
+tests/api/test_sessions.py — Session lookup in api/deps.py.
+
+Pure unit tests: the pool connection is replaced with a fake, so they never
+touch PostgreSQL or the API server.
+
+New concepts introduced here:
+  - Calling a FastAPI dependency directly with a hand-built Request
+  - Faking an async context manager with contextlib.asynccontextmanager
+"""
+
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from api import deps
+from api.deps import get_current_user, get_user_if_authenticated, session_cache
+
+
+def request_with_token(token):
+    return Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+def session_row():
+    user_id = uuid.uuid4()
+    return {
+        "user_id": user_id,
+        "expires_at": datetime.now(timezone.utc) + timedelta(days=1),
+        "id": user_id,
+        "email": "someone@wishlyst-test.com",
+        "name": "Someone",
+        "is_admin": False,
+    }
+
+
+class FakeCursor:
+    def __init__(self, row):
+        self.row = row
+
+    async def execute(self, sql, params=None):
+        pass
+
+    async def fetchone(self):
+        return self.row
+
+
+class FakeConnection:
+    def __init__(self, row):
+        self.row = row
+
+    def cursor(self):
+        return FakeCursor(self.row)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Counts connections borrowed by the session lookup."""
+    borrowed = {"count": 0, "row": None}
+
+    @asynccontextmanager
+    async def db_connection():
+        borrowed["count"] += 1
+        yield FakeConnection(borrowed["row"])
+
+    monkeypatch.setattr(deps, "db_connection", db_connection)
+    return borrowed
+
+
+@pytest.fixture
+def token():
+    token = f"test-{uuid.uuid4()}"
+    yield token
+    session_cache.pop(token)
+
+
+class TestSessionLookup:
+
+    def test_cached_session_borrows_no_connection(self, pool, token):
+        row = session_row()
+        session_cache.set(token, row)
+
+        user = asyncio.run(get_current_user(request_with_token(token)))
+
+        assert user["id"] == row["id"]
+        assert pool["count"] == 0
+
+    def test_cache_miss_borrows_one_connection_and_fills_the_cache(self, pool, token):
+        pool["row"] = session_row()
+
+        first = asyncio.run(get_current_user(request_with_token(token)))
+        second = asyncio.run(get_current_user(request_with_token(token)))
+
+        assert first == second
+        assert pool["count"] == 1
+
+    def test_unknown_session_is_rejected(self, pool, token):
+        with pytest.raises(HTTPException) as excinfo:
+            asyncio.run(get_current_user(request_with_token(token)))
+        assert excinfo.value.status_code == 401
+
+    def test_optional_user_without_token_borrows_no_connection(self, pool):
+        assert asyncio.run(get_user_if_authenticated(Request({"type": "http", "headers": []}))) is None
+        assert pool["count"] == 0
+
+    def test_optional_user_uses_the_cache(self, pool, token):
+        session_cache.set(token, session_row())
+
+        assert asyncio.run(get_user_if_authenticated(request_with_token(token))) is not None
+        assert pool["count"] == 0
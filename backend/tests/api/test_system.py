@@ -22,6 +22,20 @@ class TestSystemInfrastructure:
         assert response.headers["X-XSS-Protection"] == "1; mode=block"
         assert "Strict-Transport-Security" in response.headers
 
+    def test_server_timing_reports_app_and_db_time(self, client):
+        """Error responses go through the same middleware as successful ones.
+
+        The db entry is a debug header, sent because the test server runs
+        with ENV=test.
+        """
+        response = client.get("/api/wishlists/no-such-slug-for-timing")
+        assert response.status_code == 404
+        assert response.headers["X-Frame-Options"] == "DENY"
+
+        metrics = {part.split(";")[0].strip(): part for part in response.headers["Server-Timing"].split(",")}
+        assert set(metrics) == {"app", "db"}
+        assert 'desc="1 queries"' in metrics["db"]
+
     def test_rate_limiting_triggered(self, client):
         """Verify that the 'slowapi' implementation blocks rapid requests."""
         # Hit the login endpoint rapidly (it's limited to 5/minute)
@@ -0,0 +1,94 @@
+"""
+tests/api/test_view_buffer.py — Batched view tracking in api/view_buffer.py.
+
+Pure unit tests: the database write is replaced on the buffer instance, so
+they never touch PostgreSQL or the API server.
+
+New concepts introduced here:
+  - Replacing one method on an instance with monkeypatch.setattr
+  - Raising the exception type the database driver would raise
+"""
+
+import asyncio
+import uuid
+
+import psycopg
+
+from api.view_buffer import VIEWER_IP_MAX_LENGTH, ViewBuffer
+
+
+def fake_database(monkeypatch, buffer, rejects=lambda event: False, down=False):
+    """Swap the buffer's write for one that keeps committed views in memory."""
+    committed = {"events": [], "counts": {}}
+
+    async def write(events, counts):
+        if down:
+            raise psycopg.OperationalError("connection refused")
+        if any(rejects(event) for event in events):
+            raise psycopg.DataError("value too long for type character varying(45)")
+        committed["events"].extend(events)
+        for wishlist_id, n in counts.items():
+            committed["counts"][wishlist_id] = committed["counts"].get(wishlist_id, 0) + n
+
+    monkeypatch.setattr(buffer, "_write", write)
+    return committed
+
+
+class TestRecord:
+
+    def test_keeps_the_first_forwarded_hop(self):
+        buffer = ViewBuffer()
+        buffer.record(uuid.uuid4(), "203.0.113.7, 10.0.0.1", "", "")
+        assert buffer._events[0][1] == "203.0.113.7"
+
+    def test_cuts_the_address_to_the_column_length(self):
+        buffer = ViewBuffer()
+        buffer.record(uuid.uuid4(), "x" * 500, "", "")
+        assert len(buffer._events[0][1]) == VIEWER_IP_MAX_LENGTH
+
+
+class TestFlush:
+
+    def test_rejected_event_is_dropped_and_the_rest_are_written(self, monkeypatch):
+        buffer = ViewBuffer()
+        committed = fake_database(monkeypatch, buffer, rejects=lambda event: "\x00" in event[2])
+        wishlist_id = uuid.uuid4()
+        for n in range(7):
+            buffer.record(wishlist_id, "203.0.113.7", "bad\x00agent" if n == 3 else "agent", "")
+
+        asyncio.run(buffer.flush())
+
+        assert committed["counts"] == {wishlist_id: 6}
+        assert len(committed["events"]) == 6
+        stats = buffer.stats()
+        assert stats["dropped_events"] == 1
+        assert stats["failed_flushes"] == 0
+        assert stats["pending_events"] == 0
+        assert buffer.pending_views(wishlist_id) == 0
+
+    def test_later_views_are_written_after_a_rejected_one(self, monkeypatch):
+        buffer = ViewBuffer()
+        committed = fake_database(monkeypatch, buffer, rejects=lambda event: "\x00" in event[2])
+        wishlist_id = uuid.uuid4()
+        buffer.record(wishlist_id, "203.0.113.7", "bad\x00agent", "")
+        asyncio.run(buffer.flush())
+
+        buffer.record(wishlist_id, "203.0.113.7", "agent", "")
+        asyncio.run(buffer.flush())
+
+        assert committed["counts"] == {wishlist_id: 1}
+
+    def test_failed_flush_keeps_the_views_for_the_next_one(self, monkeypatch):
+        buffer = ViewBuffer()
+        fake_database(monkeypatch, buffer, down=True)
+        wishlist_id = uuid.uuid4()
+        buffer.record(wishlist_id, "203.0.113.7", "agent", "")
+        buffer.record(wishlist_id, "203.0.113.8", "agent", "")
+
+        asyncio.run(buffer.flush())
+
+        stats = buffer.stats()
+        assert stats["failed_flushes"] == 1
+        assert stats["dropped_events"] == 0
+        assert stats["pending_events"] == 2
+        assert buffer.pending_views(wishlist_id) == 2
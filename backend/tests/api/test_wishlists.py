@@ -6,9 +6,15 @@ New concepts introduced here:
   - Testing authorization (ownership checks)
   - Testing state changes (view count increments, like count)
   - Two-user scenarios (user A can't modify user B's wishlist)
+  - Firing concurrent requests from a thread pool to check for races
+  - Polling until background work shows up, with a deadline
 """
 
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
 import pytest
 
 
@@ -96,6 +102,55 @@ class TestListWishlists:
         assert "item_count" in matching
         assert matching["item_count"] >= 1
 
+    def test_item_count_follows_adds_deletes_and_clones(self, auth_client, created_wishlist):
+        """item_count is a stored counter; it must stay exact through every write path."""
+        wishlist_id = created_wishlist["id"]
+        item_ids = [
+            auth_client.post(f"/api/wishlists/{wishlist_id}/items", json={"name": f"Counter item {n}"}).json()["id"]
+            for n in range(3)
+        ]
+        auth_client.delete(f"/api/wishlists/{wishlist_id}/items/{item_ids[0]}")
+
+        clone = auth_client.post(
+            f"/api/wishlists/{created_wishlist['slug']}/clone", json={"title": "Counter clone"}
+        ).json()
+
+        counts = {w["id"]: w["item_count"] for w in auth_client.get("/api/wishlists").json()}
+        assert counts[wishlist_id] == 2
+        assert counts[clone["id"]] == 2
+
+    def test_list_wishlists_pages_with_cursor(self, auth_client):
+        """
+        ?limit= caps the page; the X-Next-Cursor header fetches the next one.
+        The body stays a plain list so existing clients keep working.
+        """
+        created = [
+            auth_client.post("/api/wishlists", json={"title": f"Page test {n}"}).json()["id"]
+            for n in range(3)
+        ]
+
+        first = auth_client.get("/api/wishlists", params={"limit": 2})
+        assert first.status_code == 200
+        assert len(first.json()) == 2
+        cursor = first.headers["X-Next-Cursor"]
+
+        second = auth_client.get("/api/wishlists", params={"limit": 2, "cursor": cursor})
+        assert second.status_code == 200
+        assert "X-Next-Cursor" not in second.headers
+
+        # Newest first, nothing skipped or repeated across pages
+        ids = [w["id"] for w in first.json() + second.json()]
+        assert ids == list(reversed(created))
+
+    @pytest.mark.parametrize("cursor", [
+        "garbage",
+        "WyJ4IiwieSJd",  # ["x","y"]: the right shape, but not a timestamp and id
+        "WyIyMDI2LTAxLTAxVDAwOjAwOjAwKzAwOjAwIiwxXQ",  # ["2026-01-01T00:00:00+00:00",1]
+    ])
+    def test_list_wishlists_rejects_bad_cursor(self, auth_client, cursor):
+        response = auth_client.get("/api/wishlists", params={"cursor": cursor})
+        assert response.status_code == 400
+
 
 class TestGetWishlist:
     """Tests for GET /api/wishlists/{slug}"""
@@ -150,6 +205,119 @@ class TestGetWishlist:
         updated = auth_client.get(f"/api/wishlists/{slug}").json()["view_count"]
         assert updated == initial + 1
 
+    def test_public_view_does_not_write_on_request_path(self, client, created_wishlist):
+        """View tracking is buffered, so a public view costs a single read query."""
+        response = client.get(f"/api/wishlists/{created_wishlist['slug']}")
+        assert response.status_code == 200
+        assert response.headers["X-DB-Query-Count"] == "1"
+
+    def test_public_view_query_count_is_constant(self, client, auth_client, created_wishlist):
+        """
+        REGRESSION TEST: loading a wishlist must not issue one query per item.
+        The API reports the statements it ran in the X-DB-Query-Count header;
+        a wishlist with many claimed items must cost the same as one with one.
+        """
+        wishlist_id = created_wishlist["id"]
+        slug = created_wishlist["slug"]
+
+        def add_claimed_item(n):
+            item = auth_client.post(f"/api/wishlists/{wishlist_id}/items", json={"name": f"Item {n}"}).json()
+            client.post(f"/api/wishlists/{slug}/items/{item['id']}/claim", json={"name": f"Guest {n}"})
+
+        add_claimed_item(0)
+        small = client.get(f"/api/wishlists/{slug}")
+        assert small.status_code == 200
+
+        for n in range(1, 6):
+            add_claimed_item(n)
+        large = client.get(f"/api/wishlists/{slug}")
+        assert large.status_code == 200
+        assert len(large.json()["items"]) == 6
+
+        assert large.headers["X-DB-Query-Count"] == small.headers["X-DB-Query-Count"]
+
+    def test_public_view_revalidates_with_etag(self, client, auth_client, created_wishlist):
+        """
+        LESSON: conditional requests
+        A guest sending back the ETag it was given gets an empty 304 while the
+        wishlist is unchanged. The view is still counted.
+        """
+        slug = created_wishlist["slug"]
+        initial = auth_client.get(f"/api/wishlists/{slug}").json()["view_count"]
+
+        first = client.get(f"/api/wishlists/{slug}")
+        etag = first.headers["ETag"]
+        assert first.headers["Cache-Control"] == "public, max-age=0, must-revalidate"
+
+        again = client.get(f"/api/wishlists/{slug}", headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.content == b""
+        assert again.headers["ETag"] == etag
+        assert again.headers["X-DB-Query-Count"] == "1"
+
+        assert auth_client.get(f"/api/wishlists/{slug}").json()["view_count"] == initial + 2
+
+    def test_overlong_forwarded_for_does_not_stall_view_tracking(self, client, auth_client, created_wishlist):
+        """
+        REGRESSION TEST: views are written in batches, so one event the
+        database rejects must not hold back the ones recorded after it.
+        The owner's list reads view_count as stored, without buffered views.
+        """
+        slug = created_wishlist["slug"]
+
+        def stored_view_count():
+            wishlists = auth_client.get("/api/wishlists").json()
+            return next(w["view_count"] for w in wishlists if w["slug"] == slug)
+
+        initial = stored_view_count()
+        client.get(f"/api/wishlists/{slug}", headers={"X-Forwarded-For": "1" * 200 + ", 10.0.0.1"})
+        client.get(f"/api/wishlists/{slug}")
+
+        deadline = time.monotonic() + 10
+        while stored_view_count() != initial + 2:
+            assert time.monotonic() < deadline, "views were never written"
+            time.sleep(0.2)
+
+    @pytest.mark.parametrize("change", ["add_item", "edit_item", "claim", "unclaim", "rename"])
+    def test_etag_changes_when_wishlist_changes(self, client, auth_client, created_item, change):
+        wishlist = created_item["wishlist"]
+        slug = wishlist["slug"]
+        claim_url = f"/api/wishlists/{slug}/items/{created_item['id']}/claim"
+        if change == "unclaim":
+            client.post(claim_url, json={"name": "Guest"})
+        etag = client.get(f"/api/wishlists/{slug}").headers["ETag"]
+
+        if change == "add_item":
+            auth_client.post(f"/api/wishlists/{wishlist['id']}/items", json={"name": "Late addition"})
+        elif change == "edit_item":
+            auth_client.put(f"/api/wishlists/{wishlist['id']}/items/{created_item['id']}", json={"price": 5})
+        elif change == "claim":
+            client.post(claim_url, json={"name": "Guest"})
+        elif change == "unclaim":
+            client.post(f"/api/wishlists/{slug}/items/{created_item['id']}/unclaim", json={"name": "Guest"})
+        else:
+            auth_client.put(f"/api/wishlists/{wishlist['id']}", json={"title": "Renamed"})
+
+        response = client.get(f"/api/wishlists/{slug}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        data = response.json()
+        if change == "add_item":
+            assert "Late addition" in [i["name"] for i in data["items"]]
+        elif change == "edit_item":
+            assert data["items"][0]["price"] == 5
+        elif change == "claim":
+            assert data["items"][0]["is_claimed"] is True
+        elif change == "unclaim":
+            assert data["items"][0]["is_claimed"] is False
+        else:
+            assert data["title"] == "Renamed"
+
+    def test_owner_view_is_not_publicly_cacheable(self, auth_client, created_wishlist):
+        response = auth_client.get(f"/api/wishlists/{created_wishlist['slug']}")
+        assert response.headers["Cache-Control"] == "private, no-cache"
+        assert "ETag" not in response.headers
+
 
 class TestUpdateWishlist:
     """Tests for PUT /api/wishlists/{wishlist_id}"""
@@ -228,3 +396,67 @@ class TestLikeWishlist:
 
         assert response.status_code == 400
         assert "already liked" in response.json()["detail"].lower()
+
+    def test_like_shows_on_wishlist_right_away(self, client, created_wishlist):
+        """The public page counts likes that haven't been merged into the wishlist row yet."""
+        slug = created_wishlist["slug"]
+
+        client.post(f"/api/wishlists/{slug}/like")
+        response = client.get(f"/api/wishlists/{slug}")
+
+        assert response.json()["like_count"] == created_wishlist["like_count"] + 1
+
+    def test_concurrent_likes_are_each_counted_once(self, base_url, created_wishlist):
+        """Many visitors liking at once, some of them twice, lose no likes and count no repeats."""
+        slug = created_wishlist["slug"]
+        prefix = uuid.uuid4().hex[:8]
+        visitors = [f"{prefix}-{n % 20}" for n in range(40)]
+
+        def like(ip):
+            with httpx.Client(base_url=base_url, timeout=10.0) as c:
+                return c.post(f"/api/wishlists/{slug}/like", headers={"X-Forwarded-For": ip})
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            responses = list(pool.map(like, visitors))
+
+        assert sorted(r.status_code for r in responses) == [200] * 20 + [400] * 20
+        with httpx.Client(base_url=base_url, timeout=10.0) as c:
+            assert c.get(f"/api/wishlists/{slug}").json()["like_count"] == 20
+
+
+class TestWishlistAnalytics:
+    """Tests for GET /api/wishlists/{wishlist_id}/analytics"""
+
+    def test_analytics_counts_views_viewers_and_referrers(self, client, auth_client, created_wishlist):
+        """
+        LESSON: eventually consistent reads
+        Views are written by a background flush and folded into the rollup
+        tables later still, so the test polls until they show up. Whichever
+        stage they are at, the totals must come out the same.
+        """
+        import time
+
+        slug = created_wishlist["slug"]
+        for referrer in ["https://friends.example/post", "https://friends.example/post", None]:
+            headers = {"Referer": referrer} if referrer else {}
+            client.get(f"/api/wishlists/{slug}", headers=headers)
+
+        deadline = time.monotonic() + 10
+        while True:
+            response = auth_client.get(f"/api/wishlists/{created_wishlist['id']}/analytics")
+            assert response.status_code == 200
+            data = response.json()
+            if sum(day["views"] for day in data["daily_views"]) == 3 or time.monotonic() > deadline:
+                break
+            time.sleep(0.5)
+
+        assert [day["views"] for day in data["daily_views"]] == [3]
+        assert data["daily_views"][0]["unique_viewers"] == 1
+        assert sum(hour["views"] for hour in data["hourly_views"]) == 3
+        assert data["unique_viewers"] == 1
+        assert data["unique_viewers_30d"] == 1
+        assert data["top_referrers"] == [{"referrer": "https://friends.example/post", "count": 2}]
+
+    def test_analytics_requires_login(self, client, created_wishlist):
+        response = client.get(f"/api/wishlists/{created_wishlist['id']}/analytics")
+        assert response.status_code == 401
@@ -25,6 +25,8 @@ os.environ["ENV"] = "test"
 # ── Configuration ────────────────────────────────────────────────────
 # The base URL of your running FastAPI server.
 # Override via environment variable: BASE_URL=http://staging.example.com pytest
+# Start that server with ENV=test: it relaxes rate limits and sends the
+# X-DB-Query-Count debug header that several tests assert on.
 
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
 